@@ -0,0 +1,589 @@
+import numpy as np
+
+from game_state import GameState, STACK_COUNT, INITIAL_STACK_SIZE, OPEN_SLOT_COUNT, SUIT_STACK_COUNT
+from search import MAX_SOLUTION_LENGTH
+from beam_search import widen_beam, _get_plan, _get_suit_insert_order, DEFAULT_BEAM_WIDTH, DEFAULT_MAX_BEAM_WIDTH
+
+# Batched version of the GameState rules, for expanding many states at once with NumPy
+# Each board is a row of fixed-shape integer arrays, and the legal actions of a board are a row of a boolean mask over
+# a fixed numbering of all possible actions
+
+# The batched tries stop once they have searched this many states together. Batched states are much cheaper than the
+# ones of the scalar beam search, and without macro actions and the endgame solver more of them are needed
+DEFAULT_BATCH_STATE_LIMIT = 1000000
+
+# Cards a stack can hold. A run of at most 8 cards can be put onto a dealt stack, which is more than the 12 cards the
+# game shows on the screen in MAX_STACK_SIZE
+STACK_DEPTH = INITIAL_STACK_SIZE + 8
+
+SUITS = ["red", "green", "black", "rose"]
+ROSE_INDEX = 3
+
+# Cards are coded as small integers, 0 meaning no card. Values run from -1 for turned over tokens to 9
+EMPTY = 0
+CARD_CODES = {}
+for suit_index in range(SUIT_STACK_COUNT):
+    for card_value in range(-1, 10):
+        CARD_CODES[(SUITS[suit_index], card_value)] = suit_index * 11 + card_value + 2
+CARD_CODES[("rose", 0)] = len(CARD_CODES) + 1
+
+CARD_TUPLES = [None] * (len(CARD_CODES) + 1)
+CARD_SUIT = np.full(len(CARD_CODES) + 1, -1, dtype=np.int8)
+CARD_VALUE = np.full(len(CARD_CODES) + 1, -2, dtype=np.int8)
+for card, code in CARD_CODES.items():
+    CARD_TUPLES[code] = card
+    CARD_SUIT[code] = SUITS.index(card[0])
+    CARD_VALUE[code] = card[1]
+
+TOKEN_CODES = np.array([CARD_CODES[(SUITS[i], 0)] for i in range(SUIT_STACK_COUNT)], dtype=np.int8)
+DISCARDED_CODES = np.array([CARD_CODES[(SUITS[i], -1)] for i in range(SUIT_STACK_COUNT)], dtype=np.int8)
+
+# Numbering of the actions in the legal action masks
+# Moving the run from card j of stack i onto stack k
+STACK_MOVE_BASE = 0
+STACK_MOVE_COUNT = STACK_COUNT * STACK_DEPTH * STACK_COUNT
+# Moving the top card of stack i into the first free open slot
+OPEN_MOVE_BASE = STACK_MOVE_BASE + STACK_MOVE_COUNT
+# Moving the top card of stack i onto its suit stack
+SUIT_MOVE_BASE = OPEN_MOVE_BASE + STACK_COUNT
+# Moving the card in open slot s onto stack k
+SLOT_STACK_MOVE_BASE = SUIT_MOVE_BASE + STACK_COUNT
+# Moving the card in open slot s onto its suit stack
+SLOT_SUIT_MOVE_BASE = SLOT_STACK_MOVE_BASE + OPEN_SLOT_COUNT * STACK_COUNT
+# Discarding the tokens of suit s
+TOKEN_MOVE_BASE = SLOT_SUIT_MOVE_BASE + OPEN_SLOT_COUNT
+ACTION_COUNT = TOKEN_MOVE_BASE + SUIT_STACK_COUNT
+
+DEPTH_RANGE = np.arange(STACK_DEPTH)
+
+
+class BatchBoards:
+    """
+        A batch of boards with the same rules as GameState
+
+            stacks: (N, STACK_COUNT, STACK_DEPTH) card codes, bottom card first
+            heights: (N, STACK_COUNT) number of cards in each stack
+            open_slots: (N, OPEN_SLOT_COUNT) card codes
+            suit_values: (N, SUIT_STACK_COUNT) value on each suit stack
+            insert_order: (N, SUIT_STACK_COUNT) suit indices in the order the suit stacks were started, -1 after the end
+            actions_taken: (N,)
+
+        Boards are compared by their stacks and open slots like GameState, see get_keys
+    """
+
+    def __init__(self, stacks, heights, open_slots, suit_values, insert_order, actions_taken):
+        self.stacks = stacks
+        self.heights = heights
+        self.open_slots = open_slots
+        self.suit_values = suit_values
+        self.insert_order = insert_order
+        self.actions_taken = actions_taken
+
+    @classmethod
+    def from_states(cls, states):
+        """
+            Returns a batch of the given GameStates
+        """
+        count = len(states)
+        boards = cls(np.zeros((count, STACK_COUNT, STACK_DEPTH), dtype=np.int8),
+                     np.zeros((count, STACK_COUNT), dtype=np.int16),
+                     np.zeros((count, OPEN_SLOT_COUNT), dtype=np.int8),
+                     np.zeros((count, SUIT_STACK_COUNT), dtype=np.int16),
+                     np.full((count, SUIT_STACK_COUNT), -1, dtype=np.int8),
+                     np.zeros(count, dtype=np.int32))
+
+        for n, state in enumerate(states):
+            for i in range(STACK_COUNT):
+                stack = state.stacks[i]
+                boards.heights[n, i] = len(stack)
+                for j in range(len(stack)):
+                    boards.stacks[n, i, j] = CARD_CODES[stack[j]]
+            for i in range(OPEN_SLOT_COUNT):
+                if state.open_slots[i] is not None:
+                    boards.open_slots[n, i] = CARD_CODES[state.open_slots[i]]
+            for i in range(SUIT_STACK_COUNT):
+                boards.suit_values[n, i] = state.suit_stacks[i][1]
+            for i in range(len(state.suit_insert_order)):
+                boards.insert_order[n, i] = SUITS.index(state.suit_insert_order[i])
+            boards.actions_taken[n] = state.actions_taken
+
+        return boards
+
+    def __len__(self):
+        return len(self.heights)
+
+    def to_state(self, index):
+        """
+            Returns the board at the given index as a GameState
+        """
+        state = GameState()
+        for i in range(STACK_COUNT):
+            for j in range(self.heights[index, i]):
+                state.stacks[i].append(CARD_TUPLES[self.stacks[index, i, j]])
+        for i in range(OPEN_SLOT_COUNT):
+            if self.open_slots[index, i] != EMPTY:
+                state.open_slots[i] = CARD_TUPLES[self.open_slots[index, i]]
+        for i in range(SUIT_STACK_COUNT):
+            state.suit_stacks[i][1] = int(self.suit_values[index, i])
+        state.suit_insert_order = self.get_suit_insert_order(index)
+        state.actions_taken = int(self.actions_taken[index])
+        return state
+
+    def get_suit_insert_order(self, index):
+        """
+            Returns the order the suit stacks were started in on the board at the given index, like
+            GameState.suit_insert_order
+        """
+        return [SUITS[suit_index] for suit_index in self.insert_order[index] if suit_index >= 0]
+
+    def take(self, indices):
+        """
+            Returns a new batch with copies of the boards at the given indices
+        """
+        return BatchBoards(self.stacks[indices], self.heights[indices], self.open_slots[indices],
+                           self.suit_values[indices], self.insert_order[indices], self.actions_taken[indices])
+
+    def get_keys(self):
+        """
+            Returns one bytes object per board that is equal for equal boards, like GameState equality
+        """
+        count = len(self)
+        rows = np.concatenate((self.stacks.reshape(count, -1), self.open_slots), axis=1)
+        return np.ascontiguousarray(rows).view(np.dtype((np.void, rows.shape[1]))).ravel()
+
+    def _get_tops(self):
+        """
+            Returns the top card code of each stack, EMPTY for empty stacks
+        """
+        top_index = np.maximum(self.heights - 1, 0)[:, :, None]
+        tops = np.take_along_axis(self.stacks, top_index, axis=2)[:, :, 0]
+        return np.where(self.heights > 0, tops, EMPTY)
+
+    def get_legal_mask(self):
+        """
+            Returns a (N, ACTION_COUNT) boolean mask of the legal actions of each board, the same actions as
+            GameState.get_legal_actions
+        """
+        count = len(self)
+        values = CARD_VALUE[self.stacks]
+        suits = CARD_SUIT[self.stacks]
+        present = DEPTH_RANGE[None, None, :] < self.heights[:, :, None]
+
+        # A card can be moved if the cards above it form a run of alternating suits and falling values with it
+        movable = np.zeros(self.stacks.shape, dtype=bool)
+        is_top = DEPTH_RANGE[None, None, :] == (self.heights - 1)[:, :, None]
+        movable[:, :, STACK_DEPTH - 1] = is_top[:, :, STACK_DEPTH - 1]
+        for j in range(STACK_DEPTH - 2, -1, -1):
+            link = ((values[:, :, j] != 0) & (values[:, :, j + 1] != 0) & (suits[:, :, j] != suits[:, :, j + 1]) &
+                    (values[:, :, j + 1] == values[:, :, j] - 1) & movable[:, :, j + 1])
+            movable[:, :, j] = present[:, :, j] & (is_top[:, :, j] | link)
+
+        tops = self._get_tops()
+        top_values = CARD_VALUE[tops]
+        top_suits = CARD_SUIT[tops]
+        empty_stacks = self.heights == 0
+        free_slot = (self.open_slots == EMPTY).any(axis=1)
+
+        mask = np.zeros((count, ACTION_COUNT), dtype=bool)
+
+        # Stack to stack, onto an empty stack or a top card of another suit and one more value
+        placeable = empty_stacks[:, None, None, :] | (
+            (top_values[:, None, None, :] != 0) & (values[:, :, :, None] != 0) &
+            (top_suits[:, None, None, :] != suits[:, :, :, None]) &
+            (top_values[:, None, None, :] == values[:, :, :, None] + 1))
+        stack_moves = (movable & (suits != ROSE_INDEX))[:, :, :, None] & placeable
+        stack_moves &= ~np.eye(STACK_COUNT, dtype=bool)[None, :, None, :]
+        mask[:, STACK_MOVE_BASE:OPEN_MOVE_BASE] = stack_moves.reshape(count, -1)
+
+        # Top card to an open slot or the suit stack
+        has_top = (self.heights > 0) & (top_suits != ROSE_INDEX)
+        mask[:, OPEN_MOVE_BASE:SUIT_MOVE_BASE] = has_top & free_slot[:, None]
+        top_suit_values = np.take_along_axis(self.suit_values, np.clip(top_suits, 0, 2).astype(np.intp), axis=1)
+        mask[:, SUIT_MOVE_BASE:SLOT_STACK_MOVE_BASE] = has_top & (top_values == top_suit_values + 1)
+
+        # Open slot to a stack or the suit stack
+        slot_values = CARD_VALUE[self.open_slots]
+        slot_suits = CARD_SUIT[self.open_slots]
+        slot_cards = (self.open_slots != EMPTY) & (slot_values != -1)
+        slot_placeable = empty_stacks[:, None, :] | (
+            (top_values[:, None, :] != 0) & (slot_values[:, :, None] != 0) &
+            (top_suits[:, None, :] != slot_suits[:, :, None]) & (top_values[:, None, :] == slot_values[:, :, None] + 1))
+        mask[:, SLOT_STACK_MOVE_BASE:SLOT_SUIT_MOVE_BASE] = (slot_cards[:, :, None] & slot_placeable).reshape(count, -1)
+        slot_suit_values = np.take_along_axis(self.suit_values, np.clip(slot_suits, 0, 2).astype(np.intp), axis=1)
+        mask[:, SLOT_SUIT_MOVE_BASE:TOKEN_MOVE_BASE] = slot_cards & (slot_values == slot_suit_values + 1)
+
+        # Token discard, when all 4 tokens of a suit are uncovered and there is a slot for the pile
+        for suit_index in range(SUIT_STACK_COUNT):
+            token = TOKEN_CODES[suit_index]
+            in_slots = self.open_slots == token
+            token_count = (tops == token).sum(axis=1) + in_slots.sum(axis=1)
+            mask[:, TOKEN_MOVE_BASE + suit_index] = (token_count == 4) & (in_slots.any(axis=1) | free_slot)
+
+        return mask
+
+    def to_action(self, index, action_index):
+        """
+            Returns the action with the given number on the board at the given index, as a GameState action
+        """
+        action_index = int(action_index)
+        if action_index < OPEN_MOVE_BASE:
+            stack_index, rest = divmod(action_index - STACK_MOVE_BASE, STACK_DEPTH * STACK_COUNT)
+            card_index, target_stack_index = divmod(rest, STACK_COUNT)
+            return (stack_index, card_index), ("stack", target_stack_index)
+
+        if action_index < SUIT_MOVE_BASE:
+            stack_index = action_index - OPEN_MOVE_BASE
+            slot_index = int(np.argmax(self.open_slots[index] == EMPTY))
+            return (stack_index, int(self.heights[index, stack_index]) - 1), ("open", slot_index)
+
+        if action_index < SLOT_STACK_MOVE_BASE:
+            stack_index = action_index - SUIT_MOVE_BASE
+            card_index = int(self.heights[index, stack_index]) - 1
+            card = CARD_TUPLES[self.stacks[index, stack_index, card_index]]
+            return (stack_index, card_index), ("suit", card[0])
+
+        if action_index < SLOT_SUIT_MOVE_BASE:
+            slot_index, target_stack_index = divmod(action_index - SLOT_STACK_MOVE_BASE, STACK_COUNT)
+            return (-1, slot_index), ("stack", target_stack_index)
+
+        if action_index < TOKEN_MOVE_BASE:
+            slot_index = action_index - SLOT_SUIT_MOVE_BASE
+            card = CARD_TUPLES[self.open_slots[index, slot_index]]
+            return (-1, slot_index), ("suit", card[0])
+
+        return (None, None), ("token", SUITS[action_index - TOKEN_MOVE_BASE])
+
+    def apply_actions(self, action_indices):
+        """
+            Applies one action to each board, given as numbers of the legal action masks. Assumes they are valid
+        """
+        action_indices = np.asarray(action_indices)
+        self.actions_taken += 1
+
+        rows = np.flatnonzero(action_indices < OPEN_MOVE_BASE)
+        if len(rows) > 0:
+            stack_index, rest = np.divmod(action_indices[rows] - STACK_MOVE_BASE, STACK_DEPTH * STACK_COUNT)
+            card_index, target_stack_index = np.divmod(rest, STACK_COUNT)
+            self._move_runs(rows, stack_index, card_index, target_stack_index)
+
+        rows = np.flatnonzero((action_indices >= OPEN_MOVE_BASE) & (action_indices < SUIT_MOVE_BASE))
+        if len(rows) > 0:
+            stack_index = action_indices[rows] - OPEN_MOVE_BASE
+            slot_index = np.argmax(self.open_slots[rows] == EMPTY, axis=1)
+            self.open_slots[rows, slot_index] = self._pop_tops(rows, stack_index)
+
+        rows = np.flatnonzero((action_indices >= SUIT_MOVE_BASE) & (action_indices < SLOT_STACK_MOVE_BASE))
+        if len(rows) > 0:
+            cards = self._pop_tops(rows, action_indices[rows] - SUIT_MOVE_BASE)
+            self.suit_values[rows, CARD_SUIT[cards]] += 1
+
+        rows = np.flatnonzero((action_indices >= SLOT_STACK_MOVE_BASE) & (action_indices < SLOT_SUIT_MOVE_BASE))
+        if len(rows) > 0:
+            slot_index, target_stack_index = np.divmod(action_indices[rows] - SLOT_STACK_MOVE_BASE, STACK_COUNT)
+            self.stacks[rows, target_stack_index, self.heights[rows, target_stack_index]] = \
+                self.open_slots[rows, slot_index]
+            self.heights[rows, target_stack_index] += 1
+            self.open_slots[rows, slot_index] = EMPTY
+
+        rows = np.flatnonzero((action_indices >= SLOT_SUIT_MOVE_BASE) & (action_indices < TOKEN_MOVE_BASE))
+        if len(rows) > 0:
+            slot_index = action_indices[rows] - SLOT_SUIT_MOVE_BASE
+            self.suit_values[rows, CARD_SUIT[self.open_slots[rows, slot_index]]] += 1
+            self.open_slots[rows, slot_index] = EMPTY
+
+        rows = np.flatnonzero(action_indices >= TOKEN_MOVE_BASE)
+        if len(rows) > 0:
+            self._discard_tokens(rows, action_indices[rows] - TOKEN_MOVE_BASE)
+
+    def _move_runs(self, rows, stack_index, card_index, target_stack_index):
+        source_heights = self.heights[rows, stack_index]
+        target_heights = self.heights[rows, target_stack_index]
+        moved_counts = source_heights - card_index
+
+        for offset in range(STACK_DEPTH):
+            moving = offset < moved_counts
+            if not moving.any():
+                break
+            moving_rows = rows[moving]
+            source = card_index[moving] + offset
+            self.stacks[moving_rows, target_stack_index[moving], target_heights[moving] + offset] = \
+                self.stacks[moving_rows, stack_index[moving], source]
+            self.stacks[moving_rows, stack_index[moving], source] = EMPTY
+
+        self.heights[rows, stack_index] = card_index
+        self.heights[rows, target_stack_index] += moved_counts
+
+    def _pop_tops(self, rows, stack_index):
+        """
+            Removes and returns the top cards of the given stacks of the given boards
+        """
+        top_index = self.heights[rows, stack_index] - 1
+        cards = self.stacks[rows, stack_index, top_index]
+        self.stacks[rows, stack_index, top_index] = EMPTY
+        self.heights[rows, stack_index] = top_index
+        return cards
+
+    def _discard_tokens(self, rows, suit_index):
+        tokens = TOKEN_CODES[suit_index]
+
+        for i in range(STACK_COUNT):
+            stack_index = np.full(len(rows), i)
+            top_index = np.maximum(self.heights[rows, i] - 1, 0)
+            on_top = (self.heights[rows, i] > 0) & (self.stacks[rows, i, top_index] == tokens)
+            if on_top.any():
+                self._pop_tops(rows[on_top], stack_index[on_top])
+
+        slots = self.open_slots[rows]
+        slots[slots == tokens[:, None]] = EMPTY
+        slot_index = np.argmax(slots == EMPTY, axis=1)
+        slots[np.arange(len(rows)), slot_index] = DISCARDED_CODES[suit_index]
+        self.open_slots[rows] = slots
+
+    def auto_resolve(self):
+        """
+            Resolves the free moves on every board in the same passes as GameState.auto_resolve
+            Returns the number of cards resolved on each board
+        """
+        count = len(self)
+        resolved_counts = np.zeros(count, dtype=np.int32)
+        rows = np.arange(count)
+
+        while len(rows) > 0:
+            minimum_suit_value = self.suit_values[rows].min(axis=1)
+            stacks_changed = np.zeros(len(rows), dtype=bool)
+            early_continue = np.zeros(len(rows), dtype=bool)
+
+            # Stack tops in order, against the suit minimum at the start of the pass
+            for i in range(STACK_COUNT):
+                heights = self.heights[rows, i]
+                top_index = np.maximum(heights - 1, 0)
+                tops = np.where(heights > 0, self.stacks[rows, i, top_index], EMPTY)
+                top_values = CARD_VALUE[tops]
+                top_suits = CARD_SUIT[tops]
+
+                rose = top_suits == ROSE_INDEX
+                current_suit_values = self.suit_values[rows, np.clip(top_suits, 0, 2)]
+                resolvable = ((top_suits >= 0) & (top_suits < ROSE_INDEX) & (top_values == current_suit_values + 1) &
+                              ((top_values == minimum_suit_value + 1) | (top_values == 1) | (top_values == 2)))
+                popped = rose | resolvable
+                if not popped.any():
+                    continue
+
+                popped_rows = rows[popped]
+                self.stacks[popped_rows, i, top_index[popped]] = EMPTY
+                self.heights[popped_rows, i] -= 1
+                resolved_counts[popped_rows] += 1
+
+                resolved_rows = rows[resolvable]
+                resolved_suits = top_suits[resolvable]
+                self.suit_values[resolved_rows, resolved_suits] += 1
+
+                started = top_values[resolvable] == 1
+                if started.any():
+                    started_rows = resolved_rows[started]
+                    order_index = (self.insert_order[started_rows] >= 0).sum(axis=1)
+                    self.insert_order[started_rows, order_index] = resolved_suits[started]
+
+                stacks_changed |= popped
+                early_continue |= resolvable
+
+            # The first resolvable open slot card, only if nothing was resolved from the stacks
+            checked = ~early_continue
+            for i in range(OPEN_SLOT_COUNT):
+                cards = self.open_slots[rows, i]
+                card_values = CARD_VALUE[cards]
+                card_suits = CARD_SUIT[cards]
+                current_suit_values = self.suit_values[rows, np.clip(card_suits, 0, 2)]
+                resolvable = (checked & (cards != EMPTY) & (card_values == current_suit_values + 1) &
+                              ((card_values == minimum_suit_value + 1) | (card_values == 1) | (card_values == 2)))
+                if not resolvable.any():
+                    continue
+
+                resolved_rows = rows[resolvable]
+                self.open_slots[resolved_rows, i] = EMPTY
+                self.suit_values[resolved_rows, card_suits[resolvable]] += 1
+                resolved_counts[resolved_rows] += 1
+                checked &= ~resolvable
+
+            # Only another pass if the stacks changed
+            rows = rows[stacks_changed]
+
+        return resolved_counts
+
+    def get_heuristic_values(self):
+        """
+            Returns GameState.get_heuristic_value of every board
+        """
+        count = len(self)
+        score = np.zeros(count)
+
+        slot_values = CARD_VALUE[self.open_slots]
+        for i in range(OPEN_SLOT_COUNT):
+            occupied = self.open_slots[:, i] != EMPTY
+            score[occupied] -= 3.2
+            score[occupied & (slot_values[:, i] == -1)] += 8
+
+        for i in range(SUIT_STACK_COUNT):
+            score += self.suit_values[:, i]
+        suit_min = np.minimum(self.suit_values.min(axis=1), 10)
+        suit_max = np.maximum(self.suit_values.max(axis=1), 0)
+
+        bottom_values = CARD_VALUE[self.stacks[:, :, 0]]
+        for i in range(STACK_COUNT):
+            score[self.heights[:, i] == 0] += 3
+            long_stack = (self.heights[:, i] > 0) & (bottom_values[:, i] >= 8)
+            score[long_stack] += self.heights[long_stack, i]
+
+        score -= (suit_max - suit_min) / 2.0
+
+        many_actions = self.actions_taken > 10
+        score[many_actions] -= self.actions_taken[many_actions] / 5.0
+
+        few_cards = self.heights.sum(axis=1) < 10
+        score[few_cards] = (self.heights[few_cards] > 0).sum(axis=1) + 100
+
+        few_actions = self.actions_taken < 5
+        score[few_actions] = np.maximum(5, score[few_actions])
+
+        won = ((self.heights == 0).all(axis=1) & (self.suit_values == 9).all(axis=1) &
+               ((self.open_slots == EMPTY) | (slot_values == -1)).all(axis=1))
+        score[won] = 1000
+
+        return score
+
+    def get_deadlocked(self, indices):
+        """
+            Returns which of the boards at the given indices are deadlocked, see GameState.is_deadlocked
+            Only boards without a free open slot or an empty stack can be, only those are converted and checked
+        """
+        indices = np.asarray(indices)
+        deadlocked = np.zeros(len(indices), dtype=bool)
+        full = (self.open_slots[indices] != EMPTY).all(axis=1) & (self.heights[indices] > 0).all(axis=1)
+        for k in np.flatnonzero(full):
+            deadlocked[k] = self.to_state(indices[k]).is_deadlocked()
+        return deadlocked
+
+
+def expand(boards):
+    """
+        Applies every legal action of every board, and auto-resolves the children
+        Returns a 4-tuple (children, parent indices, action numbers, resolved counts)
+    """
+    parent_indices, action_indices = np.nonzero(boards.get_legal_mask())
+    children = boards.take(parent_indices)
+    children.apply_actions(action_indices)
+    resolved_counts = children.auto_resolve()
+    return children, parent_indices, action_indices, resolved_counts
+
+
+def search_solution_beam_batched(state, verbose=True, stats=None, beam_width=DEFAULT_BEAM_WIDTH,
+                                 max_beam_width=DEFAULT_MAX_BEAM_WIDTH, max_depth=MAX_SOLUTION_LENGTH,
+                                 state_limit=DEFAULT_BATCH_STATE_LIMIT):
+    """
+        search_solution_beam with each depth expanded as one batch. Only the legal actions are expanded, without the
+        macro actions and the endgame solver
+        Returns a 2-tuple (actions, suit_insert_order) like search_solution
+    """
+    functions = (expand, BatchBoards.get_keys, BatchBoards.get_heuristic_values, BatchBoards.get_deadlocked)
+    if stats is not None:
+        functions = (stats.wrap("expand", expand), stats.wrap("get_keys", BatchBoards.get_keys),
+                     stats.wrap("get_heuristic_values", BatchBoards.get_heuristic_values),
+                     stats.wrap("get_deadlocked", BatchBoards.get_deadlocked))
+        stats.start()
+
+    # Expanded boards, generated children and deadlocked children of all tries, for the stats
+    counters = [0, 0, 0]
+
+    result = widen_beam(lambda width, limit: _search_batched(state, width, max_depth, limit, functions, counters),
+                        beam_width, max_beam_width, verbose, state_limit)
+    shortest_solution, shortest_solution_suit_order, states_searched, peak_beam = result
+
+    if stats is not None:
+        stats.expanded, stats.generated, stats.deadlocked = counters
+        stats.peak_frontier = peak_beam
+        stats.finish(states_searched)
+
+    return shortest_solution, shortest_solution_suit_order
+
+
+def _search_batched(state, beam_width, max_depth, state_limit, functions, counters):
+    """
+        Runs one batched beam search with the given width, until it has searched state_limit states if that is given
+        Returns the same 6-tuple as beam_search._search
+    """
+    expand_boards, get_keys, get_heuristic_values, get_deadlocked = functions
+
+    # Every depth keeps (parent index, actions) per kept board to rebuild the plan, only the last depth keeps boards
+    layers = []
+    beam = BatchBoards.from_states([state])
+    seen = set(get_keys(beam).tolist())
+
+    best = (-999, 0, 0)
+    states_searched = 0
+    peak_beam = 1
+
+    for depth in range(max_depth):
+        if state_limit is not None and states_searched >= state_limit:
+            break
+
+        children, parent_indices, action_indices, resolved_counts = expand_boards(beam)
+        counters[0] += len(beam)
+        counters[1] += len(children)
+
+        # Children that are new, the first of equal children within the depth is kept
+        keys = get_keys(children)
+        unique_keys, first_indices = np.unique(keys, return_index=True)
+        first_indices.sort()
+        new_indices = np.array([index for index in first_indices if keys[index].tobytes() not in seen],
+                               dtype=np.intp)
+
+        if len(new_indices) == 0:
+            break
+
+        # Highest heuristic first, the earlier generated child of equal ones
+        heuristics = get_heuristic_values(children)
+        candidates = new_indices[np.argsort(-heuristics[new_indices], kind="stable")]
+
+        # Only the candidates that could make it into the beam are checked for deadlocks
+        kept = np.zeros(0, dtype=np.intp)
+        checked_count = 0
+        while len(kept) < beam_width and checked_count < len(candidates):
+            checked = candidates[checked_count:checked_count + beam_width - len(kept)]
+            deadlocked = get_deadlocked(children, checked)
+            kept = np.concatenate((kept, checked[~deadlocked]))
+            counters[2] += int(deadlocked.sum())
+            checked_count += len(checked)
+        if len(kept) == 0:
+            break
+
+        states_searched += len(new_indices)
+        peak_beam = max(peak_beam, len(new_indices))
+
+        layer = []
+        for index in kept:
+            parent_index = int(parent_indices[index])
+            actions = [beam.to_action(parent_index, action_indices[index])]
+            if resolved_counts[index] > 0:
+                actions.append(((None, None), ("resolve", int(resolved_counts[index]))))
+            layer.append((parent_index, actions))
+        layers.append(layer)
+
+        beam = children.take(kept)
+        seen.update(get_keys(beam).tolist())
+
+        highest_heuristic = float(heuristics[kept[0]])
+        if highest_heuristic > best[0]:
+            best = (highest_heuristic, len(layers), 0)
+
+        if highest_heuristic >= 100:
+            break
+
+    heuristic, depth, index = best
+    if depth == 0:
+        return False, heuristic, [], state.suit_insert_order, states_searched, peak_beam
+
+    plan = _get_plan(layers, depth, index)
+    suit_insert_order = _get_suit_insert_order(state, plan, GameState.clone, GameState.apply_action,
+                                               GameState.auto_resolve)
+
+    return heuristic >= 100, heuristic, plan, suit_insert_order, states_searched, peak_beam
@@ -0,0 +1,195 @@
+from endgame import ENDGAME_CARD_THRESHOLD
+from search import MAX_SOLUTION_LENGTH, get_children_function, get_endgame_function
+from search_memory import StatePool
+from instrumentation import get_search_functions
+
+# How many states are kept per depth on the first try
+DEFAULT_BEAM_WIDTH = 100
+
+# The beam is doubled after each failed try until it is wider than this
+DEFAULT_MAX_BEAM_WIDTH = 800
+
+# The tries stop once they have searched this many states together, so widening can not run for minutes
+DEFAULT_BEAM_STATE_LIMIT = 50000
+
+
+def search_solution_beam(state, verbose=True, stats=None, beam_width=DEFAULT_BEAM_WIDTH,
+                         max_beam_width=DEFAULT_MAX_BEAM_WIDTH, max_depth=MAX_SOLUTION_LENGTH,
+                         state_limit=DEFAULT_BEAM_STATE_LIMIT, endgame_card_threshold=ENDGAME_CARD_THRESHOLD,
+                         use_macros=True):
+    """
+        Beam search version of search_solution, for a good plan in bounded time and memory
+
+        Only the beam_width states with the highest heuristic value are kept at each depth. If no solution is found
+        within max_depth, the search is repeated with a doubled beam until the beam is wider than max_beam_width, or
+        until the tries have searched state_limit states. At most beam_width states are kept per depth, so the memory
+        used is O(beam_width * max_depth)
+        The children, macro actions and endgames are the same as in search_solution
+        Returns a 2-tuple (actions, suit_insert_order) like search_solution
+    """
+    # Children that are dropped or do not make it into the beam are recycled for the next clones
+    pool = StatePool()
+
+    # Pick the functions called by the search, timed ones if stats are collected
+    functions = get_search_functions(pool, stats)
+    get_children = get_children_function(functions, stats, use_macros)
+    finish_endgame = get_endgame_function(stats, endgame_card_threshold)
+    if stats is not None:
+        stats.start()
+
+    result = widen_beam(lambda width, limit: _search(state, width, max_depth, limit, functions, get_children,
+                                                     finish_endgame),
+                        beam_width, max_beam_width, verbose, state_limit)
+    shortest_solution, shortest_solution_suit_order, states_searched, peak_beam = result
+
+    if stats is not None:
+        stats.reused_states = pool.reuse_count
+        stats.peak_frontier = peak_beam
+        stats.finish(states_searched)
+
+    return shortest_solution, shortest_solution_suit_order
+
+
+def widen_beam(search_width, beam_width, max_beam_width, verbose=True, state_limit=None):
+    """
+        Calls search_width with the beam width and the number of states the try may search, doubling the width after
+        each failed try until it is wider than max_beam_width or the tries have searched state_limit states together.
+        The number of states is None without a state_limit. search_width returns a 6-tuple (solved, best heuristic,
+        actions, suit_insert_order, states searched, peak beam size)
+        Returns a 4-tuple (actions, suit_insert_order, states searched, peak beam size) of the best try
+    """
+    shortest_solution = []
+    shortest_solution_suit_order = []
+    highest_heuristic = -999
+    states_searched = 0
+    peak_beam = 0
+
+    while True:
+        remaining_states = state_limit - states_searched if state_limit is not None else None
+        solved, heuristic, solution, suit_insert_order, searched, beam_peak = search_width(beam_width, remaining_states)
+
+        states_searched += searched
+        peak_beam = max(peak_beam, beam_peak)
+        if heuristic >= highest_heuristic:
+            highest_heuristic = heuristic
+            shortest_solution = solution
+            shortest_solution_suit_order = suit_insert_order
+
+        if solved:
+            if verbose:
+                print("New shortest solution", len(solution))
+                print("Beam width:", beam_width)
+                print("States searched:", states_searched)
+                print()
+            break
+
+        beam_width *= 2
+        if beam_width > max_beam_width or (state_limit is not None and states_searched >= state_limit):
+            if verbose:
+                print("Unable to find solution")
+            break
+        if verbose:
+            print("Widening beam to", beam_width)
+
+    return shortest_solution, shortest_solution_suit_order, states_searched, peak_beam
+
+
+def _search(state, beam_width, max_depth, state_limit, functions, get_children, finish_endgame):
+    """
+        Runs one beam search with the given width, until it has searched state_limit states if that is given
+        Returns a 6-tuple (solved, best heuristic, actions, suit_insert_order, states searched, peak beam size)
+    """
+    clone_state, release_state, apply_action, auto_resolve, get_heuristic_value, get_legal_actions = functions
+
+    # Every depth keeps (parent index, actions) per kept state to rebuild the plan, only the last depth keeps states
+    layers = []
+    beam = [(get_heuristic_value(state), state)]
+
+    # States kept in any beam so far, so later depths do not walk back into them
+    seen = {state}
+
+    best = (-999, 0, 0)
+    states_searched = 0
+    peak_beam = 1
+
+    for depth in range(max_depth):
+        if state_limit is not None and states_searched >= state_limit:
+            break
+
+        # Try to finish the small states of the beam exactly
+        for index, (heuristic, current_state) in enumerate(beam):
+            endgame = finish_endgame(current_state)
+            if endgame is not None:
+                plan = _get_plan(layers, len(layers), index) + endgame[0]
+                return True, 100, plan, endgame[1], states_searched, peak_beam
+
+        # Children of the whole beam, deduplicated within the depth
+        children = {}
+        sequence = 0
+
+        for parent_index, (parent_heuristic, parent) in enumerate(beam):
+            for clone, actions in get_children(parent):
+                if clone in seen or clone in children:
+                    release_state(clone)
+                    continue
+
+                # The sequence keeps the selection stable for children with equal heuristic values
+                sequence -= 1
+                children[clone] = (get_heuristic_value(clone), sequence, clone, parent_index, actions)
+                states_searched += 1
+
+        if len(children) == 0:
+            break
+
+        ranked = sorted(children.values(), reverse=True)
+        kept = ranked[:beam_width]
+        peak_beam = max(peak_beam, len(children))
+
+        for item in ranked[beam_width:]:
+            release_state(item[2])
+
+        layers.append([(item[3], item[4]) for item in kept])
+        beam = [(item[0], item[2]) for item in kept]
+        seen.update(item[2] for item in kept)
+
+        if kept[0][0] > best[0]:
+            best = (kept[0][0], len(layers), 0)
+
+        if kept[0][0] >= 100:
+            break
+
+    heuristic, depth, index = best
+    if depth == 0:
+        return False, heuristic, [], state.suit_insert_order, states_searched, peak_beam
+
+    plan = _get_plan(layers, depth, index)
+    if depth == len(layers):
+        suit_insert_order = beam[index][1].suit_insert_order
+    else:
+        suit_insert_order = _get_suit_insert_order(state, plan, clone_state, apply_action, auto_resolve)
+
+    return heuristic >= 100, heuristic, plan, suit_insert_order, states_searched, peak_beam
+
+
+def _get_plan(layers, depth, index):
+    """
+        Walks the parent indices back from the state at the given index of the given depth to rebuild its plan
+    """
+    plan = []
+    for layer in reversed(layers[:depth]):
+        parent_index, actions = layer[index]
+        plan = actions + plan
+        index = parent_index
+    return plan
+
+
+def _get_suit_insert_order(state, plan, clone_state, apply_action, auto_resolve):
+    """
+        Replays the plan from the given state and returns the suit stack order it ends with
+    """
+    current_state = clone_state(state)
+    for action in plan:
+        if action[1][0] != "resolve":
+            apply_action(current_state, action)
+            auto_resolve(current_state)
+    return current_state.suit_insert_order
@@ -0,0 +1,85 @@
+import random
+import sys
+import time
+
+from batch_engine import BatchBoards, expand
+from simulator import create_random_state
+
+# Random positions expanded by both engines
+STATE_COUNT = 2000
+
+# Random moves played from each random deal to collect positions
+WALK_LENGTH = 40
+
+
+def create_random_states(count, seed=0):
+    """
+        Returns positions met on random walks from random deals
+    """
+    rng = random.Random(seed)
+    states = []
+    game_seed = seed
+
+    while len(states) < count:
+        state = create_random_state(game_seed)
+        game_seed += 1
+
+        for i in range(WALK_LENGTH):
+            actions = state.get_legal_actions()
+            if len(actions) == 0 or len(states) >= count:
+                break
+            state.apply_action(rng.choice(actions))
+            state.auto_resolve()
+            states.append(state.clone())
+
+    return states
+
+
+def expand_scalar(states):
+    """
+        Expands the states one by one with GameState, returns the number of children
+    """
+    children = 0
+    for state in states:
+        for action in state.get_legal_actions():
+            clone = state.clone()
+            clone.apply_action(action)
+            clone.auto_resolve()
+            clone.get_heuristic_value()
+            children += 1
+    return children
+
+
+def expand_batched(boards):
+    """
+        Expands the boards as one batch, returns the number of children
+    """
+    children = expand(boards)[0]
+    children.get_heuristic_values()
+    return len(children)
+
+
+def main():
+    state_count = int(sys.argv[1]) if len(sys.argv) > 1 else STATE_COUNT
+    states = create_random_states(state_count)
+
+    start = time.perf_counter()
+    scalar_children = expand_scalar(states)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    boards = BatchBoards.from_states(states)
+    conversion_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched_children = expand_batched(boards)
+    batched_time = time.perf_counter() - start
+
+    print("States:", len(states), "children:", scalar_children, batched_children)
+    print("GameState: {0:10.0f} nodes/s".format(scalar_children / scalar_time))
+    print("Batched:   {0:10.0f} nodes/s, {1:.0f} nodes/s with the conversion from GameState".format(
+        batched_children / batched_time, batched_children / (batched_time + conversion_time)))
+
+
+if __name__ == "__main__":
+    main()
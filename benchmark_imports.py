@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import time
+
+# Modules a batch worker imports, from the headless core up to the full bot
+MODULES = ["game_state", "search", "recognition", "simulator", "solver"]
+
+# Modules that should only be imported when the screen, the mouse or the batched search is actually used
+HEAVY_MODULES = ["PIL", "pyscreenshot", "pynput", "numpy"]
+
+RUN_COUNT = 10
+
+
+def measure_import(module):
+    """
+        Returns the median wall time in seconds of a fresh interpreter importing the given module, and the heavy modules
+        that were loaded by the import
+    """
+    code = "import sys, {0}; print(','.join(m for m in {1} if m in sys.modules))".format(module, HEAVY_MODULES)
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    times = []
+    loaded = ""
+    for i in range(RUN_COUNT):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True)
+        times.append(time.perf_counter() - start)
+        loaded = output.stdout.strip()
+
+    times.sort()
+    return times[len(times) // 2], loaded
+
+
+def main():
+    baseline, _ = measure_import("sys")
+    print("Interpreter startup: {0:.1f} ms".format(baseline * 1000))
+
+    for module in MODULES:
+        median, loaded = measure_import(module)
+        print("{0:<12} {1:6.1f} ms  heavy imports: {2}".format(module, (median - baseline) * 1000, loaded or "none"))
+
+
+if __name__ == "__main__":
+    main()
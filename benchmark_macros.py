@@ -0,0 +1,61 @@
+from instrumentation import SolveStats
+from search import search_solution
+from search_memory import paused_gc
+from simulator import create_random_state
+
+# Deals searched with the best-first search, with and without the macro actions
+SEEDS = list(range(8))
+
+
+def replay_plan(state, actions):
+    """
+        Plays the plan on a copy of the state, checking that every action is legal
+        Returns the state the plan ends in
+    """
+    state = state.clone()
+    for action in actions:
+        if action[1][0] == "resolve":
+            continue
+        if action not in state.get_legal_actions():
+            raise ValueError("Illegal action in plan: " + str(action))
+        state.apply_action(action)
+        state.auto_resolve()
+    return state
+
+
+def main():
+    print("{0:>4} {1:>7} {2:>9} {3:>9} {4:>9} {5:>9} {6:>8} {7:>11} {8:>8}".format(
+        "seed", "macros", "expanded", "states", "seconds", "in macros", "actions", "cards left", "macros"))
+
+    totals = {False: [0, 0, 0.0, 0], True: [0, 0, 0.0, 0]}
+    for seed in SEEDS:
+        for use_macros in [False, True]:
+            state = create_random_state(seed)
+            stats = SolveStats()
+            # The GC is paused like in solve_state, or its collections of the state history count as search time
+            with paused_gc():
+                actions, _ = search_solution(state.clone(), False, stats, use_macros=use_macros)
+
+            final_state = replay_plan(state, actions)
+            action_count = len([action for action in actions if action[1][0] != "resolve"])
+
+            macro_time = stats.timers.get("get_macro_actions", 0.0)
+            print("{0:>4} {1:>7} {2:>9} {3:>9} {4:9.1f} {5:>9.1f} {6:>8} {7:>11} {8:>8}".format(
+                seed, "on" if use_macros else "off", stats.expanded, stats.states_searched, stats.total_time,
+                macro_time, action_count, final_state.get_total_card_count(), stats.macro_actions))
+
+            total = totals[use_macros]
+            total[0] += stats.expanded
+            total[1] += stats.states_searched
+            total[2] += stats.total_time
+            total[3] += 1 if final_state.is_won() else 0
+
+    print()
+    for use_macros in [False, True]:
+        total = totals[use_macros]
+        print("Macros {0}: {1} expanded, {2} states, {3:.1f} s, {4}/{5} won".format(
+            "on" if use_macros else "off", total[0], total[1], total[2], total[3], len(SEEDS)))
+
+
+if __name__ == "__main__":
+    main()
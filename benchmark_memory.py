@@ -0,0 +1,122 @@
+import contextlib
+import gc
+import sys
+import time
+
+import search_memory
+from beam_search import search_solution_beam
+from instrumentation import SolveStats
+from search_memory import StatePool, paused_gc
+from simulator import create_random_state
+
+# Deals searched with the beam search
+SEEDS = [2, 5, 6]
+BEAM_WIDTH = 100
+
+# Clones kept alive to count what one clone allocates
+CLONE_COUNT = 20000
+
+
+def measure_clone_allocations(state, pool=None):
+    """
+        Returns the garbage collected objects and the allocator blocks one clone of the given state allocates, cloned
+        with the pool if one is given
+    """
+    clone = pool.clone if pool is not None else state.__class__.clone
+    clones = []
+
+    gc.collect()
+    with paused_gc():
+        objects_before = len(gc.get_objects())
+        blocks_before = sys.getallocatedblocks()
+        for i in range(CLONE_COUNT):
+            clones.append(clone(state))
+        objects = len(gc.get_objects()) - objects_before
+        blocks = sys.getallocatedblocks() - blocks_before
+
+    return objects / CLONE_COUNT, blocks / CLONE_COUNT
+
+
+class GcMonitor:
+    """
+        Counts the garbage collections and the time spent in them
+    """
+
+    def __init__(self):
+        self.collections = 0
+        self.time = 0.0
+        self.start_time = None
+
+    def callback(self, phase, info):
+        if phase == "start":
+            self.start_time = time.perf_counter()
+        else:
+            self.collections += 1
+            self.time += time.perf_counter() - self.start_time
+
+
+def measure_searches(gc_paused, pooled):
+    """
+        Runs the beam search over the test deals, returns the summed stats and the GC monitor
+        If pooled is False, the searches get a state pool that keeps nothing, so every clone is a new state
+    """
+    monitor = GcMonitor()
+    gc.callbacks.append(monitor.callback)
+
+    pool_capacity = search_memory.STATE_POOL_CAPACITY
+    if not pooled:
+        search_memory.STATE_POOL_CAPACITY = 0
+
+    total = {"time": 0.0, "expanded": 0, "clones": 0, "reused": 0}
+    try:
+        for seed in SEEDS:
+            state = create_random_state(seed)
+            stats = SolveStats()
+            with paused_gc() if gc_paused else contextlib.nullcontext():
+                search_solution_beam(state, False, stats, BEAM_WIDTH, BEAM_WIDTH)
+
+            total["time"] += stats.total_time
+            total["expanded"] += stats.expanded
+            total["clones"] += stats.calls["clone"]
+            total["reused"] += stats.reused_states
+    finally:
+        gc.callbacks.remove(monitor.callback)
+        search_memory.STATE_POOL_CAPACITY = pool_capacity
+
+    return total, monitor
+
+
+def main():
+    state = create_random_state(SEEDS[0])
+
+    fresh_objects, fresh_blocks = measure_clone_allocations(state)
+
+    pool = StatePool(CLONE_COUNT)
+    for i in range(CLONE_COUNT):
+        pool.release(state.clone())
+    pooled_objects, pooled_blocks = measure_clone_allocations(state, pool)
+
+    print("Per clone:        {0:5.1f} GC objects, {1:5.1f} allocator blocks".format(fresh_objects, fresh_blocks))
+    print("Per pooled clone: {0:5.1f} GC objects, {1:5.1f} allocator blocks".format(pooled_objects, pooled_blocks))
+    print()
+
+    # A collection runs each time the GC objects allocated since the last one, minus those freed, pass the generation 0
+    # threshold. With the GC enabled, the collections count those allocations
+    threshold = gc.get_threshold()[0]
+
+    for gc_paused, pooled in [(False, False), (False, True), (True, True)]:
+        total, monitor = measure_searches(gc_paused, pooled)
+        expanded = total["expanded"]
+
+        print("GC {0}, {1}".format("paused" if gc_paused else "enabled", "pooled" if pooled else "no pool"))
+        print("  {0:.1f} us per expanded node, {1} expanded".format(total["time"] / expanded * 1e6, expanded))
+        print("  {0} collections, {1:.3f} s in the collector".format(monitor.collections, monitor.time))
+        print("  {0:.1f} clones per expanded node, {1:.0%} reused from the pool".format(
+            total["clones"] / expanded, total["reused"] / total["clones"]))
+        if not gc_paused:
+            print("  {0:.0f} GC objects allocated per expanded node, from the collections".format(
+                monitor.collections * threshold / expanded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import collections
+import contextlib
+import io
+import os
+import random
+import time
+
+from PIL import Image, ImageChops
+
+from game_state import GameState, STACK_COUNT, INITIAL_STACK_SIZE, SUIT_NAMES, decode_card
+from recognition import crop, populate_state
+
+# Reference game views and the cards on them, as the board stacks of GameState.encode and the letters of the suit
+# stacks that were already started when the screenshot was taken. Missing cards were auto-resolved in the game
+REFERENCE_IMAGES = [
+    ("reference_img.bmp",
+     "r8b4b2r6b0/b1r7g2g0r0/r2g1r4b9b3/r0o0g0g5g7/r0b8r5g0b5/r3g9b7g3g8/b0g4r1g6r0/b0b0r9g0b6", ""),
+    ("reference_img2.bmp",
+     "g4g7b8b7b6/r0g0r6r3g2/b0b0b5g0r8/g0b4g9b2r7/b0r1b9r4/g5g6r0g1b0/r0b3r9r5g3/r2b1r0g0g8", ""),
+    ("reference_img3.bmp",
+     "g3b0r7b5/b8b1r3r8g6/b4g4r4/g0g0b0r0r0/g9b2r0r5g0/b0r0g8b0g5/b9b7r9g0/g7b6b3r6", "gr"),
+    ("reference_img4.bmp",
+     "b0r4b6r9b0/r2r0o0b5g0/g6g0r8r6b8/b0g3g5r0/g4g7b3b0g9/g2r0r7r3b9/g1g8r1g0b4/r5b7b2r0g0", "b")
+]
+
+# Times each frame is recognized for the latency
+RUN_COUNT = 3
+
+NOISE_SEED = 0
+
+
+def shift_brightness(amount):
+    return lambda image: image.point(lambda value: min(255, max(0, value + amount)))
+
+
+def add_noise(amplitude):
+    """
+        Adds uniform noise of at most the given amplitude to each color channel, the same noise for every run
+    """
+    def perturb(image):
+        rng = random.Random(NOISE_SEED)
+        noise = Image.frombytes("RGB", image.size, rng.randbytes(image.size[0] * image.size[1] * 3))
+        noise = noise.point([128 - amplitude + value * (2 * amplitude + 1) // 256 for value in range(256)] * 3)
+        return ImageChops.add(image, noise, offset=-128)
+    return perturb
+
+
+def shift_position(x, y):
+    return lambda image: ImageChops.offset(image, x, y)
+
+
+PERTURBATIONS = [
+    ("none", lambda image: image),
+    ("brightness -10", shift_brightness(-10)),
+    ("brightness -5", shift_brightness(-5)),
+    ("brightness -2", shift_brightness(-2)),
+    ("brightness +2", shift_brightness(2)),
+    ("brightness +5", shift_brightness(5)),
+    ("brightness +10", shift_brightness(10)),
+    ("noise 2", add_noise(2)),
+    ("noise 5", add_noise(5)),
+    ("noise 10", add_noise(10)),
+    ("offset 1,0", shift_position(1, 0)),
+    ("offset 0,1", shift_position(0, 1)),
+    ("offset -1,-1", shift_position(-1, -1)),
+    ("offset 2,0", shift_position(2, 0)),
+    ("offset 0,2", shift_position(0, 2)),
+    ("offset -2,2", shift_position(-2, 2))
+]
+
+
+def get_expected_positions(stacks_code):
+    """
+        Returns the expected card at each board position of the dealt stacks, None where the card was auto-resolved
+    """
+    positions = {}
+    stack_codes = stacks_code.split("/")
+    for i in range(STACK_COUNT):
+        for j in range(INITIAL_STACK_SIZE):
+            code = stack_codes[i][j * 2:j * 2 + 2]
+            positions[(i, j)] = decode_card(code) if len(code) == 2 else None
+    return positions
+
+
+def get_recognized_positions(state, missing_positions):
+    """
+        Returns the recognized card at each board position, None where no card was matched
+    """
+    positions = {}
+    for i in range(STACK_COUNT):
+        cards = iter(state.stacks[i])
+        for j in range(INITIAL_STACK_SIZE):
+            positions[(i, j)] = None if (i, j) in missing_positions else next(cards)
+    return positions
+
+
+def recognize(image):
+    """
+        Runs the recognition pipeline on a game view
+        Returns a 4-tuple (seconds, populated state, missing positions, passed validation)
+    """
+    state = GameState()
+    missing_positions = []
+    valid = True
+
+    # The recognition prints what it finds, and validation exits the process on errors
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        populate_state(crop(image), state, missing_positions)
+        populated_state = state.clone()
+        try:
+            state.validate_state()
+        except SystemExit:
+            valid = False
+        seconds = time.perf_counter() - start
+
+    return seconds, populated_state, missing_positions, valid
+
+
+def main():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    references = [(Image.open(os.path.join(directory, name)).convert("RGB"), stacks_code, order_code)
+                  for name, stacks_code, order_code in REFERENCE_IMAGES]
+
+    print("{0:<16} {1:>10} {2:>13} {3:>9} {4:>9} {5:>12} {6:>10}".format(
+        "perturbation", "ms/frame", "misclassified", "missed", "phantom", "suit order", "rejected"))
+
+    confusions = collections.Counter()
+
+    for name, perturb in PERTURBATIONS:
+        times = []
+        misclassified = 0
+        missed = 0
+        phantom = 0
+        wrong_suit_order = 0
+        rejected = 0
+        card_count = 0
+
+        for image, stacks_code, order_code in references:
+            frame = perturb(image)
+
+            frame_times = []
+            for i in range(RUN_COUNT):
+                seconds, state, missing_positions, valid = recognize(frame)
+                frame_times.append(seconds)
+            times.append(sorted(frame_times)[len(frame_times) // 2])
+
+            expected = get_expected_positions(stacks_code)
+            recognized = get_recognized_positions(state, missing_positions)
+            for position in expected:
+                if expected[position] is None and recognized[position] is None:
+                    continue
+                card_count += 1
+
+                # A card that was not matched is silently assumed to be auto-resolved by the recognition
+                if recognized[position] is None:
+                    missed += 1
+                elif expected[position] is None:
+                    phantom += 1
+                elif recognized[position] != expected[position]:
+                    misclassified += 1
+                else:
+                    continue
+                confusions[(expected[position], recognized[position])] += 1
+
+            if state.suit_insert_order != [SUIT_NAMES[letter] for letter in order_code]:
+                wrong_suit_order += 1
+            if not valid:
+                rejected += 1
+
+        times.sort()
+        print("{0:<16} {1:10.1f} {2:>13} {3:>9} {4:>9} {5:>12} {6:>10}".format(
+            name, times[len(times) // 2] * 1000, "{0}/{1}".format(misclassified, card_count), missed, phantom,
+            "{0}/{1}".format(wrong_suit_order, len(references)), "{0}/{1}".format(rejected, len(references))))
+
+    if len(confusions) > 0:
+        print()
+        print("Most common errors, expected -> recognized:")
+        for (expected_card, recognized_card), count in confusions.most_common(10):
+            print("  {0} -> {1}: {2}".format(expected_card, recognized_card, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import os
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from benchmark_recognition import REFERENCE_IMAGES, get_expected_positions, get_recognized_positions, recognize
+from deal_watcher import DealWatcher, FrameSequence
+from game_state import STACK_COUNT
+from layout import BOARD_TOP_LEFT, BOARD_HORIZONTAL_DELIMITER, BOARD_VERTICAL_DELIMITER
+from recognition import CARD_BASE_COLOR, crop
+
+# The game animates at this rate, each card of the deal takes DEAL_FRAMES_PER_CARD frames to land
+FRAME_INTERVAL = 1 / 30
+DEAL_FRAMES_PER_CARD = 2
+
+# The synthetic animation: the board of the previous game, the cleared board, then the deal card by card
+PREVIOUS_FRAME_COUNT = 30
+EMPTY_FRAME_COUNT = 10
+CARD_SIZE = (120, 230)
+DEAL_START = (20, 20)
+BOARD_COLOR_POSITION = (40, 300)
+
+# Poll intervals the watcher is run with
+POLL_INTERVALS = [0.05, 0.1, 0.2, 0.3]
+
+# Polls timed for the polling cost
+POLL_RUN_COUNT = 50
+
+
+def get_card_box(stack_index, card_index):
+    left = BOARD_TOP_LEFT[0] + stack_index * BOARD_HORIZONTAL_DELIMITER
+    top = BOARD_TOP_LEFT[1] + card_index * BOARD_VERTICAL_DELIMITER
+    return left, top, left + CARD_SIZE[0], top + CARD_SIZE[1]
+
+
+def draw_deal_frame(view, stack_lengths, dealt_count, flying_fraction=None):
+    """
+        Returns the game view with only the first dealt_count cards of the deal on the board, dealt one row at a time.
+        If flying_fraction is given, the next card is drawn that far on its way from DEAL_START
+    """
+    frame = view.copy()
+    draw = ImageDraw.Draw(frame)
+    board_color = view.getpixel(BOARD_COLOR_POSITION)
+
+    positions = [(j, i) for j in range(max(stack_lengths)) for i in range(STACK_COUNT) if j < stack_lengths[i]]
+    dealt_rows = [0] * STACK_COUNT
+    for card_index, stack_index in positions[:dealt_count]:
+        dealt_rows[stack_index] = card_index + 1
+
+    for i in range(STACK_COUNT):
+        if dealt_rows[i] < stack_lengths[i]:
+            left, top, right, _ = get_card_box(i, dealt_rows[i])
+            bottom = get_card_box(i, stack_lengths[i] - 1)[3]
+            draw.rectangle((left, top, right, bottom), fill=board_color)
+
+    if flying_fraction is not None and dealt_count < len(positions):
+        card_index, stack_index = positions[dealt_count]
+        left, top = get_card_box(stack_index, card_index)[:2]
+        x = DEAL_START[0] + (left - DEAL_START[0]) * flying_fraction
+        y = DEAL_START[1] + (top - DEAL_START[1]) * flying_fraction
+        draw.rectangle((x, y, x + CARD_SIZE[0], y + CARD_SIZE[1]), fill=CARD_BASE_COLOR, outline=(0, 0, 0))
+
+    return frame
+
+
+def write_deal_frames(directory, previous_view, view, stacks_code):
+    """
+        Writes the synthetic animation of dealing the given game view as BMP files
+        Returns a 2-tuple (frame paths, index of the first frame with the whole deal on the board). Frames that stay on
+        for several frame intervals are listed several times
+    """
+    stack_lengths = [len(code) // 2 for code in stacks_code.split("/")]
+    card_count = sum(stack_lengths)
+
+    def save(image, name):
+        path = os.path.join(directory, name + ".bmp")
+        image.save(path)
+        return path
+
+    paths = [save(previous_view, "previous")] * PREVIOUS_FRAME_COUNT
+    paths += [save(draw_deal_frame(view, stack_lengths, 0), "empty")] * EMPTY_FRAME_COUNT
+
+    for dealt_count in range(card_count):
+        for frame_index in range(DEAL_FRAMES_PER_CARD):
+            frame = draw_deal_frame(view, stack_lengths, dealt_count, (frame_index + 1) / (DEAL_FRAMES_PER_CARD + 1))
+            paths.append(save(frame, "deal{0:02d}_{1}".format(dealt_count, frame_index)))
+
+    deal_end = len(paths)
+    paths.append(save(view, "dealt"))
+    return paths, deal_end
+
+
+def count_misread(image, stacks_code):
+    """
+        Returns how many board positions are recognized wrong from the given game view, and if it passes validation
+    """
+    _, state, missing_positions, valid = recognize(image)
+    expected = get_expected_positions(stacks_code)
+    recognized = get_recognized_positions(state, missing_positions)
+    return len([position for position in expected if expected[position] != recognized[position]]), valid
+
+
+def measure_poll_time(view):
+    """
+        Returns the seconds one poll of the watcher takes on an in-memory frame, sampling and comparing the tiles
+    """
+    watcher = DealWatcher(FrameSequence([view], FRAME_INTERVAL))
+    previous_sample = watcher.sample()
+
+    times = []
+    for i in range(POLL_RUN_COUNT):
+        start = time.perf_counter()
+        sample = watcher.sample()
+        watcher.get_difference(previous_sample, sample)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def run_synthetic():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    views = [crop(Image.open(os.path.join(directory, name)).convert("RGB")) for name, _, _ in REFERENCE_IMAGES]
+
+    poll_time = measure_poll_time(views[0])
+    recognition_time = min(recognize(views[0])[0] for i in range(3))
+    print("{0:.2f} ms per poll, {1:.1f} ms per full recognition".format(poll_time * 1000, recognition_time * 1000))
+    print()
+
+    print("{0:<20} {1:>9} {2:>6} {3:>11} {4:>8} {5:>9}".format(
+        "image", "interval", "polls", "latency ms", "misread", "rejected"))
+
+    for index in range(len(REFERENCE_IMAGES)):
+        name, stacks_code, _ = REFERENCE_IMAGES[index]
+        previous_view = views[index - 1]
+
+        with tempfile.TemporaryDirectory() as frame_directory:
+            paths, deal_end = write_deal_frames(frame_directory, previous_view, views[index], stacks_code)
+
+            for interval in POLL_INTERVALS:
+                source = FrameSequence(paths, FRAME_INTERVAL)
+                watcher = DealWatcher(source, interval)
+                image = watcher.wait_for_deal(timeout=len(paths) * FRAME_INTERVAL + 5)
+
+                if image is None:
+                    print("{0:<20} {1:9.2f} {2:>6} no deal found".format(name, interval, watcher.poll_count))
+                    continue
+
+                # Negative latency means the watcher fired before the deal animation was over
+                latency = source.now() - deal_end * FRAME_INTERVAL
+                misread, valid = count_misread(image, stacks_code)
+                print("{0:<20} {1:9.2f} {2:>6} {3:11.0f} {4:>8} {5:>9}".format(
+                    name, interval, watcher.poll_count, latency * 1000, misread, "no" if valid else "yes"))
+
+
+def run_frames(directory, interval):
+    """
+        Runs the watcher on a captured sequence of BMP screenshots, taken FRAME_INTERVAL apart
+    """
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".bmp"))
+    source = FrameSequence(paths, FRAME_INTERVAL)
+    watcher = DealWatcher(source, interval)
+    image = watcher.wait_for_deal(timeout=len(paths) * FRAME_INTERVAL + 5, require_change=False)
+
+    if image is None:
+        print("No deal found in", len(paths), "frames after", watcher.poll_count, "polls")
+        return
+
+    print("Deal found at frame", os.path.basename(paths[source.get_frame_index()]), "after", watcher.poll_count,
+          "polls")
+    _, state, missing_positions, valid = recognize(image)
+    print(state)
+    print("Passed validation" if valid else "Rejected by validation")
+
+
+def main():
+    if len(sys.argv) > 1:
+        run_frames(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else POLL_INTERVALS[1])
+    else:
+        run_synthetic()
+
+
+if __name__ == "__main__":
+    main()
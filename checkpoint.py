@@ -0,0 +1,206 @@
+import os
+import pickle
+import threading
+import time
+import zlib
+
+from game_state import decode_state, encode_history, decode_history
+
+# Checkpoints are written at most this often, in seconds
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+CHECKPOINT_MAGIC = b"SHZCKPT1"
+
+
+class CheckpointWriter:
+    """
+        Writes checkpoints of a running search from a background thread
+
+        The search asks is_due at a safe point of its loop and hands over a snapshot made of references to its
+        structures. Search states are not changed after they are created, so the snapshot can be written later. Encoding
+        the states and pickling them hold the GIL, so they take turns with the search rather than running next to it.
+        Only the compression and the file write, a small part of the work, overlap with the search. If the previous
+        checkpoint is still being written when the next one is due, the new one is skipped, so at most one checkpoint is
+        in progress at a time
+
+        A checkpoint is due after interval seconds, or after state_interval new states if that is given
+        start_state_code is the encoded starting state of the search, see close. It is taken from the first snapshot if
+        it is not given
+    """
+
+    def __init__(self, path, interval=DEFAULT_CHECKPOINT_INTERVAL, state_interval=None, start_state_code=None):
+        self.path = path
+        self.interval = interval
+        self.state_interval = state_interval
+        self.start_state_code = start_state_code
+
+        self.last_time = time.perf_counter()
+        self.last_states_searched = 0
+
+        self.write_count = 0
+        self.skip_count = 0
+
+        # The transposition table only grows, so the states already encoded are kept and only new ones are encoded
+        self.seen_codes = []
+
+        self.snapshot = None
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def is_due(self, states_searched):
+        """
+            Returns True if a checkpoint should be submitted now
+        """
+        if self.state_interval is not None and states_searched - self.last_states_searched >= self.state_interval:
+            return True
+        return time.perf_counter() - self.last_time >= self.interval
+
+    def submit(self, snapshot):
+        """
+            Hands a snapshot to the background thread, see get_snapshot for its fields
+        """
+        self.last_time = time.perf_counter()
+        self.last_states_searched = snapshot["states_searched"]
+        if self.start_state_code is None:
+            self.start_state_code = snapshot["start"]
+
+        with self.condition:
+            if self.snapshot is not None:
+                self.skip_count += 1
+                return
+            self.snapshot = snapshot
+            self.condition.notify()
+
+    def close(self, remove=False):
+        """
+            Waits for the checkpoint in progress and stops the background thread
+            If remove is True, the checkpoint file is removed, for searches that finished. Only a checkpoint of the same
+            starting state is removed, the file may hold the checkpoint of another deal if no search has run
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+        if not remove or self.start_state_code is None or not os.path.exists(self.path):
+            return
+        if get_checkpoint_start(self.path) == self.start_state_code:
+            os.remove(self.path)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.snapshot is None and not self.closed:
+                    self.condition.wait()
+                if self.snapshot is None:
+                    return
+                snapshot = self.snapshot
+
+            write_checkpoint(self.path, snapshot, self.seen_codes)
+            self.write_count += 1
+
+            with self.condition:
+                self.snapshot = None
+
+
+def get_snapshot(start_state_code, frontier, state_history, shortest_solution, shortest_solution_suit_order,
+                 highest_heuristic, states_searched):
+    """
+        Returns a snapshot of the search structures for CheckpointWriter.submit. Only the containers are copied, the
+        states and histories in them are shared with the search
+    """
+    return {
+        "start": start_state_code,
+        "frontier": list(frontier),
+        "seen": list(state_history.values()),
+        "shortest_solution": shortest_solution,
+        "suit_order": shortest_solution_suit_order,
+        "highest_heuristic": highest_heuristic,
+        "states_searched": states_searched
+    }
+
+
+def write_checkpoint(path, snapshot, seen_codes=None):
+    """
+        Encodes a snapshot and writes it into the given file, replacing the previous checkpoint only once it is complete
+        seen_codes can be a list of the encoded states of an earlier snapshot of the same search, it is extended
+    """
+    if seen_codes is None:
+        seen_codes = []
+    for state in snapshot["seen"][len(seen_codes):]:
+        seen_codes.append(state.encode())
+
+    data = {
+        "start": snapshot["start"],
+        "frontier": [(item[0].encode(), item[0].actions_taken, encode_history(item[1]), item[2])
+                     for item in snapshot["frontier"]],
+        "seen": seen_codes[:len(snapshot["seen"])],
+        "shortest_solution": encode_history(snapshot["shortest_solution"]),
+        "suit_order": snapshot["suit_order"],
+        "highest_heuristic": snapshot["highest_heuristic"],
+        "states_searched": snapshot["states_searched"]
+    }
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        checkpoint_file.write(CHECKPOINT_MAGIC)
+        checkpoint_file.write(zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL)))
+    os.replace(temporary_path, path)
+
+
+def read_checkpoint_data(path):
+    """
+        Reads the encoded data of a checkpoint written by write_checkpoint, without decoding the states
+        Returns None if the file is not a checkpoint
+    """
+    with open(path, "rb") as checkpoint_file:
+        content = checkpoint_file.read()
+
+    if not content.startswith(CHECKPOINT_MAGIC):
+        return None
+
+    try:
+        return pickle.loads(zlib.decompress(content[len(CHECKPOINT_MAGIC):]))
+    except (zlib.error, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def get_checkpoint_start(path):
+    """
+        Returns the encoded starting state of the search the checkpoint in the given file is of, or None if the file is
+        not a checkpoint
+    """
+    data = read_checkpoint_data(path)
+    if data is None:
+        return None
+    return data["start"]
+
+
+def load_checkpoint(path):
+    """
+        Reads a checkpoint written by write_checkpoint
+        Returns a dict with the starting state code, the frontier as search items (state, history, heuristic), the seen
+        states, the best plan, its suit order, its heuristic value and the number of states searched
+        Returns None if the file is not a checkpoint
+    """
+    data = read_checkpoint_data(path)
+    if data is None:
+        return None
+
+    frontier = []
+    for state_code, actions_taken, history_code, heuristic in data["frontier"]:
+        state = decode_state(state_code)
+        state.actions_taken = actions_taken
+        frontier.append((state, decode_history(history_code), heuristic))
+
+    return {
+        "start": data["start"],
+        "frontier": frontier,
+        "seen": [decode_state(state_code) for state_code in data["seen"]],
+        "shortest_solution": decode_history(data["shortest_solution"]),
+        "suit_order": data["suit_order"],
+        "highest_heuristic": data["highest_heuristic"],
+        "states_searched": data["states_searched"]
+    }
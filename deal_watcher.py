@@ -0,0 +1,190 @@
+import time
+
+from layout import GAME_WIDTH, GAME_HEIGHT, WATCH_TILES, WATCH_STACK_TILES
+from recognition import CARD_BASE_COLOR, crop, color_distance
+
+# How often the tiles are polled, in seconds
+WATCH_POLL_INTERVAL = 0.1
+
+# How many polls in a row without changes count as a stable board
+WATCH_STABLE_FRAMES = 3
+
+# Mean difference of the color channels of a tile between two polls that counts as a change, to ignore capture noise
+WATCH_DIFFERENCE_THRESHOLD = 2.0
+
+# A stack tile only counts as dealt if its average color is this close to the card color. A dealt tile is covered by
+# cards apart from the value glyphs, a tile with a missing row shows the board through it
+WATCH_CARD_COLOR_DISTANCE = 40
+
+
+class FrameSource:
+    """
+        Interface for the frames the deal watcher polls, and the clock it waits on
+        Boxes are (left, top, right, bottom) in game view coordinates
+    """
+
+    def grab(self, box):
+        raise NotImplementedError()
+
+    def sleep(self, seconds):
+        raise NotImplementedError()
+
+    def now(self):
+        raise NotImplementedError()
+
+
+class ScreenFrameSource(FrameSource):
+    """
+        Grabs the frames from the screen using pyscreenshot, only the given box of the game view each time
+        Positions are converted from game coordinates with to_screen
+    """
+
+    def __init__(self, to_screen):
+        # Imported here so the other sources work without a display
+        import pyscreenshot as ImageGrab
+
+        self.image_grab = ImageGrab
+        self.to_screen = to_screen
+
+    def grab(self, box):
+        left, top = self.to_screen((box[0], box[1]))
+        right, bottom = self.to_screen((box[2], box[3]))
+        return self.image_grab.grab(bbox=(int(left), int(top), int(right), int(bottom)))
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return time.perf_counter()
+
+
+class FrameSequence(FrameSource):
+    """
+        Plays back saved frames on a simulated clock instead of the screen, one frame every frame_interval seconds. The
+        last frame stays on once the sequence has played
+        Frames are paths of saved screenshots, like the --image option takes, or already cropped game view images
+    """
+
+    def __init__(self, frames, frame_interval):
+        self.frames = list(frames)
+        self.frame_interval = frame_interval
+
+        self.clock = 0.0
+        self.grab_count = 0
+
+    def grab(self, box):
+        self.grab_count += 1
+        return self.get_frame().crop(box)
+
+    def sleep(self, seconds):
+        self.clock += seconds
+
+    def now(self):
+        return self.clock
+
+    def get_frame_index(self):
+        """
+            Returns the index of the frame shown at the current time
+        """
+        return min(int(self.clock / self.frame_interval), len(self.frames) - 1)
+
+    def get_frame(self):
+        """
+            Returns the game view shown at the current time, loading it if it is a path
+        """
+        index = self.get_frame_index()
+        frame = self.frames[index]
+        if isinstance(frame, str):
+            from PIL import Image
+
+            frame = crop(Image.open(frame).convert("RGB"))
+            self.frames[index] = frame
+        return frame
+
+
+class DealWatcher:
+    """
+        Waits for a new deal by polling a few tiles of the game view instead of recognizing whole frames
+
+        Each poll grabs only the area around WATCH_TILES and compares every tile with the previous poll. The deal
+        animation and the auto-resolves after it keep changing the tiles, so the deal is taken to be finished once the
+        tiles have not changed for stable_frames polls in a row and every stack tile is covered by cards. Only then is
+        the whole game view grabbed for recognition
+    """
+
+    def __init__(self, source, interval=WATCH_POLL_INTERVAL, stable_frames=WATCH_STABLE_FRAMES,
+                 threshold=WATCH_DIFFERENCE_THRESHOLD):
+        self.source = source
+        self.interval = interval
+        self.stable_frames = stable_frames
+        self.threshold = threshold
+
+        # The polled area, and the tiles relative to it
+        self.box = (min(tile[0] for tile in WATCH_TILES), min(tile[1] for tile in WATCH_TILES),
+                    max(tile[2] for tile in WATCH_TILES), max(tile[3] for tile in WATCH_TILES))
+        self.tiles = [(tile[0] - self.box[0], tile[1] - self.box[1], tile[2] - self.box[0], tile[3] - self.box[1])
+                      for tile in WATCH_TILES]
+
+        self.poll_count = 0
+
+    def wait_for_deal(self, timeout=None, require_change=True):
+        """
+            Polls the tiles until a deal is on the board and has stopped changing
+            If require_change is True, the board must change first, so the deal that was on the board when the watch
+            started is not taken again. Otherwise a deal that is already on the board is taken as well
+            Returns the whole game view image, or None if no deal was found within timeout seconds
+        """
+        start = self.source.now()
+        previous_sample = None
+        stable_frames = 0
+        changed = not require_change
+
+        while True:
+            sample = self.sample()
+            if previous_sample is not None:
+                if self.get_difference(previous_sample, sample) > self.threshold:
+                    stable_frames = 0
+                    changed = True
+                else:
+                    stable_frames += 1
+            previous_sample = sample
+
+            if changed and stable_frames >= self.stable_frames and is_dealt(sample):
+                return self.source.grab((0, 0, GAME_WIDTH, GAME_HEIGHT))
+
+            if timeout is not None and self.source.now() - start >= timeout:
+                return None
+            self.source.sleep(self.interval)
+
+    def sample(self):
+        """
+            Grabs the polled area once and returns the pixel data of each tile, in the order of WATCH_TILES
+        """
+        self.poll_count += 1
+        image = self.source.grab(self.box)
+        return [image.crop(tile).tobytes() for tile in self.tiles]
+
+    def get_difference(self, previous_sample, sample):
+        """
+            Returns the largest mean difference of the color channels of a tile between two samples
+        """
+        difference = 0.0
+        for i in range(len(sample)):
+            if previous_sample[i] == sample[i]:
+                continue
+            total = sum(abs(a - b) for a, b in zip(previous_sample[i], sample[i]))
+            difference = max(difference, total / len(sample[i]))
+        return difference
+
+
+def is_dealt(sample):
+    """
+        Returns True if every stack tile of the sample is covered by cards
+    """
+    for i in range(len(WATCH_STACK_TILES)):
+        data = sample[i]
+        pixel_count = len(data) // 3
+        average_color = (sum(data[0::3]) / pixel_count, sum(data[1::3]) / pixel_count, sum(data[2::3]) / pixel_count)
+        if color_distance(average_color, CARD_BASE_COLOR) >= WATCH_CARD_COLOR_DISTANCE:
+            return False
+    return True
@@ -0,0 +1,119 @@
+from game_state import SUIT_STACK_COUNT
+
+# Positions with fewer cards than this in the stacks are solved exactly. Same limit as the endgame of
+# GameState.get_heuristic_value
+ENDGAME_CARD_THRESHOLD = 10
+
+# Finishing sequences longer than this are not searched for
+ENDGAME_MAX_DEPTH = 30
+
+# The endgame search gives up after expanding this many states
+ENDGAME_NODE_LIMIT = 20000
+
+
+class EndgameLimitReached(Exception):
+    pass
+
+
+def solve_endgame(state, max_depth=ENDGAME_MAX_DEPTH, node_limit=ENDGAME_NODE_LIMIT, memo=None):
+    """
+        Finds the shortest sequence of actions that wins the game from the given state
+
+        Iterative deepening depth-first search. Every state is memoized with the largest depth it is known to not be
+        winnable in, which stays true for the deeper iterations, so no state is searched twice for the same depth
+        The memo stays true for other calls too. A search that tries many positions of the same game can pass the same
+        dict as memo to every call, so the failures found by earlier calls are not searched again
+        Returns a 2-tuple (actions, suit_insert_order) with the resolve entries like search_solution, or None if there
+        is no finishing sequence within max_depth actions or node_limit expanded states
+    """
+    if memo is None:
+        memo = {}
+    counter = [0]
+
+    try:
+        for depth in range(get_lower_bound(state), max_depth + 1):
+            result = _search(state, depth, memo, counter, node_limit)
+            if result is not None:
+                actions, won_state = result
+                return actions, won_state.suit_insert_order
+    except EndgameLimitReached:
+        pass
+
+    return None
+
+
+def _search(state, depth, memo, counter, node_limit):
+    """
+        Returns a 2-tuple (actions, won state) for a win within depth actions, or None
+    """
+    if state.is_won():
+        return [], state
+    if depth == 0 or get_lower_bound(state) > depth:
+        return None
+
+    key = get_state_key(state)
+    if memo.get(key, -1) >= depth:
+        return None
+
+    counter[0] += 1
+    if counter[0] > node_limit:
+        raise EndgameLimitReached()
+
+    for action in state.get_legal_actions():
+        clone = state.clone()
+        clone.apply_action(action)
+        resolved_count = clone.auto_resolve()
+
+        result = _search(clone, depth - 1, memo, counter, node_limit)
+        if result is not None:
+            actions, won_state = result
+            prefix = [action]
+            if resolved_count > 0:
+                prefix.append(((None, None), ("resolve", resolved_count)))
+            return prefix + actions, won_state
+
+    memo[key] = depth
+    return None
+
+
+def finish_plan(state, actions, suit_insert_order, card_threshold=ENDGAME_CARD_THRESHOLD):
+    """
+        Replays the plan from the given state, and if it ends in a position with fewer than card_threshold cards that is
+        not won yet, appends the shortest finishing sequence to it
+        Returns a 2-tuple (actions, suit_insert_order)
+    """
+    final_state = state.clone()
+    for action in actions:
+        if action[1][0] != "resolve":
+            final_state.apply_action(action)
+            final_state.auto_resolve()
+
+    if final_state.is_won() or final_state.get_total_card_count() >= card_threshold:
+        return actions, suit_insert_order
+
+    endgame = solve_endgame(final_state)
+    if endgame is None:
+        return actions, suit_insert_order
+
+    return actions + endgame[0], endgame[1]
+
+
+def get_lower_bound(state):
+    """
+        Returns a lower bound of the actions needed to win: every suit whose tokens are not discarded yet needs its own
+        discard action
+        Discarded token piles are kept in the open slots, so there is one for every discarded suit
+    """
+    discarded_count = 0
+    for card in state.open_slots:
+        if card is not None and card[1] == -1:
+            discarded_count += 1
+    return SUIT_STACK_COUNT - discarded_count
+
+
+def get_state_key(state):
+    """
+        Returns the part of the encoded state that decides how the game can go on: the stacks, the open slots and the
+        suit stack values
+    """
+    return state.encode().rsplit("|", 1)[0]
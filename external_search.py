@@ -0,0 +1,377 @@
+import heapq
+import math
+import os
+import shutil
+import tempfile
+
+from game_state import decode_state, encode_history, decode_history
+from endgame import ENDGAME_CARD_THRESHOLD
+from search import MAX_SOLUTION_LENGTH, get_children_function, get_endgame_function
+from search_memory import StatePool
+from instrumentation import get_search_functions
+
+# How many frontier nodes are kept in memory before the lowest priority buckets are spilled to disk
+DEFAULT_FRONTIER_MEMORY_LIMIT = 200000
+
+# How many visited state keys are kept in memory before they are written into a sorted run file
+DEFAULT_SEEN_MEMORY_LIMIT = 500000
+
+# How many new states are collected before they are checked for duplicates together
+DEFAULT_BATCH_SIZE = 512
+
+# Sorted run files of visited states are merged into one when there are more than this many
+MAX_RUN_FILES = 8
+
+# The out-of-core search is meant for hard deals, so it searches further than the in-memory search before giving up
+DEFAULT_STATE_LIMIT = 1000000
+
+
+class ExternalFrontier:
+    """
+        Priority frontier of encoded search nodes that spills to disk
+
+        Nodes are bucketed by the integer part of their heuristic value. Buckets are kept in memory as heaps until the
+        frontier holds more than memory_limit nodes, then the lowest buckets are appended to one sequential file per
+        bucket. A bucket on disk is read back in whole when it becomes the best bucket. Within a bucket the node with the
+        highest heuristic is popped first, and the most recently pushed one of equal nodes, like the in-memory search
+    """
+
+    def __init__(self, directory, memory_limit):
+        self.directory = directory
+        self.memory_limit = memory_limit
+
+        # Bucket -> heap of (-heuristic, -sequence, state_code, history_code)
+        self.buckets = {}
+        self.memory_count = 0
+        self.peak_memory_count = 0
+
+        # Bucket -> number of nodes in its file
+        self.disk_counts = {}
+
+        self.sequence = 0
+
+    def __len__(self):
+        return self.memory_count + sum(self.disk_counts.values())
+
+    def push(self, heuristic, state_code, history_code):
+        """
+            Adds an encoded node to the frontier
+        """
+        self.sequence += 1
+        self._push_item((-heuristic, -self.sequence, state_code, history_code))
+
+        if self.memory_count > self.peak_memory_count:
+            self.peak_memory_count = self.memory_count
+
+        if self.memory_count > self.memory_limit:
+            self._spill()
+
+    def pop(self):
+        """
+            Removes and returns the best node as a 3-tuple (heuristic, state_code, history_code), or None if empty
+        """
+        best_memory_bucket = max(self.buckets) if len(self.buckets) > 0 else None
+        best_disk_bucket = max(self.disk_counts) if len(self.disk_counts) > 0 else None
+
+        if best_disk_bucket is not None and (best_memory_bucket is None or best_disk_bucket >= best_memory_bucket):
+            self._load(best_disk_bucket)
+            best_memory_bucket = best_disk_bucket
+
+        if best_memory_bucket is None:
+            return None
+
+        heap = self.buckets[best_memory_bucket]
+        item = heapq.heappop(heap)
+        if len(heap) == 0:
+            del self.buckets[best_memory_bucket]
+        self.memory_count -= 1
+
+        return -item[0], item[2], item[3]
+
+    def _push_item(self, item):
+        bucket = math.floor(-item[0])
+        if bucket not in self.buckets:
+            self.buckets[bucket] = []
+        heapq.heappush(self.buckets[bucket], item)
+        self.memory_count += 1
+
+    def _spill(self):
+        """
+            Writes the lowest buckets to disk until half of the memory limit is used. The best bucket stays in memory
+        """
+        for bucket in sorted(self.buckets):
+            if self.memory_count <= self.memory_limit // 2 or len(self.buckets) == 1:
+                break
+
+            heap = self.buckets.pop(bucket)
+            with open(self._get_bucket_path(bucket), "a") as bucket_file:
+                for item in heap:
+                    bucket_file.write(repr(-item[0]) + "\t" + str(-item[1]) + "\t" + item[2] + "\t" + item[3] + "\n")
+
+            self.memory_count -= len(heap)
+            self.disk_counts[bucket] = self.disk_counts.get(bucket, 0) + len(heap)
+
+    def _load(self, bucket):
+        """
+            Reads a bucket back from disk into memory
+        """
+        path = self._get_bucket_path(bucket)
+        with open(path) as bucket_file:
+            for line in bucket_file:
+                heuristic, sequence, state_code, history_code = line.rstrip("\n").split("\t")
+                self._push_item((-float(heuristic), -int(sequence), state_code, history_code))
+
+        os.remove(path)
+        del self.disk_counts[bucket]
+
+        if self.memory_count > self.memory_limit:
+            self._spill()
+
+    def _get_bucket_path(self, bucket):
+        return os.path.join(self.directory, "bucket_" + str(bucket) + ".txt")
+
+
+class SeenStore:
+    """
+        The visited states of the search, for delayed duplicate detection
+
+        Keys are kept in a set until there are more than memory_limit of them, then they are written into a sorted run
+        file. New states are checked in sorted batches, which only needs one sequential pass over each run file
+    """
+
+    def __init__(self, directory, memory_limit):
+        self.directory = directory
+        self.memory_limit = memory_limit
+
+        self.keys = set()
+        self.run_paths = []
+        self.run_count = 0
+
+    def filter_new(self, sorted_keys):
+        """
+            Returns the keys of the given sorted list of unique keys that have not been seen
+        """
+        new_keys = [key for key in sorted_keys if key not in self.keys]
+        for path in self.run_paths:
+            if len(new_keys) == 0:
+                break
+            new_keys = remove_keys_in_run(new_keys, path)
+        return new_keys
+
+    def add(self, keys):
+        """
+            Marks the given keys as seen
+        """
+        self.keys.update(keys)
+        if len(self.keys) > self.memory_limit:
+            self._write_run(sorted(self.keys))
+            self.keys = set()
+
+            if len(self.run_paths) > MAX_RUN_FILES:
+                self._merge_runs()
+
+    def _write_run(self, sorted_keys):
+        self.run_count += 1
+        path = os.path.join(self.directory, "seen_" + str(self.run_count) + ".txt")
+        with open(path, "w") as run_file:
+            for key in sorted_keys:
+                run_file.write(key + "\n")
+        self.run_paths.append(path)
+
+    def _merge_runs(self):
+        """
+            Merges all run files into one
+        """
+        run_files = [open(path) for path in self.run_paths]
+        self.run_count += 1
+        path = os.path.join(self.directory, "seen_" + str(self.run_count) + ".txt")
+
+        with open(path, "w") as merged_file:
+            for line in heapq.merge(*run_files):
+                merged_file.write(line)
+
+        for run_file in run_files:
+            run_file.close()
+        for run_path in self.run_paths:
+            os.remove(run_path)
+        self.run_paths = [path]
+
+
+def remove_keys_in_run(sorted_keys, path):
+    """
+        Returns the given sorted keys that are not in the sorted run file, reading the file once
+    """
+    remaining = []
+    index = 0
+
+    with open(path) as run_file:
+        for line in run_file:
+            run_key = line.rstrip("\n")
+            while index < len(sorted_keys) and sorted_keys[index] < run_key:
+                remaining.append(sorted_keys[index])
+                index += 1
+            if index < len(sorted_keys) and sorted_keys[index] == run_key:
+                index += 1
+            if index >= len(sorted_keys):
+                break
+
+    remaining += sorted_keys[index:]
+    return remaining
+
+
+def search_solution_external(state, verbose=True, stats=None, directory=None,
+                             frontier_memory_limit=DEFAULT_FRONTIER_MEMORY_LIMIT,
+                             seen_memory_limit=DEFAULT_SEEN_MEMORY_LIMIT, batch_size=DEFAULT_BATCH_SIZE,
+                             state_limit=DEFAULT_STATE_LIMIT, endgame_card_threshold=ENDGAME_CARD_THRESHOLD,
+                             use_macros=True):
+    """
+        Out-of-core version of search_solution for hard deals
+
+        The children, macro actions and endgames are the same as in search_solution, only the storage differs. The
+        frontier and the visited states are kept as encoded strings and spill to files in the given directory, or a
+        temporary directory that is removed afterwards, so the memory used stays bounded by the memory limits. New
+        states are checked for duplicates in sorted batches of batch_size
+        Returns a 2-tuple (actions, suit_insert_order) like search_solution
+    """
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix="solver_frontier_")
+
+    try:
+        frontier = ExternalFrontier(directory, frontier_memory_limit)
+        seen = SeenStore(directory, seen_memory_limit)
+        return _search(state, frontier, seen, verbose, stats, batch_size, state_limit, endgame_card_threshold,
+                       use_macros)
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _search(state, frontier, seen, verbose, stats, batch_size, state_limit, endgame_card_threshold, use_macros):
+    # Every state is encoded right away, so the GameStates are recycled for the next clones
+    pool = StatePool()
+
+    # Pick the functions called by the search, timed ones if stats are collected
+    functions = get_search_functions(pool, stats)
+    release_state = functions[1]
+    get_heuristic_value = functions[4]
+    get_children = get_children_function(functions, stats, use_macros)
+    finish_endgame = get_endgame_function(stats, endgame_card_threshold)
+
+    if stats is not None:
+        stats.start()
+
+    state_code = state.encode()
+    frontier.push(0, state_code, "")
+    seen.add([get_state_key(state_code)])
+
+    # New states waiting for duplicate detection, as (key, heuristic, state_code, history_code)
+    pending = []
+
+    shortest_solution = []
+    shortest_solution_suit_order = []
+    highest_heuristic = -999
+
+    states_searched = 0
+    last_states_searched_print = 0
+
+    while True:
+        if states_searched > state_limit and highest_heuristic * 2000 < states_searched:
+            break
+        if verbose and states_searched - last_states_searched_print > 10000:
+            print("Heuristic:", highest_heuristic)
+            last_states_searched_print = states_searched
+            print(frontier.memory_count, len(frontier) - frontier.memory_count, states_searched)
+
+        # Check the collected states for duplicates and add the new ones to the frontier
+        if len(pending) >= batch_size or (len(frontier) == 0 and len(pending) > 0):
+            pending.sort(key=get_pending_key)
+            unique = []
+            for item in pending:
+                if len(unique) == 0 or unique[-1][0] != item[0]:
+                    unique.append(item)
+            pending = []
+
+            new_keys = set(seen.filter_new([item[0] for item in unique]))
+            seen.add(new_keys)
+
+            for item in unique:
+                if item[0] not in new_keys:
+                    continue
+
+                heuristic_score = item[1]
+                if heuristic_score >= highest_heuristic:
+                    highest_heuristic = heuristic_score
+                    shortest_solution = decode_history(item[3])
+                    shortest_solution_suit_order = decode_state(item[2]).suit_insert_order
+
+                frontier.push(heuristic_score, item[2], item[3])
+                states_searched += 1
+
+        node = frontier.pop()
+        if node is None:
+            if verbose:
+                print("Unable to find solution")
+            break
+
+        heuristic, state_code, history_code = node
+        current_history = decode_history(history_code)
+
+        if len(current_history) > MAX_SOLUTION_LENGTH and heuristic < 30:
+            continue
+
+        current_state = decode_state(state_code)
+        current_state.actions_taken = len([action for action in current_history if action[1][0] != "resolve"])
+
+        # Try to finish small positions exactly. If that fails, the heuristic still accepts them below
+        endgame = finish_endgame(current_state)
+        if endgame is not None:
+            shortest_solution = current_history + endgame[0]
+            shortest_solution_suit_order = endgame[1]
+            if verbose:
+                print("Solved endgame in", len(endgame[0]), "actions")
+                print("New shortest solution", len(shortest_solution))
+                print("States searched:", states_searched)
+                print("Frontier size:", len(frontier))
+                print()
+            break
+
+        if heuristic >= 100:
+            shortest_solution = current_history
+            shortest_solution_suit_order = current_state.suit_insert_order
+            if verbose:
+                print("New shortest solution", len(current_history))
+                print("States searched:", states_searched)
+                print("Frontier size:", len(frontier))
+                print()
+            break
+
+        for clone, actions in get_children(current_state):
+            new_history_code = encode_history(actions)
+            if len(history_code) > 0:
+                new_history_code = history_code + ";" + new_history_code
+
+            clone_code = clone.encode()
+            pending.append((get_state_key(clone_code), get_heuristic_value(clone), clone_code, new_history_code))
+            release_state(clone)
+
+        release_state(current_state)
+
+    if stats is not None:
+        stats.reused_states = pool.reuse_count
+        stats.peak_frontier = frontier.peak_memory_count
+        stats.finish(states_searched)
+
+    return shortest_solution, shortest_solution_suit_order
+
+
+def get_state_key(state_code):
+    """
+        Returns the part of an encoded state that identifies it for duplicate detection: the stacks and open slots,
+        same as GameState equality
+    """
+    return state_code.rsplit("|", 2)[0]
+
+
+def get_pending_key(item):
+    return item[0]
@@ -13,8 +13,23 @@ OPEN_RANGE = range(OPEN_SLOT_COUNT)
 # Suit token cards are represented as a 2-tuple, (color, 0)
 # Open slots contain the cards, or a 2-tuple (color, -1) if the token stack has been turned over there
 
+# Single letter codes of the suits, used to encode states compactly
+SUIT_CODES = {"red": "r", "green": "g", "black": "b", "rose": "o"}
+SUIT_NAMES = {"r": "red", "g": "green", "b": "black", "o": "rose"}
+
+# Single letter codes of the action destinations, used to encode actions compactly
+DESTINATION_CODES = {"stack": "s", "open": "o", "suit": "u", "token": "t", "resolve": "r"}
+DESTINATION_NAMES = {"s": "stack", "o": "open", "u": "suit", "t": "token", "r": "resolve"}
+
 
 class GameState:
+    # States are created for every search node, so they have no instance dict
+    __slots__ = ("actions_taken", "stacks", "open_slots", "suit_stacks", "suit_insert_order")
+
+    # Lookups between suit names and suit stack indices, shared by all states
+    suit_lookup = {"red": 0, "green": 1, "black": 2, "rose": None}
+    suit_reverse_lookup = {0: "red", 1: "green", 2: "black", None: "rose"}
+
     def __init__(self):
         self.actions_taken = 0
 
@@ -38,29 +53,18 @@ class GameState:
 
         self.suit_insert_order = []
 
-        self.suit_lookup = {"red": 0, "green": 1, "black": 2, "rose": None}
-        self.suit_reverse_lookup = {0: "red", 1: "green", 2: "black", None: "rose"}
-
     def clone(self):
         """
             Clones the given GameState object
         """
-        clone = GameState()
-
-        for i in STACK_RANGE:
-            for j in range(len(self.stacks[i])):
-                # Copy each card from each stack
-                clone.stacks[i].append(self.stacks[i][j])
-
-        for i in OPEN_RANGE:
-            clone.open_slots[i] = self.open_slots[i]
-
-        for i in range(SUIT_STACK_COUNT):
-            clone.suit_stacks[i][1] = self.suit_stacks[i][1]
-
-        for order in self.suit_insert_order:
-            clone.suit_insert_order.append(order)
-
+        # Skip __init__, every field is copied anyway
+        clone = GameState.__new__(GameState)
+
+        # Copy each card from each stack
+        clone.stacks = [stack[:] for stack in self.stacks]
+        clone.open_slots = self.open_slots[:]
+        clone.suit_stacks = [[suit_stack[0], suit_stack[1]] for suit_stack in self.suit_stacks]
+        clone.suit_insert_order = self.suit_insert_order[:]
         clone.actions_taken = self.actions_taken
 
         return clone
@@ -83,37 +87,69 @@ class GameState:
 
         return True
 
-    def auto_resolve(self):
+    def auto_resolve(self, resolved_cards=None):
         """
             Automatically resolve state transformations that are "free" e.g. removing the rose card and suit cards such that
             a card is only moved if all off-suit suit stacks contain at least a value that is 1 less than the card being moved
             Example: suit stacks 000, can move any 1's and 2's
             Example: suit stacks 412, can move middle color (-> 422) but not others (-> 512 or 413)
+
+            Works in passes. Each pass checks the stack tops in order against the suit minimum taken at the start of the
+            pass, and only looks at the open slots if nothing was resolved from the stacks. Instead of rescanning
+            everything every pass, only the stacks and open slots whose top changed, or whose suit value or the suit
+            minimum moved since they were last checked, are rechecked
+
+            If resolved_cards is given, the resolved cards are appended to it in the order they were resolved
         """
+        stacks = self.stacks
+        open_slots = self.open_slots
+        suit_stacks = self.suit_stacks
+        suit_lookup = self.suit_lookup
+
         resolved_count = 0
-        previous_count = 0
-        while previous_count != self.get_total_card_count():
-            previous_count = self.get_total_card_count()
 
+        # Everything needs to be checked on the first pass
+        dirty_stacks = [True] * STACK_COUNT
+        dirty_slots = [True] * OPEN_SLOT_COUNT
+        minimum_suit_value = None
+
+        while True:
             # Get the minimum value of the suit stacks
             # Allow autoresolving a suited card that is only +1 of minimum
-            minimum_suit_value = min(map(lambda x: x[1], self.suit_stacks))
-
+            pass_minimum = min(suit_stacks[0][1], suit_stacks[1][1], suit_stacks[2][1])
+            if pass_minimum != minimum_suit_value:
+                minimum_suit_value = pass_minimum
+                dirty_stacks = [True] * STACK_COUNT
+                dirty_slots = [True] * OPEN_SLOT_COUNT
+            elif True not in dirty_stacks and True not in dirty_slots:
+                break
+
+            stacks_changed = False
             early_continue = False
 
-            # Go through all top cards in stacks
+            # Go through the changed top cards in stacks
             for i in STACK_RANGE:
-                top_card = self.query_stack_top(i)
-                if top_card is None:
+                if not dirty_stacks[i]:
                     continue
+                dirty_stacks[i] = False
+
+                stack = stacks[i]
+                if len(stack) == 0:
+                    continue
+                top_card = stack[-1]
 
                 # If the card is the rose, remove it instantly
-                if top_card[0] == "rose":
-                    self.pull_from_stack(i, 1)
+                suit_index = suit_lookup[top_card[0]]
+                if suit_index is None:
+                    stack.pop()
+                    dirty_stacks[i] = True
+                    stacks_changed = True
                     resolved_count += 1
+                    if resolved_cards is not None:
+                        resolved_cards.append(top_card)
                     continue
 
-                current_suit_value = self.suit_stacks[self.suit_lookup[top_card[0]]][1]
+                current_suit_value = suit_stacks[suit_index][1]
 
                 # If card is (current + 1) and the value is (min + 1), remove it
                 # Also remove any 1's and 2's (only of can be placed)
@@ -121,36 +157,61 @@ class GameState:
                     if (top_card[1] == 1):
                         self.suit_insert_order.append(top_card[0])
 
-                    self.pull_from_stack(i, 1)
+                    stack.pop()
                     resolved_count += 1
-                    self.suit_stacks[self.suit_lookup[top_card[0]]][1] += 1
+                    if resolved_cards is not None:
+                        resolved_cards.append(top_card)
+                    suit_stacks[suit_index][1] += 1
+                    self._mark_suit_dirty(top_card[0], dirty_stacks, dirty_slots)
+                    dirty_stacks[i] = True
+                    stacks_changed = True
                     early_continue = True
 
             # If a card was autoresolved from the stacks, do not try to autoresolve from the open slots at the same time
             if early_continue:
                 continue
 
-            open_slot_index = None
-
-            # Also go through all open slot cards. Rose cannot be found here
+            # Also go through the changed open slot cards. Rose cannot be found here
             for i in OPEN_RANGE:
-                card = self.open_slots[i]
+                if not dirty_slots[i]:
+                    continue
+                dirty_slots[i] = False
+
+                card = open_slots[i]
                 if card is None:
                     continue
-                current_suit_value = self.suit_stacks[self.suit_lookup[card[0]]][1]
+                suit_index = suit_lookup[card[0]]
+                current_suit_value = suit_stacks[suit_index][1]
 
                 if card[1] == current_suit_value + 1 and (card[1] == minimum_suit_value + 1 or card[1] == 1 or card[1] == 2):
-                    open_slot_index = i
+                    open_slots[i] = None
+                    resolved_count += 1
+                    if resolved_cards is not None:
+                        resolved_cards.append(card)
+                    suit_stacks[suit_index][1] += 1
+                    self._mark_suit_dirty(card[0], dirty_stacks, dirty_slots)
                     break
 
-            if open_slot_index is not None:
-                card = self.open_slots[open_slot_index]
-                self.open_slots[open_slot_index] = None
-                resolved_count += 1
-                self.suit_stacks[self.suit_lookup[card[0]]][1] += 1
+            # Only another pass if the stacks changed, the open slots alone never trigger one
+            if not stacks_changed:
+                break
 
         return resolved_count
 
+    def _mark_suit_dirty(self, suit, dirty_stacks, dirty_slots):
+        """
+            Flags the stack tops and open slot cards of the given suit for rechecking after its suit value moved
+        """
+        for i in STACK_RANGE:
+            stack = self.stacks[i]
+            if len(stack) > 0 and stack[-1][0] == suit:
+                dirty_stacks[i] = True
+
+        for i in OPEN_RANGE:
+            card = self.open_slots[i]
+            if card is not None and card[0] == suit:
+                dirty_slots[i] = True
+
     def query_stack_top(self, index):
         """
             Return the card that is on top of the given stack at index. Returns None if stack is empty
@@ -481,6 +542,154 @@ class GameState:
 
         return score
 
+    def is_deadlocked(self):
+        """
+            Returns True if the state is provably lost, because some card can never be moved again
+        """
+        return len(self.get_stuck_cards()) > 0
+
+    def get_stuck_cards(self):
+        """
+            Returns the cards in the stacks and open slots that can never be moved again. Such a state can not be won
+
+            Works out optimistically which cards could ever move, until nothing changes:
+                A card can be picked up if the cards above it could all move away, or form a run with it
+                A picked up card can move if its previous value could reach the suit stack, if a card it can be placed on
+                could be uncovered, or if a free open slot or empty stack could appear. Tokens can also move if all 4
+                could be uncovered for the discard
+                A free open slot or empty stack can appear if a card in the open slots or a whole stack could move, or if
+                tokens in the open slots could be discarded
+            Any card that really moves is found movable, so the cards left over are stuck for certain
+        """
+        # With a free open slot or an empty stack every card can be dug out
+        if None in self.open_slots:
+            return []
+        for stack in self.stacks:
+            if len(stack) == 0:
+                return []
+
+        stack_movable = [[False] * len(stack) for stack in self.stacks]
+        slot_movable = [False] * OPEN_SLOT_COUNT
+
+        # Index of the last card of the run starting from each card
+        run_ends = []
+        for stack in self.stacks:
+            run_end = list(range(len(stack)))
+            for j in range(len(stack) - 2, -1, -1):
+                card = stack[j]
+                next_card = stack[j + 1]
+                if card[1] != 0 and next_card[1] != 0 and card[0] != next_card[0] and next_card[1] == card[1] - 1:
+                    run_end[j] = run_end[j + 1]
+            run_ends.append(run_end)
+
+        resource_possible = False
+        changed = True
+        while changed:
+            changed = False
+
+            # Find the cards that could be picked up, or are on top of another stack after moving
+            pick_up = []
+            available = set()
+            for i in STACK_RANGE:
+                stack = self.stacks[i]
+                movable = stack_movable[i]
+
+                cleared_from = len(stack)
+                while cleared_from > 0 and movable[cleared_from - 1]:
+                    cleared_from -= 1
+
+                stack_pick_up = [run_ends[i][j] + 1 >= cleared_from for j in range(len(stack))]
+                pick_up.append(stack_pick_up)
+
+                for j in range(len(stack)):
+                    if stack_pick_up[j] or movable[j]:
+                        available.add(stack[j])
+
+            for i in OPEN_RANGE:
+                if slot_movable[i]:
+                    available.add(self.open_slots[i])
+
+            # Find the suits whose tokens could all be discarded
+            discardable = []
+            for suit in ["red", "green", "black"]:
+                token_count = 0
+                token_in_open_slot = False
+                for i in OPEN_RANGE:
+                    if self.open_slots[i] == (suit, 0):
+                        token_count += 1
+                        token_in_open_slot = True
+                for i in STACK_RANGE:
+                    for j in range(len(self.stacks[i])):
+                        if self.stacks[i][j] == (suit, 0) and pick_up[i][j]:
+                            token_count += 1
+                if token_count == 4 and (resource_possible or token_in_open_slot):
+                    discardable.append(suit)
+                    if token_in_open_slot and not resource_possible:
+                        resource_possible = True
+                        changed = True
+
+            for i in STACK_RANGE:
+                stack = self.stacks[i]
+                for j in range(len(stack)):
+                    if stack_movable[i][j] or not pick_up[i][j]:
+                        continue
+                    if not self._could_move(stack[j], available, discardable, resource_possible):
+                        continue
+
+                    # The card moves with the run above it
+                    for k in range(j, run_ends[i][j] + 1):
+                        stack_movable[i][k] = True
+                    changed = True
+
+                    if j == 0 and not resource_possible:
+                        resource_possible = True
+
+            for i in OPEN_RANGE:
+                card = self.open_slots[i]
+                if slot_movable[i] or card[1] == -1:
+                    continue
+                if self._could_move(card, available, discardable, resource_possible):
+                    slot_movable[i] = True
+                    resource_possible = True
+                    changed = True
+
+        stuck_cards = []
+        for i in STACK_RANGE:
+            for j in range(len(self.stacks[i])):
+                if not stack_movable[i][j]:
+                    stuck_cards.append(self.stacks[i][j])
+        for i in OPEN_RANGE:
+            if not slot_movable[i] and self.open_slots[i][1] != -1:
+                stuck_cards.append(self.open_slots[i])
+
+        return stuck_cards
+
+    def _could_move(self, card, available, discardable, resource_possible):
+        """
+            Returns True if the given picked up card could move somewhere, used by get_stuck_cards
+        """
+        # The rose is removed as soon as it is uncovered
+        if card[0] == "rose":
+            return True
+
+        if resource_possible:
+            return True
+
+        if card[1] == 0:
+            return card[0] in discardable
+
+        # The previous card of the suit is on the suit stack already, or could get there
+        suit_value = self.suit_stacks[self.suit_lookup[card[0]]][1]
+        if suit_value >= card[1] - 1 or (card[0], card[1] - 1) in available:
+            return True
+
+        # A card to place this one on could be uncovered
+        for suit in ["red", "green", "black"]:
+            if suit != card[0] and (suit, card[1] + 1) in available:
+                return True
+
+        return False
+
     def can_move(self, stack_index, card_index):
         """
             Returns True if the card can be moved from the current stack
@@ -522,6 +731,17 @@ class GameState:
 
         return True
 
+    def encode(self):
+        """
+            Returns a compact string that identifies the state: the stacks, the open slots, the suit stack values and the
+            order the suits were started in. Each card is encoded as its suit letter and value, "x" for turned over tokens
+        """
+        stacks_code = "/".join(["".join([encode_card(card) for card in stack]) for stack in self.stacks])
+        open_slots_code = "".join([encode_card(card) if card is not None else "__" for card in self.open_slots])
+        suit_code = "".join([str(x[1]) for x in self.suit_stacks])
+        order_code = "".join([SUIT_CODES[suit] for suit in self.suit_insert_order])
+        return stacks_code + "|" + open_slots_code + "|" + suit_code + "|" + order_code
+
     def __eq__(self, other):
         for i in STACK_RANGE:
             if self.stacks[i] != other.stacks[i]:
@@ -544,3 +764,107 @@ class GameState:
                 "Suit stacks: " + ", ".join(map(lambda slot: str(slot[0]) + " " + str(slot[1]), self.suit_stacks)) + "\n" +
                 "Board:\n" +
                 "\n".join([", ".join(map(lambda slot: str(slot[0]) + " " + str(slot[1]), stack)) for stack in self.stacks]))
+
+
+def encode_card(card):
+    """
+        Encodes a card as two characters
+    """
+    return SUIT_CODES[card[0]] + ("x" if card[1] == -1 else str(card[1]))
+
+
+def decode_card(code):
+    """
+        Decodes a card encoded with encode_card
+    """
+    return (SUIT_NAMES[code[0]], -1 if code[1] == "x" else int(code[1]))
+
+
+def decode_state(code):
+    """
+        Returns a new GameState from a string returned by GameState.encode
+        The number of actions taken is not part of the encoding and is set to 0
+    """
+    stacks_code, open_slots_code, suit_code, order_code = code.split("|")
+    state = GameState()
+
+    stack_codes = stacks_code.split("/")
+    for i in STACK_RANGE:
+        stack_code = stack_codes[i]
+        for j in range(0, len(stack_code), 2):
+            state.stacks[i].append(decode_card(stack_code[j:j + 2]))
+
+    for i in OPEN_RANGE:
+        card_code = open_slots_code[i * 2:i * 2 + 2]
+        if card_code != "__":
+            state.open_slots[i] = decode_card(card_code)
+
+    for i in range(SUIT_STACK_COUNT):
+        state.suit_stacks[i][1] = int(suit_code[i])
+
+    for suit_letter in order_code:
+        state.suit_insert_order.append(SUIT_NAMES[suit_letter])
+
+    return state
+
+
+def encode_action(action):
+    """
+        Encodes an action compactly, for example "3.2>s5" for moving the card at index 2 of stack 3 onto stack 5
+    """
+    action_from = action[0]
+    action_to = action[1]
+
+    if action_from[0] is None:
+        from_code = "n"
+    elif action_from[0] == -1:
+        from_code = "o" + str(action_from[1])
+    else:
+        from_code = str(action_from[0]) + "." + str(action_from[1])
+
+    if action_to[0] == "suit" or action_to[0] == "token":
+        to_code = DESTINATION_CODES[action_to[0]] + SUIT_CODES[action_to[1]]
+    else:
+        to_code = DESTINATION_CODES[action_to[0]] + str(action_to[1])
+
+    return from_code + ">" + to_code
+
+
+def decode_action(code):
+    """
+        Decodes an action encoded with encode_action
+    """
+    from_code, to_code = code.split(">")
+
+    if from_code == "n":
+        action_from = (None, None)
+    elif from_code[0] == "o":
+        action_from = (-1, int(from_code[1:]))
+    else:
+        stack_index, card_index = from_code.split(".")
+        action_from = (int(stack_index), int(card_index))
+
+    destination = DESTINATION_NAMES[to_code[0]]
+
+    if destination == "suit" or destination == "token":
+        action_to = (destination, SUIT_NAMES[to_code[1:]])
+    else:
+        action_to = (destination, int(to_code[1:]))
+
+    return action_from, action_to
+
+
+def encode_history(actions):
+    """
+        Encodes a list of actions as one string, the actions encoded with encode_action and joined with ";"
+    """
+    return ";".join([encode_action(action) for action in actions])
+
+
+def decode_history(history_code):
+    """
+        Decodes a history of actions encoded with encode_history
+    """
+    if len(history_code) == 0:
+        return []
+    return [decode_action(code) for code in history_code.split(";")]
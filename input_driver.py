@@ -0,0 +1,267 @@
+import time
+
+from game_state import STACK_COUNT, MAX_STACK_SIZE, OPEN_SLOT_COUNT
+from layout import CLICK_OPEN_SLOTS, CLICK_STACKS, CLICK_TOKEN_DISCARD_BUTTONS, get_suit_stack_positions
+
+
+class InputDriver:
+    """
+        Interface for the mouse events of the replay. Positions are given in game coordinates
+        Drivers also provide the clock the replay waits on, and get a note of each replay step before it is played
+    """
+
+    def move(self, position):
+        raise NotImplementedError()
+
+    def press(self):
+        raise NotImplementedError()
+
+    def release(self):
+        raise NotImplementedError()
+
+    def sleep(self, seconds):
+        raise NotImplementedError()
+
+    def now(self):
+        raise NotImplementedError()
+
+    def note(self, kind, data):
+        pass
+
+
+class PynputDriver(InputDriver):
+    """
+        Plays the mouse events on the real mouse using pynput
+        Positions are converted from game coordinates with to_screen
+    """
+
+    def __init__(self, to_screen):
+        # Imported here so the other drivers work without a display
+        from pynput.mouse import Button, Controller
+
+        self.mouse = Controller()
+        self.button = Button.left
+        self.to_screen = to_screen
+
+    def move(self, position):
+        self.mouse.position = self.to_screen(position)
+
+    def press(self):
+        self.mouse.press(self.button)
+
+    def release(self):
+        self.mouse.release(self.button)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return time.perf_counter()
+
+    def note(self, kind, data):
+        if kind != "pause":
+            print(kind, *data)
+
+
+class RecordingDriver(InputDriver):
+    """
+        Records the mouse events on a simulated clock instead of moving the mouse
+
+        Every event is stored in events as a 3-tuple (time, kind, data). The board is simulated as animating for
+        drop_animation_time after each release and for animation_time_per_card per card after a resolve step, which
+        probe reports the same way the board sampling would
+    """
+
+    def __init__(self, drop_animation_time=0.05, animation_time_per_card=0.12):
+        self.drop_animation_time = drop_animation_time
+        self.animation_time_per_card = animation_time_per_card
+
+        self.clock = 0.0
+        self.events = []
+        self.animation_end = 0.0
+
+    def move(self, position):
+        self.events.append((self.clock, "move", position))
+
+    def press(self):
+        self.events.append((self.clock, "press", None))
+
+    def release(self):
+        self.events.append((self.clock, "release", None))
+        self.animate(self.drop_animation_time)
+
+    def sleep(self, seconds):
+        self.clock += seconds
+
+    def now(self):
+        return self.clock
+
+    def note(self, kind, data):
+        self.events.append((self.clock, kind, data))
+        if kind == "resolve":
+            self.animate(self.animation_time_per_card * data[0])
+        elif kind == "discard":
+            self.animate(self.animation_time_per_card)
+
+    def animate(self, seconds):
+        """
+            Keeps the simulated board changing for the given time from now
+        """
+        self.animation_end = max(self.animation_end, self.clock + seconds)
+
+    def probe(self, positions=None):
+        """
+            Returns a board sample that keeps changing until the simulated animations are over
+            The whole simulated board animates, so the sampled positions do not matter
+        """
+        if self.clock < self.animation_end:
+            return self.clock
+        return self.animation_end
+
+    def get_event_count(self, kind):
+        """
+            Returns how many events of the given kind were recorded
+        """
+        return len([event for event in self.events if event[1] == kind])
+
+
+class SimulatedDriver(RecordingDriver):
+    """
+        Plays the mouse events on a GameState instead of the game
+
+        Each drag is turned back into an action using the click positions of the layout, and applied to the state
+        followed by auto_resolve, the same way the game does. Drags that the game would reject are not applied and are
+        stored in errors, as are resolve steps that expect a different number of cards than the state resolved.
+        Drags that start from an empty position do nothing, same as in the game
+    """
+
+    def __init__(self, state, drop_animation_time=0.05, animation_time_per_card=0.12):
+        RecordingDriver.__init__(self, drop_animation_time, animation_time_per_card)
+
+        self.state = state
+        self.actions = []
+        self.errors = []
+
+        self.cursor = None
+        self.drag_start = None
+        self.last_resolved_count = 0
+
+        # Reverse lookups from click positions to board places
+        self.stack_positions = {}
+        for i in range(STACK_COUNT):
+            for j in range(MAX_STACK_SIZE):
+                self.stack_positions[CLICK_STACKS[i][j]] = (i, j)
+
+        self.open_slot_positions = {}
+        for i in range(OPEN_SLOT_COUNT):
+            self.open_slot_positions[CLICK_OPEN_SLOTS[i]] = i
+
+        self.token_button_positions = {}
+        for suit in CLICK_TOKEN_DISCARD_BUTTONS:
+            self.token_button_positions[CLICK_TOKEN_DISCARD_BUTTONS[suit]] = suit
+
+    def move(self, position):
+        RecordingDriver.move(self, position)
+        self.cursor = position
+
+    def press(self):
+        RecordingDriver.press(self)
+        self.drag_start = self.cursor
+
+    def release(self):
+        RecordingDriver.release(self)
+
+        action = self.get_drag_action(self.drag_start, self.cursor)
+        self.drag_start = None
+        if action is None:
+            return
+
+        if not self.is_legal(action):
+            self.errors.append((self.clock, "illegal", action))
+            return
+
+        # The previous action resolved cards that the replay did not wait for
+        if self.last_resolved_count != 0:
+            self.errors.append((self.clock, "resolve", (0, self.last_resolved_count)))
+
+        self.state.apply_action(action)
+        self.last_resolved_count = self.state.auto_resolve()
+        self.actions.append(action)
+        self.animate(self.animation_time_per_card * self.last_resolved_count)
+
+    def note(self, kind, data):
+        self.events.append((self.clock, kind, data))
+
+        if kind == "discard":
+            self.animate(self.animation_time_per_card)
+
+        # Resolve steps follow the action they belong to, check that the state resolved the same amount
+        elif kind == "resolve":
+            if data[0] != self.last_resolved_count:
+                self.errors.append((self.clock, "resolve", (data[0], self.last_resolved_count)))
+            self.last_resolved_count = 0
+
+    def get_drag_action(self, from_position, to_position):
+        """
+            Returns the action a drag between the given positions makes in the game, or None if it does nothing
+        """
+        if from_position is None or to_position is None:
+            return None
+
+        # Clicking a token button discards the tokens
+        if from_position == to_position and from_position in self.token_button_positions:
+            return (None, None), ("token", self.token_button_positions[from_position])
+
+        # Find what was picked up
+        if from_position in self.open_slot_positions:
+            slot_index = self.open_slot_positions[from_position]
+            card = self.state.open_slots[slot_index]
+            if card is None or card[1] == -1:
+                return None
+            action_from = (-1, slot_index)
+
+        elif from_position in self.stack_positions:
+            stack_index, card_index = self.stack_positions[from_position]
+            if card_index >= len(self.state.stacks[stack_index]):
+                return None
+            card = self.state.stacks[stack_index][card_index]
+            action_from = (stack_index, card_index)
+
+        else:
+            self.errors.append((self.clock, "unknown source", from_position))
+            return None
+
+        # Find where it was dropped
+        if to_position in self.stack_positions:
+            action_to = ("stack", self.stack_positions[to_position][0])
+
+        elif to_position in self.open_slot_positions:
+            action_to = ("open", self.open_slot_positions[to_position])
+
+        else:
+            suit_positions = get_suit_stack_positions(self.state.suit_insert_order)
+            if card[0] not in suit_positions or suit_positions[card[0]] != to_position:
+                self.errors.append((self.clock, "wrong suit stack", (card, to_position)))
+                return None
+            action_to = ("suit", card[0])
+
+        # Dropping back where the card was does nothing
+        if action_from[0] == -1 and action_to == ("open", action_from[1]):
+            return None
+        if action_to == ("stack", action_from[0]):
+            return None
+
+        return action_from, action_to
+
+    def is_legal(self, action):
+        """
+            Returns True if the game accepts the given action
+            Cards can be dropped in any free open slot, while get_legal_actions only lists the first one
+        """
+        if action[1][0] == "open":
+            if self.state.open_slots[action[1][1]] is not None:
+                return False
+            free_slots = [i for i in range(OPEN_SLOT_COUNT) if self.state.open_slots[i] is None]
+            action = (action[0], ("open", free_slots[0]))
+
+        return action in self.state.get_legal_actions()
@@ -0,0 +1,157 @@
+import json
+import time
+
+from game_state import GameState
+
+
+class SolveStats:
+    """
+        Timers and counters for one solve
+
+        The search picks the functions it calls through wrap. Without a SolveStats the search calls the plain functions,
+        so the instrumentation costs nothing when it is not used. With one, each wrapped call is timed and counted, and
+        the counters that can be derived from the calls (expanded nodes, generated children, macro actions, peak
+        frontier size) are collected in the wrappers instead of the search loop. The batched beam search, which drops
+        deadlocked candidates, counts those itself
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.calls = {}
+
+        self.expanded = 0
+        self.generated = 0
+        self.peak_frontier = 0
+        self.deadlocked = 0
+        self.reused_states = 0
+        self.macro_actions = 0
+
+        self.states_searched = 0
+        self.total_time = 0.0
+        self.start_time = None
+
+    def start(self):
+        """
+            Starts the total solve timer
+        """
+        self.start_time = time.perf_counter()
+
+    def finish(self, states_searched):
+        """
+            Stops the total solve timer. states_searched is the number of new states the search found
+        """
+        self.total_time = time.perf_counter() - self.start_time
+        self.states_searched = states_searched
+
+    def wrap(self, name, function):
+        """
+            Returns a function that calls the given function and adds its time and call count under the given name
+        """
+        timers = self.timers
+        calls = self.calls
+        perf_counter = time.perf_counter
+        timers[name] = 0.0
+        calls[name] = 0
+
+        def timed(*args):
+            start = perf_counter()
+            result = function(*args)
+            timers[name] += perf_counter() - start
+            calls[name] += 1
+            return result
+
+        return timed
+
+    def wrap_legal_actions(self, function):
+        """
+            Like wrap, also counts the expanded nodes and their children for the branching factor
+        """
+        timed = self.wrap("get_legal_actions", function)
+
+        def counted(state):
+            actions = timed(state)
+            self.expanded += 1
+            self.generated += len(actions)
+            return actions
+
+        return counted
+
+    def wrap_macro_actions(self, function):
+        """
+            Like wrap, also counts the macro actions, which are generated children of the node expanded just before
+        """
+        timed = self.wrap("get_macro_actions", function)
+
+        def counted(state):
+            macros = timed(state)
+            self.generated += len(macros)
+            self.macro_actions += len(macros)
+            return macros
+
+        return counted
+
+    def wrap_frontier_push(self, frontier):
+        """
+            Like wrap for appending to the frontier list, also tracks the peak frontier size
+        """
+        timed = self.wrap("frontier_push", frontier.append)
+
+        def push(item):
+            timed(item)
+            if len(frontier) > self.peak_frontier:
+                self.peak_frontier = len(frontier)
+
+        return push
+
+    def to_dict(self):
+        """
+            Returns the collected stats as a JSON serializable dict
+        """
+        duplicates = self.generated - self.states_searched - self.deadlocked
+
+        return {
+            "total_time": self.total_time,
+            "timers": dict(self.timers),
+            "calls": dict(self.calls),
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "states_searched": self.states_searched,
+            "nodes_per_second": self.states_searched / self.total_time if self.total_time > 0 else 0.0,
+            "duplicate_rate": duplicates / self.generated if self.generated > 0 else 0.0,
+            "deadlocked": self.deadlocked,
+            "branching_factor": self.generated / self.expanded if self.expanded > 0 else 0.0,
+            "peak_frontier": self.peak_frontier,
+            "reused_states": self.reused_states,
+            "macro_actions": self.macro_actions
+        }
+
+    def write_json(self, path):
+        """
+            Writes the stats of the solve into the given file
+        """
+        with open(path, "w") as stats_file:
+            json.dump(self.to_dict(), stats_file, indent=4)
+
+
+def get_search_functions(pool, stats=None):
+    """
+        Picks the functions the searches call, so every search mode times and counts the same things
+        Returns a 6-tuple (clone_state, release_state, apply_action, auto_resolve, get_heuristic_value,
+        get_legal_actions). States are cloned and released through the given StatePool
+        If a SolveStats is given, the functions are wrapped to collect their timers and counters in it
+    """
+    clone_state = pool.clone
+    release_state = pool.release
+    apply_action = GameState.apply_action
+    auto_resolve = GameState.auto_resolve
+    get_heuristic_value = GameState.get_heuristic_value
+    get_legal_actions = GameState.get_legal_actions
+
+    if stats is not None:
+        clone_state = stats.wrap("clone", clone_state)
+        apply_action = stats.wrap("apply_action", apply_action)
+        auto_resolve = stats.wrap("auto_resolve", auto_resolve)
+        get_heuristic_value = stats.wrap("get_heuristic_value", get_heuristic_value)
+        get_legal_actions = stats.wrap_legal_actions(get_legal_actions)
+
+    return clone_state, release_state, apply_action, auto_resolve, get_heuristic_value, get_legal_actions
@@ -0,0 +1,78 @@
+from game_state import STACK_COUNT, INITIAL_STACK_SIZE, MAX_STACK_SIZE
+
+# Board geometry in game view coordinates
+# Works properly if game is in native resolution
+
+# Constants used to crop the game view from the whole screen
+
+GAME_WIDTH = 1300
+GAME_HEIGHT = 870
+
+# Image parsing parameters
+
+BOARD_TOP_LEFT = (93, 284)
+BOARD_HORIZONTAL_DELIMITER = 152
+BOARD_VERTICAL_DELIMITER = 31
+
+CARD_VALUE_OFFSET = (12, 10)
+CARD_VALUE_SIZE = (12, 21)
+
+SUIT_STACK_LEFT = 853
+SUIT_STACK_TOP = 19
+
+# Autoplay parmeters
+CLICK_TOKEN_DISCARD_BUTTONS = {
+    "red": (578, 55),
+    "green": (578, 140),
+    "black": (578, 225)
+}
+
+CLICK_OPEN_SLOTS = [
+    (100, 30),
+    (256, 30),
+    (410, 30)
+]
+
+CLICK_SUIT_STACK_POSITIONS = [
+    (862, 30),
+    (1015, 30),
+    (1168, 30)
+]
+
+# The value corner of each card position in the stacks, used both for parsing and clicking
+CLICK_STACKS = [
+    [(BOARD_TOP_LEFT[0] + i * BOARD_HORIZONTAL_DELIMITER + CARD_VALUE_OFFSET[0],
+      BOARD_TOP_LEFT[1] + j * BOARD_VERTICAL_DELIMITER + CARD_VALUE_OFFSET[1]) for j in range(MAX_STACK_SIZE)]
+    for i in range(STACK_COUNT)
+]
+
+# Pixels sampled to notice board changes during replay: the suit stacks, open slots and a few rows of each stack
+BOARD_SAMPLE_POSITIONS = (
+    CLICK_SUIT_STACK_POSITIONS + CLICK_OPEN_SLOTS +
+    [CLICK_STACKS[i][j] for i in range(STACK_COUNT) for j in range(0, MAX_STACK_SIZE, 3)]
+)
+
+# Half the size of the box grabbed around each sampled pixel
+BOARD_SAMPLE_RADIUS = 2
+
+# Boxes (left, top, right, bottom) polled by the deal watcher: a strip over the value corners of the dealt rows of each
+# stack, which every dealt card changes, and the suit stacks, which change when cards are auto-resolved after the deal
+WATCH_STACK_TILES = [
+    (BOARD_TOP_LEFT[0] + i * BOARD_HORIZONTAL_DELIMITER, BOARD_TOP_LEFT[1],
+     BOARD_TOP_LEFT[0] + i * BOARD_HORIZONTAL_DELIMITER + 2 * CARD_VALUE_OFFSET[0] + CARD_VALUE_SIZE[0],
+     BOARD_TOP_LEFT[1] + INITIAL_STACK_SIZE * BOARD_VERTICAL_DELIMITER)
+    for i in range(STACK_COUNT)
+]
+WATCH_SUIT_STACK_TILES = [(x - 8, y - 8, x + 8, y + 8) for x, y in CLICK_SUIT_STACK_POSITIONS]
+WATCH_TILES = WATCH_STACK_TILES + WATCH_SUIT_STACK_TILES
+
+
+def get_suit_stack_positions(suit_insert_order):
+    """
+        Returns a dict of suit -> suit stack position. The suit stacks are taken left to right in the order the suits
+        were started
+    """
+    positions = {}
+    for i in range(len(suit_insert_order)):
+        positions[suit_insert_order[i]] = CLICK_SUIT_STACK_POSITIONS[i]
+    return positions
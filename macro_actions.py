@@ -0,0 +1,237 @@
+from game_state import STACK_RANGE, OPEN_RANGE
+
+# Marks a macro action, a 2-tuple (MACRO, actions) with the primitive actions it expands into
+MACRO = "macro"
+
+# A buried card is only dug out if at most this many moves are needed to free it
+MAX_PARKING_MOVES = 3
+
+# Order in which the cards above a buried card are parked: onto other cards, onto empty stacks, into the open slots
+PARKING_PREFERENCE = {"stack": 0, "empty": 1, "open": 2}
+
+
+def get_macro_actions(state):
+    """
+        Returns the compound moves from the given state that the search would otherwise have to find step by step
+            Digging: parks the cards above the next card of a suit, then moves that card onto its suit stack
+            Token discards: parks the cards above every buried token of a suit, then discards the tokens
+
+        Each macro action is a 2-tuple (MACRO, actions). The actions are primitive actions that were checked to be legal
+        one after another by playing them on a copy of the state, with auto_resolve after each one. Macros of a single
+        action are left out, get_legal_actions returns those already
+
+        Only digs that can take at most MAX_PARKING_MOVES parking moves are played out, see _get_cover_moves
+    """
+    macros = []
+
+    suit_lookup = state.suit_lookup
+    suit_stacks = state.suit_stacks
+
+    # Parking moves needed to free all buried tokens of each suit
+    token_cover_moves = {}
+    for stack_index in STACK_RANGE:
+        stack = state.stacks[stack_index]
+        token_suits = set()
+        for card_index in range(len(stack) - 1):
+            card = stack[card_index]
+            suit_index = suit_lookup[card[0]]
+            if suit_index is None:
+                continue
+
+            # Dig out the next card of its suit
+            if card[1] == suit_stacks[suit_index][1] + 1:
+                if _get_cover_moves(state, stack, card_index) > MAX_PARKING_MOVES:
+                    continue
+                macro = _get_dig_macro(state, lambda clone, card=card: _find_buried_card(clone, card), card,
+                                       ("suit", card[0]))
+                if macro is not None:
+                    macros.append(macro)
+
+            # Everything above the lowest token of the suit in the stack has to be parked
+            elif card[1] == 0 and card[0] not in token_suits:
+                token_suits.add(card[0])
+                cover_moves = _get_cover_moves(state, stack, card_index)
+                token_cover_moves[card[0]] = token_cover_moves.get(card[0], 0) + cover_moves
+
+    for suit in sorted(token_cover_moves):
+        if token_cover_moves[suit] > MAX_PARKING_MOVES:
+            continue
+        macro = _get_dig_macro(state, lambda clone, suit=suit: _find_buried_token(clone, suit), None, ("token", suit))
+        if macro is not None:
+            macros.append(macro)
+
+    return macros
+
+
+def apply_macro(state, macro):
+    """
+        Applies the actions of the given macro action to this state, with auto_resolve after each one like the search
+        Returns the applied actions with the ("resolve", n) entries, to be added to the search history
+    """
+    history = []
+    for action in macro[1]:
+        state.apply_action(action)
+        history.append(action)
+
+        resolved_count = state.auto_resolve()
+        if resolved_count > 0:
+            history.append(((None, None), ("resolve", resolved_count)))
+
+    return history
+
+
+def _get_dig_macro(state, find_buried, card, finish):
+    """
+        Returns the macro action that parks cards until find_buried returns None and then takes the finishing action,
+        ("suit", suit) for moving the given card onto its suit stack or ("token", suit) for discarding the tokens
+        find_buried returns the (stack_index, card_index) of the next card to free in the given state
+        Returns None if that can not be done with at most MAX_PARKING_MOVES legal actions, or takes a single action
+    """
+    clone = state.clone()
+    actions = []
+
+    while True:
+        position = find_buried(clone)
+        if position is None:
+            break
+        if len(actions) == MAX_PARKING_MOVES:
+            return None
+
+        action = _get_parking_action(clone, position[0], position[1])
+        if action is None:
+            return None
+
+        clone.apply_action(action)
+        clone.auto_resolve()
+        actions.append(action)
+
+    # The freed card can also be resolved on the way
+    finish_action = _get_finish_action(clone, card, finish)
+    if finish_action is not None:
+        if finish_action not in clone.get_legal_actions():
+            return None
+        actions.append(finish_action)
+
+    if len(actions) < 2:
+        return None
+
+    return MACRO, tuple(actions)
+
+
+def _get_parking_action(state, stack_index, card_index):
+    """
+        Returns the legal action that moves the most cards from above the given card out of the way, preferring to put
+        them onto other cards over using up empty stacks and open slots. Returns None if nothing above it can move
+        Only the moves of the cards above it are generated, the same ones get_legal_actions has for them. Between
+        equally good stacks the last one is taken, like the first of the reversed get_legal_actions list
+    """
+    stack = state.stacks[stack_index]
+    open_index = None
+    for i in OPEN_RANGE:
+        if state.open_slots[i] is None:
+            open_index = i
+            break
+
+    best_action = None
+    best_key = None
+
+    for moved_index in range(card_index + 1, len(stack)):
+        card = stack[moved_index]
+        if card[0] == "rose" or not state.can_move(stack_index, moved_index):
+            continue
+
+        for target_stack_index in reversed(STACK_RANGE):
+            if target_stack_index == stack_index or not state.can_place(card, target_stack_index):
+                continue
+
+            place = "stack" if len(state.stacks[target_stack_index]) > 0 else "empty"
+            key = (PARKING_PREFERENCE[place], moved_index)
+            if best_key is None or key < best_key:
+                best_action = (stack_index, moved_index), ("stack", target_stack_index)
+                best_key = key
+
+        # Only single cards go into the open slots
+        if open_index is not None and moved_index == len(stack) - 1:
+            key = (PARKING_PREFERENCE["open"], moved_index)
+            if best_key is None or key < best_key:
+                best_action = (stack_index, moved_index), ("open", open_index)
+                best_key = key
+
+    return best_action
+
+
+def _get_finish_action(state, card, finish):
+    """
+        Returns the action that finishes a dig, or None if the card was resolved on the way
+    """
+    if card is None:
+        return (None, None), finish
+
+    for stack_index in STACK_RANGE:
+        stack = state.stacks[stack_index]
+        if len(stack) > 0 and stack[-1] == card:
+            return (stack_index, len(stack) - 1), finish
+    return None
+
+
+def _get_cover_moves(state, stack, card_index):
+    """
+        Returns how many parking moves it takes at least to uncover the card at the given index of the stack: one for
+        each run above it, as a move takes at most one run. The rose and the cards that auto_resolve puts onto their
+        suit stack as soon as they are uncovered are left out. Cards that only reach their suit stack after other cards
+        of the dig did are counted, so the rare digs that would need fewer moves because of that are not tried
+    """
+    suit_stacks = state.suit_stacks
+    minimum_suit_value = min(suit_stack[1] for suit_stack in suit_stacks)
+
+    moves = 0
+    previous_card = None
+    for j in range(card_index + 1, len(stack)):
+        card = stack[j]
+        suit_index = state.suit_lookup[card[0]]
+        if suit_index is None:
+            continue
+        if card[1] == suit_stacks[suit_index][1] + 1 and (card[1] == minimum_suit_value + 1 or card[1] <= 2):
+            continue
+
+        # A card continues the run of the card below it if it is one lower and of another suit
+        if (previous_card is None or card[1] == 0 or previous_card[1] == 0 or previous_card[0] == card[0] or
+                card[1] != previous_card[1] - 1):
+            moves += 1
+        previous_card = card
+
+    return moves
+
+
+def _find_buried_card(state, card):
+    """
+        Returns the (stack_index, card_index) of the given card if it has cards on top of it, None otherwise
+    """
+    for stack_index in STACK_RANGE:
+        stack = state.stacks[stack_index]
+        if card in stack[:-1]:
+            return stack_index, stack.index(card)
+    return None
+
+
+def _find_buried_token(state, suit):
+    """
+        Returns the (stack_index, card_index) of the token of the given suit with the fewest cards on top of it, not
+        counting the ones on top of their stacks. Returns None if no token of the suit is buried
+    """
+    best_position = None
+    best_depth = None
+
+    for stack_index in STACK_RANGE:
+        stack = state.stacks[stack_index]
+        for card_index in range(len(stack) - 1):
+            card = stack[card_index]
+            if card[0] != suit or card[1] != 0:
+                continue
+
+            depth = len(stack) - card_index
+            if best_depth is None or depth < best_depth:
+                best_position = (stack_index, card_index)
+                best_depth = depth
+
+    return best_position
@@ -0,0 +1,315 @@
+from game_state import OPEN_RANGE
+
+# How many consecutive moves are tried to be removed at once
+DEFAULT_WINDOW = 4
+
+# How far apart two moves of the same card can be to be merged into one
+DEFAULT_MERGE_DISTANCE = 12
+
+
+def optimize_plan(actions, original_state, window=DEFAULT_WINDOW, merge_distance=DEFAULT_MERGE_DISTANCE):
+    """
+        Shortens a solved plan before it is replayed
+        The plan is replayed from original_state to find the position it ends in. Windows of moves are then removed and
+        pairs of moves of the same card are merged into one move, as long as the shorter plan still only makes legal
+        moves and reaches the same position. Every accepted change is verified with apply_action and auto_resolve
+
+        Returns a 2-tuple (actions, suit_insert_order). The actions contain regenerated ("resolve", n) entries, same as
+        the search produces. If the plan cannot be replayed or nothing could be removed, the given plan is returned
+    """
+    moves = plan_to_moves(actions, original_state)
+    if moves is None:
+        return actions, None
+
+    final_state, _ = simulate_moves(moves, original_state)
+    goal = position_key(final_state)
+
+    # Scan the plan again only while the previous pass shortened it
+    improved = False
+    while True:
+        candidate = _shorten_pass(moves, original_state, goal, window, merge_distance)
+        if candidate is None:
+            break
+        moves = candidate
+        improved = True
+
+    if not improved:
+        return actions, list(final_state.suit_insert_order)
+
+    return moves_to_plan(moves, original_state)
+
+
+def plan_to_moves(actions, original_state):
+    """
+        Turns a plan into a list of 2-tuples (action, card) without the resolve entries
+        The card is the card that the action moves, so the action can be bound again after earlier moves have changed
+        Returns None if the plan does not replay legally from the given state
+    """
+    state = original_state.clone()
+    moves = []
+
+    for action in actions:
+        if not isinstance(action, tuple):
+            return None
+        if action[1][0] == "resolve":
+            continue
+
+        if action not in state.get_legal_actions():
+            return None
+        card = get_moved_card(state, action)
+
+        state.apply_action(action)
+        state.auto_resolve()
+        moves.append((action, card))
+
+    return moves
+
+
+def is_winning_plan(actions, original_state):
+    """
+        Returns True if the plan replays legally from the given state and wins the game
+    """
+    moves = plan_to_moves(actions, original_state)
+    if moves is None:
+        return False
+
+    final_state, _ = simulate_moves(moves, original_state)
+    return final_state is not None and final_state.is_won()
+
+
+def moves_to_plan(moves, original_state):
+    """
+        Turns the moves back into a replayable plan with the resolve entries. Returns (actions, suit_insert_order)
+    """
+    state = original_state.clone()
+    actions = []
+
+    for move in moves:
+        action = bind_move(state, move)
+        state.apply_action(action)
+        actions.append(action)
+
+        resolved_count = state.auto_resolve()
+        if resolved_count > 0:
+            actions.append(((None, None), ("resolve", resolved_count)))
+
+    return actions, list(state.suit_insert_order)
+
+
+def simulate_moves(moves, original_state, goal=None):
+    """
+        Replays the moves from the given state. Returns a 2-tuple (state, moves_played)
+        If a goal position key is given, the state is returned as soon as the goal is reached
+        The state is None if a move is not legal anymore, or if the goal is given and never reached
+    """
+    state = original_state.clone()
+    moves_played = 0
+
+    if goal is not None and position_key(state) == goal:
+        return state, moves_played
+
+    for move in moves:
+        action = bind_move(state, move)
+        if action is None:
+            return None, moves_played
+
+        state.apply_action(action)
+        state.auto_resolve()
+        moves_played += 1
+
+        if goal is not None and position_key(state) == goal:
+            return state, moves_played
+
+    if goal is not None:
+        return None, moves_played
+
+    return state, moves_played
+
+
+def bind_move(state, move):
+    """
+        Finds the legal action in the given state that moves the same card to the same kind of target
+        Open slot indices are picked again, since removed moves change which slot is the first free one
+        Returns None if there is no such action
+    """
+    action, card = move
+    action_from = action[0]
+    action_to = action[1]
+
+    # Token discards do not depend on positions
+    if action_to[0] == "token":
+        bound = action
+
+    else:
+        # Find where the card is now
+        if action_from[0] == -1:
+            from_position = None
+            for i in OPEN_RANGE:
+                if state.open_slots[i] == card:
+                    from_position = (-1, i)
+                    break
+        else:
+            from_position = None
+            stack = state.stacks[action_from[0]]
+
+            # Token cards can only be moved from the top, and are not unique
+            if card[1] == 0:
+                if len(stack) > 0 and stack[-1] == card:
+                    from_position = (action_from[0], len(stack) - 1)
+            elif card in stack:
+                from_position = (action_from[0], stack.index(card))
+
+        if from_position is None:
+            return None
+
+        if action_to[0] == "open":
+            bound = None
+            for i in OPEN_RANGE:
+                if state.open_slots[i] is None:
+                    bound = (from_position, ("open", i))
+                    break
+            if bound is None:
+                return None
+        else:
+            bound = (from_position, action_to)
+
+    if bound not in state.get_legal_actions():
+        return None
+
+    return bound
+
+
+def get_moved_card(state, action):
+    """
+        Returns the card that the given action moves, or None for token discards
+    """
+    action_from = action[0]
+    if action_from[0] is None:
+        return None
+    if action_from[0] == -1:
+        return state.open_slots[action_from[1]]
+    return state.stacks[action_from[0]][action_from[1]]
+
+
+def position_key(state):
+    """
+        Returns a hashable key of the position, ignoring which open slot holds which card
+    """
+    return (
+        tuple(tuple(stack) for stack in state.stacks),
+        tuple(sorted(state.open_slots, key=str)),
+        tuple(suit[1] for suit in state.suit_stacks)
+    )
+
+
+def get_prefix_states(moves, state):
+    """
+        Replays the moves from the given state, which must all be legal
+        Returns the states before each move and the final state, len(moves) + 1 states
+    """
+    states = [state]
+    for move in moves:
+        state = state.clone()
+        state.apply_action(bind_move(state, move))
+        state.auto_resolve()
+        states.append(state)
+    return states
+
+
+def _shorten_pass(moves, original_state, goal, window, merge_distance):
+    """
+        Makes one pass over the moves, removing windows of moves and merging moves of the same card wherever the
+        shorter plan still reaches the goal
+        After a change the scan goes on from the same index instead of starting over. The states before each move are
+        kept, so a candidate is only replayed from the first move it changes
+        Returns the shorter list of moves, or None if nothing could be removed
+    """
+    original_length = len(moves)
+
+    # Drop trailing moves if the goal is already reached before the end
+    end_state, moves_played = simulate_moves(moves, original_state, goal)
+    if end_state is not None:
+        moves = moves[:moves_played]
+
+    prefix_states = get_prefix_states(moves, original_state)
+
+    # Try to remove windows of moves, largest first
+    for size in range(min(window, len(moves)), 0, -1):
+        start = 0
+        while start + size <= len(moves):
+            suffix = _get_reaching_suffix(moves[start + size:], prefix_states[start], goal)
+            if suffix is None:
+                start += 1
+                continue
+            moves = moves[:start] + suffix
+            prefix_states = prefix_states[:start] + get_prefix_states(suffix, prefix_states[start])
+
+    # Try to merge two moves of the same card into one move straight to the later target
+    i = 0
+    while i < len(moves):
+        suffix = _get_merged_suffix(moves, i, prefix_states[i], goal, merge_distance)
+        if suffix is None:
+            i += 1
+            continue
+        moves = moves[:i] + suffix
+        prefix_states = prefix_states[:i] + get_prefix_states(suffix, prefix_states[i])
+
+    if len(moves) == original_length:
+        return None
+    return moves
+
+
+def _get_reaching_suffix(suffix, state, goal):
+    """
+        Returns the given moves up to where they reach the goal from the given state, or None if they do not
+    """
+    end_state, moves_played = simulate_moves(suffix, state, goal)
+    if end_state is None:
+        return None
+    return suffix[:moves_played]
+
+
+def _get_merged_suffix(moves, i, state, goal, merge_distance):
+    """
+        Tries to merge move i with a later move of the same card. state is the state before move i
+        Returns the moves from index i on with the merge made, or None if no merge reaches the goal
+    """
+    first_action, card = moves[i]
+    if card is None:
+        return None
+
+    for j in range(i + 1, min(len(moves), i + 1 + merge_distance)):
+        second_action, second_card = moves[j]
+        if second_card != card:
+            continue
+
+        # Tokens are not unique, only merge them when the second move picks up where the first one left
+        if card[1] == 0 and not _continues_from(first_action, second_action):
+            return None
+
+        merged = (first_action[0], second_action[1]), card
+
+        # Either move the card early, or leave it in place until the second move
+        early = [merged] + moves[i + 1:j] + moves[j + 1:]
+        suffix = _get_reaching_suffix(early, state, goal)
+        if suffix is not None:
+            return suffix
+
+        late = moves[i + 1:j] + [merged] + moves[j + 1:]
+        return _get_reaching_suffix(late, state, goal)
+
+    return None
+
+
+def _continues_from(first_action, second_action):
+    """
+        Returns True if the second action picks the card up from where the first action put it
+    """
+    first_to = first_action[1]
+    second_from = second_action[0]
+
+    if first_to[0] == "open":
+        return second_from[0] == -1 and second_from[1] == first_to[1]
+    if first_to[0] == "stack":
+        return second_from[0] == first_to[1]
+    return False
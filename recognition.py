@@ -0,0 +1,264 @@
+import functools
+import math
+
+from game_state import GameState, STACK_COUNT, INITIAL_STACK_SIZE
+from layout import GAME_WIDTH, GAME_HEIGHT, BOARD_TOP_LEFT, BOARD_HORIZONTAL_DELIMITER, BOARD_VERTICAL_DELIMITER, \
+    CARD_VALUE_OFFSET, CARD_VALUE_SIZE, SUIT_STACK_LEFT, SUIT_STACK_TOP
+
+# Card recognition from the game view. Works on any image object with the PIL Image interface (size, crop, getpixel,
+# getdata), so the module itself does not need PIL
+
+# Colors
+
+RED_COLOR = (175, 51, 28)
+GREEN_COLOR = (26, 113, 79)
+BLACK_COLOR = (8, 8, 8)
+
+CARD_BASE_COLOR = (195, 196, 180)
+
+RED_TOKEN_COLOR = (180, 91, 70)
+GREEN_TOKEN_COLOR = (61, 131, 100)
+BLACK_TOKEN_COLOR = (56, 57, 52)
+
+ROSE_GREEN_COLOR = (31, 117, 84)
+ROSE_RED_COLOR = (179, 94, 73)
+
+COLOR_MATCH_THRESHOLD = 2
+
+
+# Color average lookup
+CARD_LOOKUP = {}
+CARD_LOOKUP["red"] = [
+    (190, 156, 139, 193, 195, 179),
+    (190, 157, 139, 177, 67, 44),
+    (187, 136, 117, 175, 56, 33),
+    (187, 135, 116, 175, 54, 31),
+    (186, 132, 113, 193, 194, 178),
+    (186, 134, 115, 179, 88, 66),
+    (186, 133, 114, 191, 177, 161),
+    (188, 143, 125, 180, 92, 70),
+    (185, 125, 105, 175, 57, 33),
+    (186, 133, 114, 175, 55, 31)
+]
+CARD_LOOKUP["green"] = [
+    (121, 160, 137, 148, 173, 152),
+    (148, 173, 152, 45, 123, 91),
+    (123, 161, 138, 32, 117, 83),
+    (122, 161, 137, 30, 116, 82),
+    (119, 159, 135, 193, 194, 178),
+    (121, 160, 136, 69, 134, 105),
+    (119, 159, 136, 173, 185, 167),
+    (132, 165, 143, 74, 137, 108),
+    (110, 155, 130, 32, 117, 83),
+    (120, 160, 136, 30, 116, 82)
+]
+CARD_LOOKUP["black"] = [
+    (131, 132, 122, 68, 69, 63),
+    (147, 148, 136, 30, 30, 27),
+    (120, 121, 111, 16, 16, 14),
+    (119, 120, 110, 13, 13, 12),
+    (115, 116, 107, 193, 194, 178),
+    (117, 118, 109, 56, 56, 52),
+    (116, 117, 108, 171, 172, 158),
+    (129, 130, 120, 61, 62, 57),
+    (106, 106, 98, 16, 16, 15),
+    (116, 117, 108, 13, 14, 12)
+]
+CARD_LOOKUP["rose"] = [(171, 142, 121, 193, 195, 179)]
+
+SUIT_STACKS_LOOKUP = {}
+SUIT_STACKS_LOOKUP["red"] = [
+    (190, 160, 143, 182, 110, 89),
+    (187, 136, 117, 175, 56, 33),
+    (187, 135, 116, 179, 87, 65)
+]
+SUIT_STACKS_LOOKUP["green"] = [
+    (152, 175, 155, 95, 147, 120),
+    (123, 161, 138, 32, 117, 83),
+    (121, 160, 137, 68, 134, 104)
+]
+SUIT_STACKS_LOOKUP["black"] = [
+    (152, 153, 141, 85, 85, 78),
+    (120, 121, 111, 16, 16, 14),
+    (118, 119, 110, 55, 55, 51)
+]
+
+
+def get_game_offset(image):
+    """
+        Returns the top left corner of the game view in the given screenshot
+        Define the game view as a defined rectangle around the center of the screen
+        Assume the game is in native resolution
+        Confirmed to work in 1080p and 1440p
+    """
+    width = image.size[0]
+    height = image.size[1]
+
+    return ((width - GAME_WIDTH)/2.0, (height - GAME_HEIGHT)/2.0)
+
+
+def crop(image):
+    """
+        Crop the image to only contain the game view
+    """
+    game_left, game_top = get_game_offset(image)
+    width = image.size[0]
+    height = image.size[1]
+
+    return image.crop((game_left, game_top, width - game_left, height - game_top))
+
+
+def recognize_state(image):
+    """
+        Parses the cropped game view into a validated GameState
+    """
+    # Initialize the beginning game state
+    state = GameState()
+
+    # Parse the image and populate the state
+    populate_state(image, state)
+
+    # Validate the game state, in case of auto-resolved cards at the beginning of the game
+    state.validate_state()
+
+    return state
+
+
+def populate_state(image, state, missing_positions=None):
+    """
+        Parse the image and populate the given game state
+        If missing_positions is given, the board positions (stack index, card index) where no card was matched are
+        appended to it
+    """
+
+    sampled_colors = {}
+
+    # Loop through the board and extract color data from card values
+    for i in range(STACK_COUNT):
+        for j in range(INITIAL_STACK_SIZE):
+            left = BOARD_TOP_LEFT[0] + i * BOARD_HORIZONTAL_DELIMITER + CARD_VALUE_OFFSET[0]
+            top = BOARD_TOP_LEFT[1] + j * BOARD_VERTICAL_DELIMITER + CARD_VALUE_OFFSET[1]
+
+            right = left + CARD_VALUE_SIZE[0]
+            bottom = top + CARD_VALUE_SIZE[1]
+            card_value = image.crop((left, top, right, bottom))
+
+            # Get avg from top left corner
+            top_left_avg = sample_avg_color(card_value, (2, 2))
+
+            # Get overall color average
+            pixels = list(card_value.getdata())
+            avg_color = avg_color_list(pixels)
+
+            comb_color = avg_color + top_left_avg
+
+            sampled_colors[(i, j)] = comb_color
+
+    position_lookup = {}
+
+    # Find the card colors and values
+    for position in sampled_colors:
+        comb_color = sampled_colors[position]
+
+        found = False
+
+        # Go through all color settings and try to find the correct one, that is as close to the given values as possible
+        for suit in CARD_LOOKUP:
+            if found:
+                break
+            suit_cards = CARD_LOOKUP[suit]
+            for card_index in range(len(suit_cards)):
+                comparison_color = suit_cards[card_index]
+
+                # Split the 6-tuples into 3-tuples
+                sampled_avg_color = comb_color[:3]
+                sampled_check_color = comb_color[3:]
+
+                comparison_avg_color = comparison_color[:3]
+                comparison_check_color = comparison_color[3:]
+
+                # Test if the colors are close to each other. Store the card position
+                if color_distance(sampled_avg_color, comparison_avg_color) < COLOR_MATCH_THRESHOLD and color_distance(sampled_check_color, comparison_check_color) < COLOR_MATCH_THRESHOLD:
+                    position_lookup[position] = (suit, card_index)
+                    found = True
+                    break
+
+        if not found:
+            # The card that should have been at the given place was probably auto-resolved. The state will update rose + suit counts
+            # print("Not found", position, comb_color)
+            if missing_positions is not None:
+                missing_positions.append(position)
+
+    for position in sorted(position_lookup.keys()):
+        stack_index = position[0]
+        state.parse_card_into_stack(stack_index, position_lookup[position])
+
+    # Check already resolved colors from suit stacks
+    for i in range(3):
+        left = SUIT_STACK_LEFT + i * BOARD_HORIZONTAL_DELIMITER + CARD_VALUE_OFFSET[0]
+        top = SUIT_STACK_TOP + CARD_VALUE_OFFSET[1]
+
+        right = left + CARD_VALUE_SIZE[0]
+        bottom = top + CARD_VALUE_SIZE[1]
+        card_value = image.crop((left, top, right, bottom))
+
+        # Get avg from top left corner
+        top_left_avg = sample_avg_color(card_value, (2, 2))
+
+        # Get overall color average
+        pixels = list(card_value.getdata())
+        avg_color = avg_color_list(pixels)
+
+        comb_color = avg_color + top_left_avg
+
+        found = False
+
+        for suit in SUIT_STACKS_LOOKUP:
+            if found:
+                break
+            suit_cards = SUIT_STACKS_LOOKUP[suit]
+            for card_index in range(len(suit_cards)):
+                comparison_color = suit_cards[card_index]
+
+                # Split the 6-tuples into 3-tuples
+                sampled_avg_color = comb_color[:3]
+                sampled_check_color = comb_color[3:]
+
+                comparison_avg_color = comparison_color[:3]
+                comparison_check_color = comparison_color[3:]
+
+                # Test if the colors are close to each other. Store the card position
+                if color_distance(sampled_avg_color, comparison_avg_color) < COLOR_MATCH_THRESHOLD and color_distance(sampled_check_color, comparison_check_color) < COLOR_MATCH_THRESHOLD:
+                    print("Autoresolved suit order:", suit)
+                    state.suit_insert_order.append(suit)
+                    found = True
+                    break
+
+
+def sample_avg_color(image, position):
+    """
+        Sample an average color from the image at the given position
+        Averages a 3x3 kernel around the pixel
+    """
+    kernel = []
+    topleft = (position[0] - 1, position[1] - 1)
+    for i in range(3):
+        for j in range(3):
+            kernel.append(image.getpixel((topleft[0] + j, topleft[1] + i)))
+    return avg_color_list(kernel)
+
+
+def avg_color_list(color_list):
+    """
+        Returns the average color of the given list of 3-tuples
+    """
+    colors = tuple(functools.reduce(lambda x, y: tuple(map(lambda a, b: a + b, x, y)), color_list))
+    colors = tuple(map(lambda x: x // len(color_list), colors))
+    return colors
+
+
+def color_distance(from_color, to_color):
+    """
+        Calculate the euclidean distance of two colors in 3D space
+    """
+    return math.sqrt((from_color[0] - to_color[0]) ** 2 + (from_color[1] - to_color[1]) ** 2 + (from_color[2] - to_color[2]) ** 2)
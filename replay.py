@@ -0,0 +1,237 @@
+from layout import CLICK_OPEN_SLOTS, CLICK_STACKS, CLICK_TOKEN_DISCARD_BUTTONS
+
+# Replay timing parameters
+
+REPLAY_WAIT_BETWEEN_ACTIONS = 0.06
+REPLAY_MOUSE_MOVE_TIME = 0.06
+REPLAY_AUTORESOLVE_WAIT_PER_ACTION = 0.25
+REPLAY_AUTORESOLVE_BASE_WAIT = 0.2
+
+# How often the board is sampled while waiting for auto-resolve animations, and how many equal samples in a row
+# count as a settled board
+REPLAY_SAMPLE_INTERVAL = 0.03
+REPLAY_STABLE_SAMPLES = 3
+
+# How long a drag waits at most for its source position to change on the board before the replay goes on
+REPLAY_DROP_WAIT = 0.25
+
+# Each replay step is a tuple:
+#   ("drag", from_position, to_position) drags with the left button. Equal positions make it a click
+#   ("resolve", count) waits for the game to auto-resolve the given number of cards
+#   ("discard", suit) waits for the game to discard the suit tokens
+#   ("pause", seconds) waits for a fixed time
+# Positions are in game coordinates
+
+
+class ReplayScheduler:
+    """
+        Plays replay steps on a driver
+
+        The fixed mode sleeps the worst case after every mouse event, the same way the replay always has. The adaptive
+        mode only waits for what the next event needs: a mouse event is given REPLAY_MOUSE_MOVE_TIME to register before
+        the next one that depends on it, the cursor is not moved if it is already at the source, drags wait until the
+        board shows the card gone from its source, and auto-resolves are waited on by sampling the board until it stops
+        changing. The worst case waits stay as the upper bound
+
+        probe is called with a tuple of positions to sample, or with None for the whole set of board sample positions,
+        and returns a sample that can be compared for equality
+    """
+
+    def __init__(self, driver, probe=None, adaptive=True):
+        self.driver = driver
+        self.probe = probe
+        self.adaptive = adaptive
+
+        self.position = None
+        self.last_event_time = None
+
+    def run(self, steps):
+        """
+            Plays all the given steps
+        """
+        for step in steps:
+            self.driver.note(step[0], step[1:])
+
+            if step[0] == "drag":
+                if self.adaptive:
+                    self._drag(step[1], step[2])
+                else:
+                    self._drag_fixed(step[1], step[2])
+
+            elif step[0] == "resolve" or step[0] == "discard":
+                # Discarding the tokens animates like resolving one card
+                count = step[1] if step[0] == "resolve" else 1
+                if self.adaptive:
+                    self._wait_for_resolve(count)
+                else:
+                    self.driver.sleep(REPLAY_AUTORESOLVE_BASE_WAIT + REPLAY_AUTORESOLVE_WAIT_PER_ACTION * count)
+
+            elif step[0] == "pause":
+                self.driver.sleep(step[1])
+
+        # Let the last mouse event register before returning
+        if self.adaptive:
+            self._wait_since_last_event(REPLAY_MOUSE_MOVE_TIME)
+
+    def _drag_fixed(self, from_position, to_position):
+        """
+            Drags with a fixed wait after each mouse event
+        """
+        self.driver.move(from_position)
+        self.driver.sleep(REPLAY_MOUSE_MOVE_TIME)
+        self.driver.press()
+        self.driver.sleep(REPLAY_MOUSE_MOVE_TIME)
+        self.driver.move(to_position)
+        self.driver.sleep(REPLAY_MOUSE_MOVE_TIME)
+        self.driver.release()
+        self.driver.sleep(REPLAY_MOUSE_MOVE_TIME)
+
+    def _drag(self, from_position, to_position):
+        """
+            Drags, only waiting between the mouse events that depend on each other
+        """
+        # Sample the source before the drag to notice when the card has left it
+        source_sample = None
+        if self.probe is not None and to_position != from_position:
+            source_sample = self.probe((from_position,))
+
+        # Moving the cursor does not need to wait for the previous drop, pressing does
+        if self.position != from_position:
+            self._event(self.driver.move, from_position)
+
+        self._wait_since_last_event(REPLAY_MOUSE_MOVE_TIME)
+        self._event(self.driver.press)
+
+        # Clicks do not need to move in between
+        if to_position != from_position:
+            self._wait_since_last_event(REPLAY_MOUSE_MOVE_TIME)
+            self._event(self.driver.move, to_position)
+
+        self._wait_since_last_event(REPLAY_MOUSE_MOVE_TIME)
+        self._event(self.driver.release)
+
+        if source_sample is not None:
+            self._wait_for_change((from_position,), source_sample, REPLAY_DROP_WAIT)
+
+    def _wait_for_change(self, positions, previous_sample, timeout):
+        """
+            Waits until the sample of the given positions differs from previous_sample, or timeout seconds have passed
+        """
+        start = self.driver.now()
+        while self.probe(positions) == previous_sample and self.driver.now() - start < timeout:
+            self.driver.sleep(REPLAY_SAMPLE_INTERVAL)
+
+    def _event(self, function, position=None):
+        """
+            Sends a mouse event and keeps track of the cursor
+        """
+        if position is not None:
+            function(position)
+            self.position = position
+        else:
+            function()
+        self.last_event_time = self.driver.now()
+
+    def _wait_since_last_event(self, seconds):
+        """
+            Sleeps until the given time has passed since the last mouse event
+        """
+        if self.last_event_time is None:
+            return
+        remaining = self.last_event_time + seconds - self.driver.now()
+        if remaining > 0:
+            self.driver.sleep(remaining)
+
+    def _wait_for_resolve(self, count):
+        """
+            Waits until the board has stopped changing after an auto-resolve of the given number of cards
+            If nothing changes at all, waits at least the base wait in case the animation starts late
+        """
+        worst_case = REPLAY_AUTORESOLVE_BASE_WAIT + REPLAY_AUTORESOLVE_WAIT_PER_ACTION * count
+
+        if self.probe is None:
+            self.driver.sleep(worst_case)
+            return
+
+        start = self.driver.now()
+        previous_sample = self.probe(None)
+        stable_samples = 0
+        changed = False
+
+        while self.driver.now() - start < worst_case:
+            self.driver.sleep(REPLAY_SAMPLE_INTERVAL)
+            sample = self.probe(None)
+
+            if sample == previous_sample:
+                stable_samples += 1
+            else:
+                stable_samples = 0
+                changed = True
+                previous_sample = sample
+
+            if stable_samples >= REPLAY_STABLE_SAMPLES:
+                if changed or self.driver.now() - start >= REPLAY_AUTORESOLVE_BASE_WAIT:
+                    break
+
+
+def actions_to_steps(actions, suit_positions):
+    """
+        Converts solved actions into replay steps in game coordinates
+        suit_positions is a dict of suit -> suit stack position
+    """
+    # Click on the area once to make sure the first click doesn't get captured by window focus
+    steps = [
+        ("pause", 0.5),
+        ("drag", CLICK_OPEN_SLOTS[0], CLICK_OPEN_SLOTS[1]),
+        ("pause", 0.5)
+    ]
+
+    for action in actions:
+        steps += action_to_steps(action, suit_positions)
+
+    return steps
+
+
+def action_to_steps(action, suit_positions):
+    """
+        Converts a solved action into replay steps in game coordinates
+    """
+    if action[0][0] is None:
+        # Discard suit tokens
+        if action[1][0] == "token":
+            suit = action[1][1]
+            return [
+                ("drag", CLICK_TOKEN_DISCARD_BUTTONS[suit], CLICK_TOKEN_DISCARD_BUTTONS[suit]),
+                ("discard", suit)
+            ]
+        # Auto-resolve
+        else:
+            return [("resolve", action[1][1])]
+
+    if action[0][0] == -1:
+        from_position = CLICK_OPEN_SLOTS[action[0][1]]
+
+        # Move from open slot to stack
+        if action[1][0] == "stack":
+            to_position = CLICK_STACKS[action[1][1]][5]
+
+        # Move from open slot to suit stack
+        else:
+            to_position = suit_positions[action[1][1]]
+    else:
+        from_position = CLICK_STACKS[action[0][0]][action[0][1]]
+
+        # Stack to stack
+        if action[1][0] == "stack":
+            # Always drag onto the 6th card, which will cover all vertical positions
+            to_position = CLICK_STACKS[action[1][1]][5]
+
+        # Stack to suit stack
+        elif action[1][0] == "suit":
+            to_position = suit_positions[action[1][1]]
+
+        # Stack to open slot
+        else:
+            to_position = CLICK_OPEN_SLOTS[action[1][1]]
+
+    return [("drag", from_position, to_position)]
@@ -0,0 +1,267 @@
+import functools
+
+from game_state import GameState
+from plan_optimizer import optimize_plan, is_winning_plan
+from search_memory import StatePool, paused_gc
+from instrumentation import get_search_functions
+from checkpoint import get_snapshot
+from endgame import ENDGAME_CARD_THRESHOLD, solve_endgame, finish_plan
+from macro_actions import MACRO, get_macro_actions, apply_macro
+
+MAX_SOLUTION_LENGTH = 45
+
+
+def solve_state(state, verbose=True, stats=None, cache=None, search_function=None):
+    """
+        Finds the plan to replay for the given validated starting state
+        The plan is taken from the SolutionCache if one is given and has it. Otherwise it is searched, shortened with
+        optimize_plan, and stored in the cache if it wins the game
+        search_function is called like search_solution, which is used by default
+        Returns a 2-tuple (actions, suit_insert_order)
+    """
+    if cache is not None:
+        cached_solution = cache.get(state)
+        if cached_solution is not None:
+            if verbose:
+                print("Found cached solution")
+            return cached_solution
+
+    if search_function is None:
+        search_function = search_solution
+
+    original_state = state.clone()
+    with paused_gc():
+        solution, suit_insert_order = search_function(state, verbose, stats)
+
+    # Finish plans that stop in the endgame exactly
+    solution, suit_insert_order = finish_plan(original_state, solution, suit_insert_order)
+
+    # Remove redundant moves from the plan before replaying it
+    optimized_solution, optimized_suit_order = optimize_plan(solution, original_state)
+    if optimized_suit_order is not None:
+        if verbose:
+            print("Optimized solution from", len(solution), "to", len(optimized_solution), "actions")
+        solution = optimized_solution
+        suit_insert_order = optimized_suit_order
+
+    # Plans that do not win are the best the search could do, search those deals again next time
+    if cache is not None and is_winning_plan(solution, original_state):
+        cache.put(original_state, solution, suit_insert_order)
+
+    return solution, suit_insert_order
+
+
+def search_solution(state, verbose=True, stats=None, checkpoint_writer=None, resume=None,
+                    endgame_card_threshold=ENDGAME_CARD_THRESHOLD, use_macros=True):
+    """
+        Searches for a solution from the given validated state
+        Returns a 2-tuple (actions, suit_insert_order). If no solution is found within the search limits, the actions
+        lead to the best state found
+        If a SolveStats is given, the time spent in each part of the search and the search counters are collected in it
+        If a CheckpointWriter is given, checkpoints of the search are written with it. A checkpoint of the same state
+        loaded with load_checkpoint can be given as resume to continue that search
+        States with fewer than endgame_card_threshold cards are finished with the exact endgame solver
+        If use_macros is True, the macro actions of get_macro_actions are expanded as single steps next to the legal
+        actions. Their primitive actions are added to the plan, so it replays the same way
+    """
+    # Setup lookups and other structures for the main solving loop
+    state_history = {}
+    search_stack = []
+
+    # Duplicate children are recycled for the next clones
+    pool = StatePool()
+
+    # Pick the functions called by the search, timed ones if stats are collected
+    functions = get_search_functions(pool, stats)
+    release_state = functions[1]
+    get_heuristic_value = functions[4]
+    get_children = get_children_function(functions, stats, use_macros)
+    finish_endgame = get_endgame_function(stats, endgame_card_threshold)
+    hash_state = hash
+    frontier_push = search_stack.append
+    frontier_pop = search_stack.pop
+    frontier_sort = sort_frontier
+
+    if stats is not None:
+        hash_state = stats.wrap("__hash__", hash_state)
+        frontier_push = stats.wrap_frontier_push(search_stack)
+        frontier_pop = stats.wrap("frontier_pop", frontier_pop)
+        frontier_sort = stats.wrap("frontier_sort", sort_frontier)
+        stats.start()
+
+    # Initialize the search stack
+    search_stack.append((state, [], 0))
+    shortest_solution = []
+    shortest_solution_suit_order = []
+
+    highest_heuristic = -999
+
+    # Start the main solving loop
+    states_searched = 0
+    last_states_searched_print = 0
+    last_states_searched_sort = 0
+
+    # Continue from the checkpoint instead
+    start_state_code = state.encode()
+    if resume is not None:
+        search_stack[:] = resume["frontier"]
+        for seen_state in resume["seen"]:
+            state_history[hash(seen_state)] = seen_state
+        shortest_solution = resume["shortest_solution"]
+        shortest_solution_suit_order = resume["suit_order"]
+        highest_heuristic = resume["highest_heuristic"]
+        states_searched = resume["states_searched"]
+        last_states_searched_print = states_searched
+
+    while True:
+        if states_searched > 50000 and highest_heuristic * 2000 < states_searched:
+            break
+        if checkpoint_writer is not None and checkpoint_writer.is_due(states_searched):
+            checkpoint_writer.submit(get_snapshot(start_state_code, search_stack, state_history, shortest_solution,
+                                                  shortest_solution_suit_order, highest_heuristic, states_searched))
+        if verbose and states_searched - last_states_searched_print > 10000:
+            print("Heuristic:", highest_heuristic)
+            last_states_searched_print = states_searched
+            print(len(search_stack), states_searched)
+
+        if states_searched - last_states_searched_sort > 100:
+            frontier_sort(search_stack)
+            last_states_searched_sort = states_searched
+
+        if len(search_stack) == 0:
+            if verbose:
+                print("Unable to find solution")
+            break
+
+        # Take state from the end of stack
+        current_search_item = frontier_pop()
+        current_state = current_search_item[0]
+        current_history = current_search_item[1]
+
+        if len(current_history) > MAX_SOLUTION_LENGTH and current_search_item[2] < 30:
+            continue
+
+        # Try to finish small positions exactly. If that fails, the heuristic still accepts them below
+        endgame = finish_endgame(current_state)
+        if endgame is not None:
+            shortest_solution = current_history + endgame[0]
+            shortest_solution_suit_order = endgame[1]
+            if verbose:
+                print("Solved endgame in", len(endgame[0]), "actions")
+                print("New shortest solution", len(shortest_solution))
+                print("States searched:", states_searched)
+                print("Stack size:", len(search_stack))
+                print()
+            break
+
+        if current_search_item[2] >= 100:  # current_state.is_won() or :
+            shortest_solution = current_history
+            shortest_solution_suit_order = current_state.suit_insert_order
+            if verbose:
+                print("New shortest solution", len(current_history))
+                print("States searched:", states_searched)
+                print("Stack size:", len(search_stack))
+                print()
+            break
+
+        for clone, actions in get_children(current_state):
+            # Hash the state, make sure we don't revisit a state
+            clone_hash = hash_state(clone)
+            if clone_hash in state_history:
+                if state_history[clone_hash] == clone:
+                    release_state(clone)
+                    continue
+            state_history[clone_hash] = clone
+
+            heuristic_score = get_heuristic_value(clone)
+
+            new_history = current_history + actions
+
+            if heuristic_score >= highest_heuristic:
+                highest_heuristic = heuristic_score
+                shortest_solution = new_history
+                shortest_solution_suit_order = clone.suit_insert_order
+
+            frontier_push((clone, new_history, heuristic_score))
+            states_searched += 1
+
+        # Sort the last 100 entries
+        #split_off = int(len(search_stack)/2)
+        #search_stack_start = search_stack[:-split_off]
+        #search_stack_end = search_stack[-split_off:]
+        #search_stack_end.sort(key=lambda item: item[2])
+        #search_stack = search_stack_start + search_stack_end
+
+        #search_stack.sort(key=lambda item: item[2])
+
+    if stats is not None:
+        stats.reused_states = pool.reuse_count
+        stats.finish(states_searched)
+
+    return shortest_solution, shortest_solution_suit_order
+
+
+def get_children_function(functions, stats=None, use_macros=True):
+    """
+        Returns the function that expands a state for the searches, so they all generate the same children
+        functions are the ones returned by get_search_functions. The returned function yields a 2-tuple (child,
+        actions) for each legal action of the given state, and each macro action of get_macro_actions if use_macros is
+        True. The actions are the plan steps from the state to the child, with the resolve entries
+    """
+    clone_state, release_state, apply_action, auto_resolve, get_heuristic_value, get_legal_actions = functions
+    get_macros = get_macro_actions
+    apply_macro_action = apply_macro
+
+    if stats is not None:
+        get_macros = stats.wrap_macro_actions(get_macros)
+        apply_macro_action = stats.wrap("apply_macro", apply_macro_action)
+
+    def get_children(state):
+        current_actions = get_legal_actions(state)
+        if use_macros:
+            current_actions = current_actions + get_macros(state)
+
+        for action in current_actions:
+            clone = clone_state(state)
+            if action[0] == MACRO:
+                yield clone, apply_macro_action(clone, action)
+                continue
+
+            apply_action(clone, action)
+            resolved_count = auto_resolve(clone)
+            if resolved_count > 0:
+                yield clone, [action, ((None, None), ("resolve", resolved_count))]
+            else:
+                yield clone, [action]
+
+    return get_children
+
+
+def get_endgame_function(stats=None, endgame_card_threshold=ENDGAME_CARD_THRESHOLD):
+    """
+        Returns the function that tries to finish a state with the exact endgame solver for the searches
+        The returned function returns the endgame of solve_endgame for states with fewer than endgame_card_threshold
+        cards, or None. The endgame positions that failed stay failed, so they are kept for all the calls
+    """
+    get_card_count = GameState.get_total_card_count
+    solve = functools.partial(solve_endgame, memo={})
+    if stats is not None:
+        solve = stats.wrap("solve_endgame", solve)
+
+    def finish_endgame(state):
+        if get_card_count(state) >= endgame_card_threshold:
+            return None
+        return solve(state)
+
+    return finish_endgame
+
+
+def sort_frontier(search_stack):
+    """
+        Sorts the search stack so that the states with the highest heuristic value are popped first
+    """
+    search_stack.sort(key=get_search_item_heuristic)
+
+
+def get_search_item_heuristic(item):
+    return item[2]
@@ -0,0 +1,70 @@
+import contextlib
+import gc
+
+from game_state import STACK_RANGE, OPEN_RANGE, SUIT_STACK_COUNT
+
+# How many discarded states are kept for reuse
+STATE_POOL_CAPACITY = 4096
+
+
+class StatePool:
+    """
+        Recycles the GameStates of discarded search children
+
+        A search clones a state for every child, and drops the children that are duplicates right away.
+        Those are released into the pool, and the next clone copies into one of them instead of allocating a new state
+        with new lists
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = STATE_POOL_CAPACITY if capacity is None else capacity
+        self.free_states = []
+
+        self.clone_count = 0
+        self.reuse_count = 0
+
+    def clone(self, state):
+        """
+            Returns a copy of the given state like GameState.clone, reusing a released state if there is one
+        """
+        self.clone_count += 1
+        if len(self.free_states) == 0:
+            return state.clone()
+
+        self.reuse_count += 1
+        clone = self.free_states.pop()
+
+        for i in STACK_RANGE:
+            clone.stacks[i][:] = state.stacks[i]
+        for i in OPEN_RANGE:
+            clone.open_slots[i] = state.open_slots[i]
+        for i in range(SUIT_STACK_COUNT):
+            clone.suit_stacks[i][1] = state.suit_stacks[i][1]
+        clone.suit_insert_order[:] = state.suit_insert_order
+        clone.actions_taken = state.actions_taken
+
+        return clone
+
+    def release(self, state):
+        """
+            Gives a state back for reuse. The state must not be used or referenced by the caller afterwards
+        """
+        if len(self.free_states) < self.capacity:
+            self.free_states.append(state)
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+        Turns off the cyclic garbage collector while the block runs
+
+        Search nodes do not form reference cycles, so during a solve the collector only costs time, scanning the
+        growing transposition table over and over. Everything it would have found is collected as usual afterwards
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
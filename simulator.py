@@ -0,0 +1,86 @@
+import random
+import sys
+import time
+
+from game_state import GameState, STACK_COUNT, INITIAL_STACK_SIZE
+from layout import get_suit_stack_positions
+from replay import ReplayScheduler, actions_to_steps
+from input_driver import SimulatedDriver
+from search import solve_state
+
+
+def create_random_state(seed=None):
+    """
+        Deals a random game the way the game does, and auto-resolves it like the game does at the start
+    """
+    rng = random.Random(seed)
+
+    cards = [("rose", 0)]
+    for suit in ["red", "green", "black"]:
+        cards += [(suit, value) for value in range(1, 10)]
+        cards += [(suit, 0) for i in range(4)]
+    rng.shuffle(cards)
+
+    state = GameState()
+    for i in range(STACK_COUNT):
+        for j in range(INITIAL_STACK_SIZE):
+            state.parse_card_into_stack(i, cards[i * INITIAL_STACK_SIZE + j])
+
+    state.auto_resolve()
+    return state
+
+
+def play_game(state, adaptive=True, verbose=False, cache=None):
+    """
+        Plays a whole game headless: solves the given state and replays the plan with the simulated driver
+        A SolutionCache can be given to reuse solutions of repeated deals
+        Returns a dict with the outcome and timings. replay_time is the simulated wall clock the replay would take
+    """
+    original_state = state.clone()
+
+    search_start = time.perf_counter()
+    actions, suit_insert_order = solve_state(state.clone(), verbose, cache=cache)
+    search_time = time.perf_counter() - search_start
+
+    steps = actions_to_steps(actions, get_suit_stack_positions(suit_insert_order))
+
+    driver = SimulatedDriver(original_state.clone())
+    scheduler = ReplayScheduler(driver, driver.probe, adaptive)
+    scheduler.run(steps)
+
+    return {
+        "won": driver.state.is_won(),
+        "cards_left": driver.state.get_total_card_count(),
+        "actions": len(driver.actions),
+        "errors": driver.errors,
+        "search_time": search_time,
+        "replay_time": driver.clock
+    }
+
+
+def benchmark(game_count, seed=0, adaptive=True):
+    """
+        Plays the given number of random games and prints how many games per hour the bot would play
+    """
+    total_time = 0
+    total_cards_left = 0
+    won_count = 0
+    error_count = 0
+
+    for i in range(game_count):
+        result = play_game(create_random_state(seed + i), adaptive)
+        total_time += result["search_time"] + result["replay_time"]
+        total_cards_left += result["cards_left"]
+        if result["won"]:
+            won_count += 1
+        if len(result["errors"]) > 0:
+            error_count += 1
+            print("Replay errors in game", seed + i, result["errors"])
+
+    print("Games:", game_count, "won:", won_count, "with replay errors:", error_count)
+    print("Average cards left:", round(total_cards_left / game_count, 1))
+    print("Games per hour:", round(3600 * game_count / total_time, 1))
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from plan_optimizer import is_winning_plan
+
+# How many solutions are kept before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class SolutionCache:
+    """
+        On-disk store of solved plans, keyed by the encoded starting state
+
+        Entries are kept in an SQLite database. Each entry stores the plan and the suit insert order as JSON, together
+        with a checksum of the payload. Entries that fail the checksum, or whose plan does not replay legally from the
+        state anymore, are removed when they are read. When the cache grows over max_entries, the least recently used
+        entries are evicted
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions ("
+            "state TEXT PRIMARY KEY, "
+            "payload TEXT NOT NULL, "
+            "checksum TEXT NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+        self.connection.commit()
+
+    def get(self, state):
+        """
+            Returns the stored 2-tuple (actions, suit_insert_order) for the given starting state, or None
+        """
+        key = state.encode()
+        row = self.connection.execute("SELECT payload, checksum FROM solutions WHERE state = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        payload, checksum = row
+        solution = None
+        if get_checksum(payload) == checksum:
+            try:
+                solution = decode_solution(payload)
+            except (ValueError, TypeError, KeyError):
+                solution = None
+
+        # Drop entries that are corrupt, or that are not a winning plan for the state
+        if solution is None or not is_winning_plan(solution[0], state):
+            self.connection.execute("DELETE FROM solutions WHERE state = ?", (key,))
+            self.connection.commit()
+            return None
+
+        self.connection.execute("UPDATE solutions SET last_used = ? WHERE state = ?", (time.time(), key))
+        self.connection.commit()
+        return solution
+
+    def put(self, state, actions, suit_insert_order):
+        """
+            Stores the solution of the given starting state, and evicts the least recently used entries if needed
+        """
+        payload = encode_solution(actions, suit_insert_order)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO solutions (state, payload, checksum, last_used) VALUES (?, ?, ?, ?)",
+            (state.encode(), payload, get_checksum(payload), time.time())
+        )
+
+        count = self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM solutions WHERE state IN (SELECT state FROM solutions ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def encode_solution(actions, suit_insert_order):
+    """
+        Encodes a plan and its suit insert order as JSON
+    """
+    return json.dumps({"actions": actions, "suit_insert_order": suit_insert_order}, separators=(",", ":"))
+
+
+def decode_solution(payload):
+    """
+        Decodes a plan encoded with encode_solution. JSON turns the action tuples into lists, so they are turned back
+    """
+    data = json.loads(payload)
+    actions = [(tuple(action[0]), tuple(action[1])) for action in data["actions"]]
+    return actions, list(data["suit_insert_order"])
+
+
+def get_checksum(payload):
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -1,145 +1,87 @@
-import PIL
-import pyscreenshot as ImageGrab
-import time
+import argparse
 import functools
-import math
-from pynput.mouse import Button, Controller
-
-from game_state import GameState, STACK_COUNT, OPEN_SLOT_COUNT, SUIT_STACK_COUNT, INITIAL_STACK_SIZE, MAX_STACK_SIZE
-
-# Constants used to crop the game view from the whole screen
-# Works properly if game is in native resolution
-
-GAME_WIDTH = 1300
-GAME_HEIGHT = 870
-
-# Will be calculated by code
+import os
+
+from search import solve_state, search_solution
+from external_search import search_solution_external
+from beam_search import search_solution_beam
+from solution_cache import SolutionCache
+from checkpoint import CheckpointWriter, load_checkpoint
+from instrumentation import SolveStats
+from recognition import get_game_offset, crop, recognize_state
+from replay import ReplayScheduler, actions_to_steps
+from input_driver import PynputDriver
+from deal_watcher import DealWatcher, ScreenFrameSource, WATCH_POLL_INTERVAL
+from layout import BOARD_SAMPLE_POSITIONS, BOARD_SAMPLE_RADIUS, get_suit_stack_positions
+
+# PIL, pyscreenshot and pynput are only imported when the screen is captured, an image is loaded or the mouse is used,
+# so solving and recognition can be used without them or a display. NumPy is only imported for the batched search
+
+# Game view position on the screen, will be calculated by code
 GAME_LEFT = 1000
 GAME_TOP = 500
 
-# Colors
-
-RED_COLOR = (175, 51, 28)
-GREEN_COLOR = (26, 113, 79)
-BLACK_COLOR = (8, 8, 8)
-
-CARD_BASE_COLOR = (195, 196, 180)
-
-RED_TOKEN_COLOR = (180, 91, 70)
-GREEN_TOKEN_COLOR = (61, 131, 100)
-BLACK_TOKEN_COLOR = (56, 57, 52)
-
-ROSE_GREEN_COLOR = (31, 117, 84)
-ROSE_RED_COLOR = (179, 94, 73)
-
-# Image parsing parameters
+# If set, the search timers and counters of each solve are written as JSON into this file
+SOLVE_STATS_PATH = None
 
-BOARD_TOP_LEFT = (93, 284)
-BOARD_HORIZONTAL_DELIMITER = 152
-BOARD_VERTICAL_DELIMITER = 31
+# If set, solutions are stored in this file and reused when the same deal comes up again
+SOLUTION_CACHE_PATH = "solutions.db"
 
-CARD_VALUE_OFFSET = (12, 10)
-CARD_VALUE_SIZE = (12, 21)
+# If set, checkpoints of the best-first search are written into this file while it runs
+CHECKPOINT_PATH = None
 
-SUIT_STACK_LEFT = 853
-SUIT_STACK_TOP = 19
-
-COLOR_MATCH_THRESHOLD = 2
-
-# Autoplay parmeters
-CLICK_TOKEN_DISCARD_BUTTONS = {
-    "red": (578, 55),
-    "green": (578, 140),
-    "black": (578, 225)
+# Search functions that can be picked from the command line
+SEARCH_MODES = {
+    "best-first": search_solution,
+    "external": search_solution_external,
+    "beam": search_solution_beam,
+    "beam-numpy": lambda state, verbose=True, stats=None: search_beam_numpy(state, verbose, stats)
 }
 
-CLICK_OPEN_SLOTS = [
-    (100, 30),
-    (256, 30),
-    (410, 30)
-]
-
-CLICK_SUIT_STACKS = {
-
-}
-
-CLICK_SUIT_STACK_POSITIONS = [
-    (862, 30),
-    (1015, 30),
-    (1168, 30)
-]
-
-CLICK_STACKS = [[(0, 0) for j in range(MAX_STACK_SIZE)] for i in range(STACK_COUNT)]
-
-# Color average lookup
-CARD_LOOKUP = {}
-CARD_LOOKUP["red"] = [
-    (190, 156, 139, 193, 195, 179),
-    (190, 157, 139, 177, 67, 44),
-    (187, 136, 117, 175, 56, 33),
-    (187, 135, 116, 175, 54, 31),
-    (186, 132, 113, 193, 194, 178),
-    (186, 134, 115, 179, 88, 66),
-    (186, 133, 114, 191, 177, 161),
-    (188, 143, 125, 180, 92, 70),
-    (185, 125, 105, 175, 57, 33),
-    (186, 133, 114, 175, 55, 31)
-]
-CARD_LOOKUP["green"] = [
-    (121, 160, 137, 148, 173, 152),
-    (148, 173, 152, 45, 123, 91),
-    (123, 161, 138, 32, 117, 83),
-    (122, 161, 137, 30, 116, 82),
-    (119, 159, 135, 193, 194, 178),
-    (121, 160, 136, 69, 134, 105),
-    (119, 159, 136, 173, 185, 167),
-    (132, 165, 143, 74, 137, 108),
-    (110, 155, 130, 32, 117, 83),
-    (120, 160, 136, 30, 116, 82)
-]
-CARD_LOOKUP["black"] = [
-    (131, 132, 122, 68, 69, 63),
-    (147, 148, 136, 30, 30, 27),
-    (120, 121, 111, 16, 16, 14),
-    (119, 120, 110, 13, 13, 12),
-    (115, 116, 107, 193, 194, 178),
-    (117, 118, 109, 56, 56, 52),
-    (116, 117, 108, 171, 172, 158),
-    (129, 130, 120, 61, 62, 57),
-    (106, 106, 98, 16, 16, 15),
-    (116, 117, 108, 13, 14, 12)
-]
-CARD_LOOKUP["rose"] = [(171, 142, 121, 193, 195, 179)]
-
-SUIT_STACKS_LOOKUP = {}
-SUIT_STACKS_LOOKUP["red"] = [
-    (190, 160, 143, 182, 110, 89),
-    (187, 136, 117, 175, 56, 33),
-    (187, 135, 116, 179, 87, 65)
-]
-SUIT_STACKS_LOOKUP["green"] = [
-    (152, 175, 155, 95, 147, 120),
-    (123, 161, 138, 32, 117, 83),
-    (121, 160, 137, 68, 134, 104)
-]
-SUIT_STACKS_LOOKUP["black"] = [
-    (152, 153, 141, 85, 85, 78),
-    (120, 121, 111, 16, 16, 14),
-    (118, 119, 110, 55, 55, 51)
-]
-
-MAX_SOLUTION_LENGTH = 45
-
-REPLAY_WAIT_BETWEEN_ACTIONS = 0.06
-REPLAY_MOUSE_MOVE_TIME = 0.06
-REPLAY_AUTORESOLVE_WAIT_PER_ACTION = 0.25
-
 
 def main():
-    intro_print()
-    # time.sleep(5)
-
-    solve()
+    arguments = parse_arguments()
+
+    solve_deal = functools.partial(solve, arguments.image, not arguments.no_replay, not arguments.fixed_timing,
+                                   arguments.stats, arguments.cache, SEARCH_MODES[arguments.search],
+                                   arguments.checkpoint, arguments.resume)
+
+    if arguments.watch:
+        watch_deals(solve_deal, arguments.watch_interval)
+        return
+
+    if arguments.image is None:
+        intro_print()
+        # time.sleep(5)
+
+    solve_deal()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Solves and plays the SHENZHEN I/O solitaire")
+    parser.add_argument("--image", help="solve a saved game view image instead of the screen, without replaying")
+    parser.add_argument("--no-replay", action="store_true", help="only print the solution")
+    parser.add_argument("--fixed-timing", action="store_true", help="replay with the fixed worst case waits")
+    parser.add_argument("--stats", default=SOLVE_STATS_PATH, help="write search timers and counters into this file")
+    parser.add_argument("--cache", default=SOLUTION_CACHE_PATH, help="solution cache file, empty to disable")
+    parser.add_argument("--search", choices=sorted(SEARCH_MODES), default="best-first",
+                        help="search mode, external keeps memory bounded for hard deals, beam bounds time and memory")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH,
+                        help="write checkpoints of the best-first search into this file")
+    parser.add_argument("--resume", action="store_true", help="continue the search from the checkpoint file")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep watching the screen and solve every new deal once it has been dealt")
+    parser.add_argument("--watch-interval", type=float, default=WATCH_POLL_INTERVAL,
+                        help="seconds between the board polls of --watch")
+
+    arguments = parser.parse_args()
+    if arguments.checkpoint and arguments.search != "best-first":
+        parser.error("--checkpoint only works with the best-first search")
+    if arguments.resume and not arguments.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    if arguments.watch and arguments.image:
+        parser.error("--watch only works on the screen, not with --image")
+    return arguments
 
 
 def intro_print():
@@ -151,365 +93,162 @@ def intro_print():
     print("To exit, close the script between games")
 
 
-def solve():
+def solve(image_path=None, replay=True, adaptive=True, stats_path=SOLVE_STATS_PATH, cache_path=SOLUTION_CACHE_PATH,
+          search_function=search_solution, checkpoint_path=CHECKPOINT_PATH, resume=False, image=None):
     """
         Solves the current game configuration
+        If an image path is given, the game view is loaded from it and the solution is only printed
+        If a game view image is given, it is solved instead of capturing the screen
+        If a checkpoint path is given, the best-first search writes checkpoints into it, and continues from the
+        checkpoint in it if resume is True. The checkpoint of the deal is removed once the search finishes
     """
-    image = ImageGrab.grab()
-    image = crop(image)
-
-    #image = PIL.Image.open("reference_img4.bmp")
-
-    # Initialize the beginning game state
-    state = GameState()
-
-    # Parse the image and populate the state
-    populate_state(image, state)
-
-    # Validate the game state, in case of auto-resolved cards at the beginning of the game
-    state.validate_state()
-
-    # Setup lookups and other structures for the main solving loop
-    state_history = {}
-    search_stack = []
-
-    # Initialize the search stack
-    search_stack.append((state, [], 0))
-    shortest_solution = [0 for i in range(10000)]
-    shortest_solution_suit_order = []
-
-    original_state = state.clone()
-    highest_heuristic = -999
-
-    # Start the main solving loop
-    states_searched = 0
-    last_states_searched_print = 0
-    last_states_searched_sort = 0
-
-    while True:
-        if states_searched > 50000 and highest_heuristic * 2000 < states_searched:
-            break
-        if states_searched - last_states_searched_print > 10000:
-            print("Heuristic:", highest_heuristic)
-            last_states_searched_print = states_searched
-            print(len(search_stack), states_searched)
-
-        if states_searched - last_states_searched_sort > 100:
-            search_stack.sort(key=lambda item: item[2])
-
-        if len(search_stack) == 0 and len(state_history) > 0:
-            print("Unable to find solution")
-            break
-
-        # Take state from the end of stack
-        current_search_item = search_stack.pop()
-        current_state = current_search_item[0]
-        current_history = current_search_item[1]
-
-        if len(current_history) > MAX_SOLUTION_LENGTH and current_search_item[2] < 30:
-            continue
-
-        if current_search_item[2] >= 100:  # current_state.is_won() or :
-            if len(current_history) < len(shortest_solution):
-                shortest_solution = current_history
-                print("New shortest solution", len(current_history))
-                print("States searched:", states_searched)
-                print("Stack size:", len(search_stack))
-                print()
-            break
-
-        current_actions = current_state.get_legal_actions()
-
-        for action in current_actions:
-            clone = current_state.clone()
-            clone.apply_action(action)
-            resolved_count = clone.auto_resolve()
-
-            # Hash the state, make sure we don't revisit a state
-            clone_hash = hash(clone)
-            if clone_hash in state_history:
-                if state_history[clone_hash] == clone:
-                    continue
-            state_history[clone_hash] = clone
-
-            heuristic_score = clone.get_heuristic_value()
-
-            if heuristic_score >= highest_heuristic:
-                highest_heuristic = heuristic_score
-                shortest_solution = current_history + [action]
-                shortest_solution_suit_order = clone.suit_insert_order
-
-            new_history = list(current_history)
-            new_history += [action]
-            if resolved_count > 0:
-                new_history += [((None, None), ("resolve", resolved_count))]
-
-            search_stack.append((clone, new_history, heuristic_score))
-            states_searched += 1
-
-        # Sort the last 100 entries
-        #split_off = int(len(search_stack)/2)
-        #search_stack_start = search_stack[:-split_off]
-        #search_stack_end = search_stack[-split_off:]
-        #search_stack_end.sort(key=lambda item: item[2])
-        #search_stack = search_stack_start + search_stack_end
-
-        #search_stack.sort(key=lambda item: item[2])
-
-    # print(original_state)
-    # for action in shortest_solution:
-    #    print(action)
+    if image is None:
+        if image_path is None:
+            image = capture_game_view()
+        else:
+            image = load_game_view(image_path)
+            replay = False
+
+    state = recognize_state(image)
+
+    stats = SolveStats() if stats_path else None
+    cache = SolutionCache(cache_path) if cache_path else None
+
+    checkpoint_writer = None
+    if checkpoint_path:
+        checkpoint = load_resume_checkpoint(checkpoint_path, state) if resume else None
+        checkpoint_writer = CheckpointWriter(checkpoint_path, start_state_code=state.encode())
+        search_function = functools.partial(search_function, checkpoint_writer=checkpoint_writer, resume=checkpoint)
+
+    finished = False
+    try:
+        shortest_solution, shortest_solution_suit_order = solve_state(state, stats=stats, cache=cache,
+                                                                      search_function=search_function)
+        finished = True
+    finally:
+        # Keep the checkpoint if the search did not finish
+        if checkpoint_writer is not None:
+            checkpoint_writer.close(remove=finished)
+
+    if stats is not None and stats.start_time is not None:
+        stats.write_json(stats_path)
+    if cache is not None:
+        cache.close()
+
+    if not replay:
+        for action in shortest_solution:
+            print(action)
+        return shortest_solution, shortest_solution_suit_order
 
     # Resolve the suit stack order
-    cloned_suit_stack_positions = list(CLICK_SUIT_STACK_POSITIONS)
-    for i in range(len(shortest_solution_suit_order)):
-        suit = shortest_solution_suit_order[i]
-        CLICK_SUIT_STACKS[suit] = cloned_suit_stack_positions.pop(0)
+    suit_positions = get_suit_stack_positions(shortest_solution_suit_order)
 
-    replay_actions(shortest_solution)
+    replay_actions(shortest_solution, suit_positions, adaptive)
 
+    return shortest_solution, shortest_solution_suit_order
 
-def replay_actions(actions):
-    """
-        Plays the solved actions on the board
-    """
-    mouse = Controller()
 
-    print("Replaying", len(actions), "actions")
-    time.sleep(0.5)
-
-    # Click on the area once to make sure the first click doesn't get captured by window focus
-    drag_from_to(mouse, CLICK_OPEN_SLOTS[0], CLICK_OPEN_SLOTS[1])
-    time.sleep(0.5)
-
-    for action in actions:
-        print(action)
-        if action[0][0] is None:
-            # Discard suit tokens
-            if action[1][0] == "token":
-                suit = action[1][1]
-                drag_from_to(mouse, CLICK_TOKEN_DISCARD_BUTTONS[suit], CLICK_TOKEN_DISCARD_BUTTONS[suit])
-                time.sleep(0.2 + REPLAY_AUTORESOLVE_WAIT_PER_ACTION)
-            # Auto-resolve
-            else:
-                time.sleep(0.2 + REPLAY_AUTORESOLVE_WAIT_PER_ACTION * action[1][1])
-        else:
-            if action[0][0] == -1:
-
-                # Move from open slot to stack
-                if action[1][0] == "stack":
-                    from_position = CLICK_OPEN_SLOTS[action[0][1]]
-                    to_position = CLICK_STACKS[action[1][1]][5]
-                    drag_from_to(mouse, from_position, to_position)
-
-                # Move from open slot to suit stack
-                else:
-                    from_position = CLICK_OPEN_SLOTS[action[0][1]]
-                    to_position = CLICK_SUIT_STACKS[action[1][1]]
-                    drag_from_to(mouse, from_position, to_position)
-            else:
-                # Stack to stack
-                if action[1][0] == "stack":
-                    from_position = CLICK_STACKS[action[0][0]][action[0][1]]
-                    # Always drag onto the 6th card, which will cover all vertical positions
-                    to_position = CLICK_STACKS[action[1][1]][5]
-                    drag_from_to(mouse, from_position, to_position)
-
-                # Stack to suit stack
-                elif action[1][0] == "suit":
-                    from_position = CLICK_STACKS[action[0][0]][action[0][1]]
-                    to_position = CLICK_SUIT_STACKS[action[1][1]]
-                    drag_from_to(mouse, from_position, to_position)
-
-                # Stack to open slot
-                else:
-                    from_position = CLICK_STACKS[action[0][0]][action[0][1]]
-                    to_position = CLICK_OPEN_SLOTS[action[1][1]]
-                    drag_from_to(mouse, from_position, to_position)
-
-
-def click_on(mouse, position__):
-    position = game_to_screen(position__)
-    mouse.position = position
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-    mouse.click(Button.left, 1)
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-
-
-def drag_from_to(mouse, from_position__, to_position__):
-    from_position = game_to_screen(from_position__)
-    to_position = game_to_screen(to_position__)
-    mouse.position = from_position
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-    mouse.press(Button.left)
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-    mouse.position = to_position
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-    mouse.release(Button.left)
-    time.sleep(REPLAY_MOUSE_MOVE_TIME)
-
-
-def crop(image):
+def watch_deals(solve_deal, interval=WATCH_POLL_INTERVAL):
     """
-        Crop the image to only contain the game view
-        Define the game view as a defined rectangle around the center of the screen
-        Assume the game is in native resolution
-        Confirmed to work in 1080p and 1440p
+        Solves every new deal on the screen until the script is closed
+        The deal watcher polls a few tiles of the board until a deal has finished animating, and the game view it grabs
+        then is passed to solve_deal, which is called like solve with only the image
     """
-    global GAME_LEFT
-    global GAME_TOP
-
-    width = image.size[0]
-    height = image.size[1]
-    game_width = GAME_WIDTH
-    game_height = GAME_HEIGHT
+    # Find the game view position once, the watcher only grabs parts of it
+    capture_game_view()
+    watcher = DealWatcher(ScreenFrameSource(game_to_screen), interval)
 
-    GAME_LEFT = (width - game_width)/2.0
-    GAME_TOP = (height - game_height)/2.0
+    print("Watching the board for new deals")
+    print("To exit, close the script between games")
 
-    return image.crop((GAME_LEFT, GAME_TOP, width - GAME_LEFT, height - GAME_TOP))
+    # A deal that is already on the board when the watch starts is solved too
+    require_change = False
+    while True:
+        image = watcher.wait_for_deal(require_change=require_change)
+        solve_deal(image=image)
+        require_change = True
 
 
-def populate_state(image, state):
+def search_beam_numpy(state, verbose=True, stats=None):
     """
-        Parse the image and populate the given game state
+        Batched beam search, NumPy is only imported when it is used
     """
+    from batch_engine import search_solution_beam_batched
 
-    sampled_colors = {}
-
-    # Loop through the board and extract color data from card values
-    for i in range(STACK_COUNT):
-        for j in range(MAX_STACK_SIZE):
-            left = BOARD_TOP_LEFT[0] + i * BOARD_HORIZONTAL_DELIMITER + CARD_VALUE_OFFSET[0]
-            top = BOARD_TOP_LEFT[1] + j * BOARD_VERTICAL_DELIMITER + CARD_VALUE_OFFSET[1]
-
-            CLICK_STACKS[i][j] = (left, top)
-
-            if j >= INITIAL_STACK_SIZE:
-                continue
-
-            right = left + CARD_VALUE_SIZE[0]
-            bottom = top + CARD_VALUE_SIZE[1]
-            card_value = image.crop((left, top, right, bottom))
-
-            # Get avg from top left corner
-            top_left_avg = sample_avg_color(card_value, (2, 2))
-
-            # Get overall color average
-            pixels = list(card_value.getdata())
-            avg_color = avg_color_list(pixels)
-
-            comb_color = avg_color + top_left_avg
-
-            sampled_colors[(i, j)] = comb_color
-
-    position_lookup = {}
-
-    # Find the card colors and values
-    for position in sampled_colors:
-        comb_color = sampled_colors[position]
-
-        found = False
-
-        # Go through all color settings and try to find the correct one, that is as close to the given values as possible
-        for suit in CARD_LOOKUP:
-            if found:
-                break
-            suit_cards = CARD_LOOKUP[suit]
-            for card_index in range(len(suit_cards)):
-                comparison_color = suit_cards[card_index]
-
-                # Split the 6-tuples into 3-tuples
-                sampled_avg_color = comb_color[:3]
-                sampled_check_color = comb_color[3:]
+    return search_solution_beam_batched(state, verbose, stats)
 
-                comparison_avg_color = comparison_color[:3]
-                comparison_check_color = comparison_color[3:]
 
-                # Test if the colors are close to each other. Store the card position
-                if color_distance(sampled_avg_color, comparison_avg_color) < COLOR_MATCH_THRESHOLD and color_distance(sampled_check_color, comparison_check_color) < COLOR_MATCH_THRESHOLD:
-                    position_lookup[position] = (suit, card_index)
-                    found = True
-                    break
-
-        if not found:
-            pass
-            # The card that should have been at the given place was probably auto-resolved. The state will update rose + suit counts
-            # print("Not found", position, comb_color)
-
-    for position in sorted(position_lookup.keys()):
-        stack_index = position[0]
-        state.parse_card_into_stack(stack_index, position_lookup[position])
+def load_resume_checkpoint(path, state):
+    """
+        Loads the checkpoint to resume the search of the given state from, or returns None if there is none for it
+    """
+    if not os.path.exists(path):
+        print("No checkpoint to resume from, starting a new search")
+        return None
 
-    # Check already resolved colors from suit stacks
-    for i in range(3):
-        left = SUIT_STACK_LEFT + i * BOARD_HORIZONTAL_DELIMITER + CARD_VALUE_OFFSET[0]
-        top = SUIT_STACK_TOP + CARD_VALUE_OFFSET[1]
+    checkpoint = load_checkpoint(path)
+    if checkpoint is None or checkpoint["start"] != state.encode():
+        print("The checkpoint is not for this deal, starting a new search")
+        return None
 
-        right = left + CARD_VALUE_SIZE[0]
-        bottom = top + CARD_VALUE_SIZE[1]
-        card_value = image.crop((left, top, right, bottom))
+    print("Resuming search from", checkpoint["states_searched"], "states")
+    return checkpoint
 
-        # Get avg from top left corner
-        top_left_avg = sample_avg_color(card_value, (2, 2))
 
-        # Get overall color average
-        pixels = list(card_value.getdata())
-        avg_color = avg_color_list(pixels)
+def capture_game_view():
+    """
+        Grabs the screen and crops the game view from it. Stores the game view position for the mouse interaction
+    """
+    global GAME_LEFT
+    global GAME_TOP
 
-        comb_color = avg_color + top_left_avg
+    import pyscreenshot as ImageGrab
 
-        found = False
+    image = ImageGrab.grab()
+    GAME_LEFT, GAME_TOP = get_game_offset(image)
 
-        for suit in SUIT_STACKS_LOOKUP:
-            if found:
-                break
-            suit_cards = SUIT_STACKS_LOOKUP[suit]
-            for card_index in range(len(suit_cards)):
-                comparison_color = suit_cards[card_index]
+    return crop(image)
 
-                # Split the 6-tuples into 3-tuples
-                sampled_avg_color = comb_color[:3]
-                sampled_check_color = comb_color[3:]
 
-                comparison_avg_color = comparison_color[:3]
-                comparison_check_color = comparison_color[3:]
+def load_game_view(path):
+    """
+        Loads a saved screenshot and crops the game view from it
+    """
+    from PIL import Image
 
-                # Test if the colors are close to each other. Store the card position
-                if color_distance(sampled_avg_color, comparison_avg_color) < COLOR_MATCH_THRESHOLD and color_distance(sampled_check_color, comparison_check_color) < COLOR_MATCH_THRESHOLD:
-                    print("Autoresolved suit order:", suit)
-                    state.suit_insert_order.append(suit)
-                    found = True
-                    break
+    return crop(Image.open(path).convert("RGB"))
 
 
-def sample_avg_color(image, position):
+def replay_actions(actions, suit_positions, adaptive=True):
     """
-        Sample an average color from the image at the given position
-        Averages a 3x3 kernel around the pixel
+        Plays the solved actions on the board
     """
-    kernel = []
-    topleft = (position[0] - 1, position[1] - 1)
-    for i in range(3):
-        for j in range(3):
-            kernel.append(image.getpixel((topleft[0] + j, topleft[1] + i)))
-    return avg_color_list(kernel)
+    print("Replaying", len(actions), "actions")
 
+    steps = actions_to_steps(actions, suit_positions)
 
-def avg_color_list(color_list):
-    """
-        Returns the average color of the given list of 3-tuples
-    """
-    colors = tuple(functools.reduce(lambda x, y: tuple(map(lambda a, b: a + b, x, y)), color_list))
-    colors = tuple(map(lambda x: x // len(color_list), colors))
-    return colors
+    scheduler = ReplayScheduler(PynputDriver(game_to_screen), sample_board, adaptive)
+    scheduler.run(steps)
 
 
-def color_distance(from_color, to_color):
+def sample_board(positions=None):
     """
-        Calculate the euclidean distance of two colors in 3D space
+        Returns the pixels of a small box around each of the given positions of the game view, BOARD_SAMPLE_POSITIONS
+        by default. Used to notice when the board changes and when it stops changing
+        The area around all positions is grabbed once and the boxes are cropped from it, as every grab starts a new
+        screenshot process
     """
-    return math.sqrt((from_color[0] - to_color[0]) ** 2 + (from_color[1] - to_color[1]) ** 2 + (from_color[2] - to_color[2]) ** 2)
+    if positions is None:
+        positions = BOARD_SAMPLE_POSITIONS
+
+    size = 2 * BOARD_SAMPLE_RADIUS + 1
+    boxes = [(position[0] - BOARD_SAMPLE_RADIUS, position[1] - BOARD_SAMPLE_RADIUS) for position in positions]
+    area = (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[0] for box in boxes) + size, max(box[1] for box in boxes) + size)
+
+    image = ScreenFrameSource(game_to_screen).grab(area)
+    return tuple(image.crop((box[0] - area[0], box[1] - area[1], box[0] - area[0] + size, box[1] - area[1] + size))
+                 .tobytes() for box in boxes)
 
 
 def game_to_screen(position):
@@ -0,0 +1,87 @@
+from collections import Counter
+
+import pytest
+
+# The batched engine is optional, like its --search mode
+pytest.importorskip("numpy")
+
+from batch_engine import BatchBoards, expand
+from game_state import decode_state, encode_action
+from test_game_state import DEADLOCKED_STATE_CODE, get_random_walk_states
+
+
+def get_walk_states():
+    """
+        Returns the auto-resolved random-walk positions, expanded by both engines
+    """
+    states = []
+    for state in get_random_walk_states():
+        state.auto_resolve()
+        states.append(state)
+    return states
+
+
+def get_scalar_children(state):
+    """
+        Returns the children of the state expanded with GameState, counted by action, encoding, resolve count and
+        heuristic value
+    """
+    children = Counter()
+    for action in state.get_legal_actions():
+        clone = state.clone()
+        clone.apply_action(action)
+        resolved_count = clone.auto_resolve()
+        children[(encode_action(action), clone.encode(), resolved_count, clone.get_heuristic_value())] += 1
+    return children
+
+
+def test_conversion_round_trip():
+    states = get_walk_states()
+    boards = BatchBoards.from_states(states)
+
+    for i in range(len(states)):
+        state = boards.to_state(i)
+        assert state.encode() == states[i].encode()
+        assert state.actions_taken == states[i].actions_taken
+
+
+def test_expand_matches_game_state():
+    states = get_walk_states()
+    boards = BatchBoards.from_states(states)
+
+    children, parent_indices, action_indices, resolved_counts = expand(boards)
+    heuristic_values = children.get_heuristic_values()
+
+    batched_children = [Counter() for state in states]
+    for n in range(len(children)):
+        parent_index = int(parent_indices[n])
+        action = boards.to_action(parent_index, action_indices[n])
+        batched_children[parent_index][(encode_action(action), children.to_state(n).encode(), int(resolved_counts[n]),
+                                        float(heuristic_values[n]))] += 1
+
+    for i in range(len(states)):
+        assert batched_children[i] == get_scalar_children(states[i])
+
+
+def test_keys_match_game_state_equality():
+    states = get_walk_states()
+    children = expand(BatchBoards.from_states(states))[0]
+    keys = children.get_keys()
+
+    # Equal keys exactly for the boards GameState compares equal, by their stacks and open slots
+    key_boards = set()
+    for n in range(len(children)):
+        state = children.to_state(n)
+        key_boards.add((keys[n].tobytes(), str(state.stacks), str(state.open_slots)))
+    assert len(key_boards) == len(set(keys.tolist()))
+    assert len(key_boards) == len(set(board[1:] for board in key_boards))
+
+
+def test_deadlocked_matches_game_state():
+    states = get_walk_states() + [decode_state(DEADLOCKED_STATE_CODE)]
+    boards = BatchBoards.from_states(states)
+
+    deadlocked = boards.get_deadlocked(list(range(len(states))))
+    assert deadlocked[-1]
+    for i in range(len(states)):
+        assert deadlocked[i] == states[i].is_deadlocked()
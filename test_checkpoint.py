@@ -0,0 +1,44 @@
+import os
+
+from checkpoint import CheckpointWriter, get_snapshot, write_checkpoint, get_checkpoint_start
+from simulator import create_random_state
+
+
+def write_start_checkpoint(path, state):
+    """
+        Writes the checkpoint of a search of the given state that has not expanded anything yet
+    """
+    write_checkpoint(path, get_snapshot(state.encode(), [(state, [], 0)], {}, [], [], -999, 0))
+
+
+def test_close_keeps_checkpoint_of_other_deal(tmp_path):
+    path = str(tmp_path / "search.ckpt")
+    other_state = create_random_state(1)
+    write_start_checkpoint(path, other_state)
+
+    writer = CheckpointWriter(path, start_state_code=create_random_state(0).encode())
+    writer.close(remove=True)
+
+    assert get_checkpoint_start(path) == other_state.encode()
+
+
+def test_close_removes_checkpoint_of_same_deal(tmp_path):
+    path = str(tmp_path / "search.ckpt")
+    state = create_random_state(0)
+    write_start_checkpoint(path, state)
+
+    writer = CheckpointWriter(path, start_state_code=state.encode())
+    writer.close(remove=True)
+
+    assert not os.path.exists(path)
+
+
+def test_close_keeps_unfinished_checkpoint(tmp_path):
+    path = str(tmp_path / "search.ckpt")
+    state = create_random_state(0)
+
+    writer = CheckpointWriter(path)
+    writer.submit(get_snapshot(state.encode(), [(state, [], 0)], {}, [], [], -999, 0))
+    writer.close(remove=False)
+
+    assert get_checkpoint_start(path) == state.encode()
@@ -0,0 +1,96 @@
+import pytest
+
+# The frames are drawn with PIL, like the frames the watcher gets from the screen
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+
+from deal_watcher import DealWatcher, FrameSequence, WATCH_POLL_INTERVAL, WATCH_STABLE_FRAMES
+from game_state import STACK_COUNT, INITIAL_STACK_SIZE
+from layout import GAME_WIDTH, GAME_HEIGHT, BOARD_TOP_LEFT, BOARD_HORIZONTAL_DELIMITER, BOARD_VERTICAL_DELIMITER
+from recognition import CARD_BASE_COLOR
+
+# The synthetic animation runs at the game frame rate, each card flies for a frame and lands on the next
+FRAME_INTERVAL = 1 / 30
+BOARD_COLOR = (52, 78, 64)
+CARD_WIDTH = 120
+DEAL_START = (20, 20)
+
+# The board of the previous game and the cleared board are shown this many frames before the deal
+PREVIOUS_FRAME_COUNT = 30
+EMPTY_FRAME_COUNT = 10
+
+# The deal stops this many frames after the second row, long enough for the watcher to see a stable board
+PAUSE_FRAME_COUNT = 20
+
+
+def get_card_box(stack_index, card_index):
+    left = BOARD_TOP_LEFT[0] + stack_index * BOARD_HORIZONTAL_DELIMITER
+    top = BOARD_TOP_LEFT[1] + card_index * BOARD_VERTICAL_DELIMITER
+    return left, top, left + CARD_WIDTH, top + BOARD_VERTICAL_DELIMITER
+
+
+def draw_frame(dealt_count, flying=False):
+    """
+        Returns the game view with the first dealt_count cards of the deal on the board, dealt one row at a time.
+        If flying is True, the next card is drawn halfway from DEAL_START
+    """
+    frame = Image.new("RGB", (GAME_WIDTH, GAME_HEIGHT), BOARD_COLOR)
+    draw = ImageDraw.Draw(frame)
+
+    positions = [(stack_index, card_index) for card_index in range(INITIAL_STACK_SIZE)
+                 for stack_index in range(STACK_COUNT)]
+    for stack_index, card_index in positions[:dealt_count]:
+        draw.rectangle(get_card_box(stack_index, card_index), fill=CARD_BASE_COLOR)
+
+    if flying:
+        left, top = get_card_box(*positions[dealt_count])[:2]
+        x = (DEAL_START[0] + left) / 2
+        y = (DEAL_START[1] + top) / 2
+        draw.rectangle((x, y, x + CARD_WIDTH, y + BOARD_VERTICAL_DELIMITER), fill=CARD_BASE_COLOR, outline=(0, 0, 0))
+
+    return frame
+
+
+def get_deal_frames():
+    """
+        Returns a 2-tuple (frames, index of the first frame with the last stack landed) of the previous board, the
+        cleared board and the deal card by card, with a pause after the second row
+    """
+    card_count = STACK_COUNT * INITIAL_STACK_SIZE
+    frames = [draw_frame(card_count)] * PREVIOUS_FRAME_COUNT + [draw_frame(0)] * EMPTY_FRAME_COUNT
+
+    for dealt_count in range(card_count):
+        frames.append(draw_frame(dealt_count, flying=True))
+        frames.append(draw_frame(dealt_count + 1))
+        if dealt_count + 1 == 2 * STACK_COUNT:
+            frames += [frames[-1]] * PAUSE_FRAME_COUNT
+
+    return frames, len(frames) - 1
+
+
+def test_wait_for_deal_returns_after_last_stack_lands():
+    frames, deal_end = get_deal_frames()
+    source = FrameSequence(frames, FRAME_INTERVAL)
+
+    view = DealWatcher(source).wait_for_deal(timeout=10)
+
+    assert view is not None
+    assert view.tobytes() == frames[-1].tobytes()
+    assert source.get_frame_index() >= deal_end
+
+    # Taken within a few polls of the deal ending
+    assert source.now() <= deal_end * FRAME_INTERVAL + (WATCH_STABLE_FRAMES + 2) * WATCH_POLL_INTERVAL
+
+
+def test_require_change_ignores_unchanged_board():
+    dealt_view = get_deal_frames()[0][-1]
+
+    # The dealt board never changes, so it is the deal that was there when the watch started
+    source = FrameSequence([dealt_view], FRAME_INTERVAL)
+    assert DealWatcher(source).wait_for_deal(timeout=2, require_change=True) is None
+    assert source.now() >= 2
+
+    source = FrameSequence([dealt_view], FRAME_INTERVAL)
+    view = DealWatcher(source).wait_for_deal(timeout=2, require_change=False)
+    assert view.tobytes() == dealt_view.tobytes()
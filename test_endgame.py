@@ -0,0 +1,105 @@
+from collections import deque
+
+from endgame import solve_endgame, get_state_key
+from game_state import decode_state
+
+# Small endgames and the length of their shortest win, found with get_shortest_win_length
+ENDGAME_STATE_CODES = [
+    ("b6/b7/r7r5/b0g9b0/r8b9/r4b0r6/r9b8/b5|rxb0gx|384|grb", 6),
+    ("b6/b7r6/r7r5/b0g9b0/r8b9/r4b0/r9b8/|rxb0gx|385|grb", 4),
+    ("///b0g9b0/r8b9//r9/b0|rxb0gx|788|grb", 3),
+    ("g0/b9g8/b8g7b0/g9r8/b0/r9/g0g0/g0|b0rxb0|767|brg", 3),
+    ("g0//////g0g0/g0|bxrx__|999|brg", 2),
+]
+
+
+def get_shortest_win_length(state):
+    """
+        Breadth-first search over the same moves as the endgame solver, returns the number of actions of the shortest
+        win or None
+    """
+    queue = deque([(state, 0)])
+    seen = {get_state_key(state)}
+    while len(queue) > 0:
+        current_state, length = queue.popleft()
+        if current_state.is_won():
+            return length
+
+        for action in current_state.get_legal_actions():
+            clone = current_state.clone()
+            clone.apply_action(action)
+            clone.auto_resolve()
+            key = get_state_key(clone)
+            if key not in seen:
+                seen.add(key)
+                queue.append((clone, length + 1))
+
+    return None
+
+
+def replay_endgame(state, actions):
+    """
+        Replays the actions, checking every one is legal and every resolve entry matches auto_resolve
+        Returns the final state and the number of actions without the resolve entries
+    """
+    state = state.clone()
+    length = 0
+    resolved_count = 0
+    for action in actions:
+        if action[1][0] == "resolve":
+            assert action[1][1] == resolved_count
+            continue
+
+        assert action in state.get_legal_actions()
+        state.apply_action(action)
+        resolved_count = state.auto_resolve()
+        length += 1
+
+    return state, length
+
+
+def assert_minimal_win(state, result, shortest_length):
+    assert result is not None
+    actions, suit_insert_order = result
+
+    final_state, length = replay_endgame(state, actions)
+    assert final_state.is_won()
+    assert length == shortest_length
+    assert suit_insert_order == final_state.suit_insert_order
+
+
+def test_shortest_win_lengths():
+    for code, shortest_length in ENDGAME_STATE_CODES:
+        assert get_shortest_win_length(decode_state(code)) == shortest_length
+
+
+def test_endgame_is_minimal_win():
+    for code, shortest_length in ENDGAME_STATE_CODES:
+        state = decode_state(code)
+        assert_minimal_win(state, solve_endgame(state), shortest_length)
+
+        # Not searched deep enough
+        assert solve_endgame(state, max_depth=shortest_length - 1) is None
+
+
+def test_shared_memo_keeps_positions_solvable():
+    for code, shortest_length in ENDGAME_STATE_CODES:
+        state = decode_state(code)
+
+        # Failures of a too shallow search and of a search out of nodes stay true for a deeper search
+        memo = {}
+        assert solve_endgame(state, max_depth=shortest_length - 1, memo=memo) is None
+        assert solve_endgame(state, node_limit=1, memo=memo) is None
+        assert_minimal_win(state, solve_endgame(state, memo=memo), shortest_length)
+
+    # One memo for every position along the wins of all endgames, like the search passes it
+    memo = {}
+    for code, shortest_length in ENDGAME_STATE_CODES:
+        state = decode_state(code)
+        actions = solve_endgame(state, memo=memo)[0]
+
+        for action in actions:
+            if action[1][0] != "resolve":
+                state.apply_action(action)
+                state.auto_resolve()
+                assert_minimal_win(state, solve_endgame(state, memo=memo), get_shortest_win_length(state))
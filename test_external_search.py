@@ -0,0 +1,83 @@
+import random
+
+from external_search import (ExternalFrontier, SeenStore, MAX_RUN_FILES, remove_keys_in_run,
+                             search_solution_external)
+from simulator import create_random_state
+
+# Deal searched with tiny memory limits, this one is won quickly
+SEARCH_SEED = 1
+
+
+def get_random_nodes(count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randint(0, 40) + rng.random(), "state" + str(i), "history" + str(i)) for i in range(count)]
+
+
+def pop_all(frontier):
+    nodes = []
+    while True:
+        node = frontier.pop()
+        if node is None:
+            return nodes
+        nodes.append(node)
+
+
+def test_frontier_spills_and_loads_in_order(tmp_path):
+    nodes = get_random_nodes(2000)
+
+    memory_frontier = ExternalFrontier(str(tmp_path), len(nodes) + 1)
+    spilling_frontier = ExternalFrontier(str(tmp_path), 50)
+    spilled = False
+    for heuristic, state_code, history_code in nodes:
+        memory_frontier.push(heuristic, state_code, history_code)
+        spilling_frontier.push(heuristic, state_code, history_code)
+        spilled = spilled or len(spilling_frontier.disk_counts) > 0
+
+    assert spilled
+    assert len(spilling_frontier) == len(nodes)
+    assert pop_all(spilling_frontier) == pop_all(memory_frontier)
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_seen_store_writes_and_merges_runs(tmp_path):
+    rng = random.Random(0)
+    seen = SeenStore(str(tmp_path), 20)
+    keys = set()
+
+    for i in range(100):
+        batch = sorted(set("key" + str(rng.randint(0, 3000)) for j in range(20)))
+        new_keys = seen.filter_new(batch)
+        assert new_keys == [key for key in batch if key not in keys]
+
+        seen.add(new_keys)
+        keys.update(new_keys)
+
+    # Enough runs were written to be merged
+    assert seen.run_count > MAX_RUN_FILES + 1
+    assert len(seen.run_paths) <= MAX_RUN_FILES + 1
+
+
+def test_remove_keys_in_run(tmp_path):
+    path = tmp_path / "run.txt"
+    path.write_text("b\nd\nf\n")
+
+    assert remove_keys_in_run(["a", "b", "c", "f", "g"], str(path)) == ["a", "c", "g"]
+    assert remove_keys_in_run(["b", "d"], str(path)) == []
+    assert remove_keys_in_run([], str(path)) == []
+
+
+def test_spilling_search_matches_memory_search(tmp_path):
+    state = create_random_state(SEARCH_SEED)
+
+    expected = search_solution_external(state.clone(), False)
+    result = search_solution_external(state.clone(), False, directory=str(tmp_path), frontier_memory_limit=50,
+                                      seen_memory_limit=200)
+    assert result == expected
+    assert any(path.name.startswith("seen_") for path in tmp_path.iterdir())
+
+    final_state = state.clone()
+    for action in result[0]:
+        if action[1][0] != "resolve":
+            final_state.apply_action(action)
+            final_state.auto_resolve()
+    assert final_state.is_won()
@@ -0,0 +1,180 @@
+import random
+
+from game_state import STACK_RANGE, OPEN_RANGE, decode_state
+from search import search_solution
+from simulator import create_random_state
+
+# Random walks played from random deals
+WALK_SEEDS = range(60)
+WALK_LENGTH = 60
+
+# A lost position: the open slots hold the 9s, every stack is topped by a token or a card with nowhere to go, and only
+# the black 5 can move, back and forth between the two 6s. The 1s stay buried for good
+DEADLOCKED_STATE_CODE = "r1g2b3r6b5/g1b2r3g4g6/b1r2g3b4r0/r4g5r5r0/b6r7g7r0/b7r8g8g0/b8o0r0g0/b0b0b0b0g0g0|r9g9b9|000|"
+
+# Deals searched for the deadlock check, these are won quickly
+SEARCH_SEEDS = [0, 5]
+
+
+def resolve_straightforward(state, resolved_cards=None):
+    """
+        Auto-resolves by rescanning everything, the way auto_resolve did before it tracked changes: passes repeat while
+        they remove cards from the stacks. Each pass checks all stack tops against the suit minimum taken at its start,
+        and only looks at the open slots if no suit card was resolved from the stacks
+        If resolved_cards is given, the resolved cards are appended to it in the order they were resolved
+    """
+    resolved_count = 0
+    previous_count = None
+    while previous_count != state.get_total_card_count():
+        previous_count = state.get_total_card_count()
+        minimum_suit_value = min(suit_stack[1] for suit_stack in state.suit_stacks)
+        resolved_from_stacks = False
+
+        for i in STACK_RANGE:
+            top_card = state.query_stack_top(i)
+            if top_card is None:
+                continue
+
+            if top_card[0] == "rose":
+                state.pull_from_stack(i, 1)
+                resolved_count += 1
+                if resolved_cards is not None:
+                    resolved_cards.append(top_card)
+                continue
+
+            suit_stack = state.suit_stacks[state.suit_lookup[top_card[0]]]
+            if top_card[1] == suit_stack[1] + 1 and (top_card[1] == minimum_suit_value + 1 or top_card[1] <= 2):
+                if top_card[1] == 1:
+                    state.suit_insert_order.append(top_card[0])
+                state.pull_from_stack(i, 1)
+                suit_stack[1] += 1
+                resolved_count += 1
+                if resolved_cards is not None:
+                    resolved_cards.append(top_card)
+                resolved_from_stacks = True
+
+        if resolved_from_stacks:
+            continue
+
+        for i in OPEN_RANGE:
+            card = state.open_slots[i]
+            if card is None:
+                continue
+
+            suit_stack = state.suit_stacks[state.suit_lookup[card[0]]]
+            if card[1] == suit_stack[1] + 1 and (card[1] == minimum_suit_value + 1 or card[1] <= 2):
+                state.open_slots[i] = None
+                suit_stack[1] += 1
+                resolved_count += 1
+                if resolved_cards is not None:
+                    resolved_cards.append(card)
+                break
+
+    return resolved_count
+
+
+def get_random_walk_states():
+    """
+        Yields states right after a random legal action, before they are auto-resolved
+    """
+    for seed in WALK_SEEDS:
+        rng = random.Random(seed)
+        state = create_random_state(seed)
+        for i in range(WALK_LENGTH):
+            actions = state.get_legal_actions()
+            if len(actions) == 0:
+                break
+            state.apply_action(rng.choice(actions))
+            yield state.clone()
+            state.auto_resolve()
+
+
+def test_auto_resolve_matches_straightforward_resolve():
+    checked = 0
+    for state in get_random_walk_states():
+        expected = state.clone()
+        expected_count = resolve_straightforward(expected)
+
+        resolved_count = state.auto_resolve()
+
+        assert resolved_count == expected_count
+        assert state == expected
+        assert state.suit_stacks == expected.suit_stacks
+        assert state.suit_insert_order == expected.suit_insert_order
+        checked += 1
+
+    assert checked > 1000
+
+
+def test_auto_resolve_reports_resolved_cards():
+    several_resolved = 0
+    for state in get_random_walk_states():
+        expected = state.clone()
+        expected_cards = []
+        resolve_straightforward(expected, expected_cards)
+
+        resolved_cards = []
+        resolved_count = state.auto_resolve(resolved_cards)
+
+        # The same cards in the same order as the full scan, ending with the same suit order
+        assert len(resolved_cards) == resolved_count
+        assert resolved_cards == expected_cards
+        assert state.suit_insert_order == expected.suit_insert_order
+        if resolved_count > 1:
+            several_resolved += 1
+
+    assert several_resolved > 10
+
+
+def get_reachable_states(state):
+    """
+        Returns the encodings of all states that can be reached from the given state
+    """
+    seen = {state.encode()}
+    todo = [state]
+    while len(todo) > 0:
+        current_state = todo.pop()
+        for action in current_state.get_legal_actions():
+            next_state = current_state.clone()
+            next_state.apply_action(action)
+            next_state.auto_resolve()
+            code = next_state.encode()
+            if code not in seen:
+                seen.add(code)
+                todo.append(next_state)
+    return seen
+
+
+def test_deadlocked_position_is_detected():
+    state = decode_state(DEADLOCKED_STATE_CODE)
+
+    # The position is really lost: moves are left, but no state reached from it is won
+    assert len(state.get_legal_actions()) > 0
+    reachable = get_reachable_states(state)
+    assert not any(decode_state(code).is_won() for code in reachable)
+
+    assert state.is_deadlocked()
+    stuck_cards = state.get_stuck_cards()
+    assert ("red", 1) in stuck_cards
+    assert ("black", 5) not in stuck_cards
+
+
+def test_free_open_slot_is_not_deadlocked():
+    state = decode_state(DEADLOCKED_STATE_CODE)
+    state.open_slots[0] = None
+    state.stacks[0].append(("red", 9))
+
+    assert not state.is_deadlocked()
+
+
+def test_states_of_winning_plans_are_not_deadlocked():
+    for seed in SEARCH_SEEDS:
+        state = create_random_state(seed)
+        actions, _ = search_solution(state.clone(), False)
+        for action in actions:
+            assert not state.is_deadlocked()
+            if action[1][0] == "resolve":
+                continue
+            state.apply_action(action)
+            state.auto_resolve()
+        assert state.is_won()
@@ -0,0 +1,68 @@
+from macro_actions import PARKING_PREFERENCE, get_macro_actions, apply_macro, _get_parking_action
+from test_game_state import get_random_walk_states
+
+
+def get_parking_action_straightforward(state, stack_index, card_index):
+    """
+        Picks the parking action out of all legal actions, the way _get_parking_action did before it generated only the
+        moves of the cards above the given card
+    """
+    best_action = None
+    best_key = None
+
+    for action in state.get_legal_actions():
+        action_from = action[0]
+        action_to = action[1]
+        if action_from[0] != stack_index or action_from[1] <= card_index:
+            continue
+
+        if action_to[0] == "stack":
+            place = "stack" if len(state.stacks[action_to[1]]) > 0 else "empty"
+        elif action_to[0] == "open":
+            place = "open"
+        else:
+            continue
+
+        key = (PARKING_PREFERENCE[place], action_from[1])
+        if best_key is None or key < best_key:
+            best_action = action
+            best_key = key
+
+    return best_action
+
+
+def get_resolved_walk_states():
+    for state in get_random_walk_states():
+        state.auto_resolve()
+        yield state
+
+
+def test_parking_action_matches_legal_actions():
+    checked = 0
+    for state in get_resolved_walk_states():
+        for stack_index in range(len(state.stacks)):
+            for card_index in range(len(state.stacks[stack_index]) - 1):
+                expected = get_parking_action_straightforward(state, stack_index, card_index)
+                assert _get_parking_action(state, stack_index, card_index) == expected
+                checked += 1
+
+    assert checked > 10000
+
+
+def test_macro_actions_are_legal():
+    macro_count = 0
+    for state in get_resolved_walk_states():
+        for macro in get_macro_actions(state):
+            clone = state.clone()
+            for action in macro[1]:
+                assert action in clone.get_legal_actions()
+                clone.apply_action(action)
+                clone.auto_resolve()
+
+            applied = state.clone()
+            history = apply_macro(applied, macro)
+            assert applied == clone
+            assert [action for action in history if action[1][0] != "resolve"] == list(macro[1])
+            macro_count += 1
+
+    assert macro_count > 100
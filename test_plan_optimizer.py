@@ -0,0 +1,112 @@
+from plan_optimizer import optimize_plan, is_winning_plan, position_key
+from search import search_solution
+from simulator import create_random_state
+
+# Deals solved and optimized, these are won quickly
+PLAN_SEEDS = range(6)
+
+
+def get_moves(actions):
+    return [action for action in actions if action[1][0] != "resolve"]
+
+
+def get_move_count(actions):
+    return len(get_moves(actions))
+
+
+def replay_plan(actions, state):
+    """
+        Replays the plan from the given state, checking every move is legal and every resolve entry matches the cards
+        auto_resolve took after the move before it
+        Returns the final state
+    """
+    state = state.clone()
+    expected_resolve = None
+    for action in actions:
+        if action[1][0] == "resolve":
+            assert action[1][1] == expected_resolve
+            expected_resolve = None
+            continue
+
+        assert expected_resolve is None
+        assert action in state.get_legal_actions()
+        state.apply_action(action)
+        resolved_count = state.auto_resolve()
+        expected_resolve = resolved_count if resolved_count > 0 else None
+
+    assert expected_resolve is None
+    return state
+
+
+def get_solved_deals():
+    for seed in PLAN_SEEDS:
+        state = create_random_state(seed)
+        actions, suit_order = search_solution(state.clone(), False)
+        assert is_winning_plan(actions, state)
+        yield state, actions
+
+
+def find_move_and_back(state):
+    """
+        Returns two moves that leave the given state as it was, without resolving any card, or None
+    """
+    for action in state.get_legal_actions():
+        moved = state.clone()
+        moved.apply_action(action)
+        if moved.auto_resolve() > 0:
+            continue
+
+        for back_action in moved.get_legal_actions():
+            back = moved.clone()
+            back.apply_action(back_action)
+            if back.auto_resolve() == 0 and position_key(back) == position_key(state):
+                return [action, back_action]
+
+    return None
+
+
+def test_optimized_plan_wins_and_is_not_longer():
+    for state, actions in get_solved_deals():
+        optimized, suit_order = optimize_plan(actions, state)
+
+        final_state = replay_plan(optimized, state)
+        assert final_state.is_won()
+        assert suit_order == final_state.suit_insert_order
+        assert get_move_count(optimized) <= get_move_count(actions)
+
+
+def test_resolve_entries_are_regenerated():
+    for state, actions in get_solved_deals():
+        assert any(action[1][0] == "resolve" for action in actions)
+        optimized, suit_order = optimize_plan(actions, state)
+        replay_plan(optimized, state)
+
+        # The given resolve entries are only skipped, the same moves without them are optimized the same way
+        optimized_moves, moves_suit_order = optimize_plan(get_moves(actions), state)
+        assert get_moves(optimized_moves) == get_moves(optimized)
+        assert moves_suit_order == suit_order
+
+
+def test_move_and_back_is_removed():
+    padded_count = 0
+    for state, actions in get_solved_deals():
+        replay_state = state.clone()
+        for i, action in enumerate(actions):
+            if action[1][0] == "resolve":
+                continue
+
+            detour = find_move_and_back(replay_state)
+            if detour is not None:
+                padded = actions[:i] + detour + actions[i:]
+                assert replay_plan(padded, state).is_won()
+
+                optimized, suit_order = optimize_plan(padded, state)
+                assert replay_plan(optimized, state).is_won()
+                assert get_move_count(optimized) <= get_move_count(actions)
+                padded_count += 1
+                break
+
+            replay_state.apply_action(action)
+            replay_state.auto_resolve()
+
+    assert padded_count > 0
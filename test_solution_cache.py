@@ -0,0 +1,88 @@
+import itertools
+import json
+import types
+
+import solution_cache
+from search import search_solution
+from simulator import create_random_state
+from solution_cache import SolutionCache
+
+# Deals solved and stored, these are won quickly
+CACHE_SEEDS = [0, 1, 2]
+
+
+def get_solved_deals():
+    deals = []
+    for seed in CACHE_SEEDS:
+        state = create_random_state(seed)
+        deals.append((state, search_solution(state.clone(), False)))
+    return deals
+
+
+def get_row_count(cache):
+    return cache.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+
+def test_put_and_get(tmp_path):
+    deals = get_solved_deals()
+    cache = SolutionCache(str(tmp_path / "solutions.db"))
+    for state, (actions, suit_order) in deals:
+        cache.put(state, actions, suit_order)
+    cache.close()
+
+    # The solutions are read back from the file
+    cache = SolutionCache(str(tmp_path / "solutions.db"))
+    for state, solution in deals:
+        assert cache.get(state) == (solution[0], list(solution[1]))
+    cache.close()
+
+
+def test_miss_on_other_deal(tmp_path):
+    deals = get_solved_deals()
+    cache = SolutionCache(str(tmp_path / "solutions.db"))
+    state, (actions, suit_order) = deals[0]
+    cache.put(state, actions, suit_order)
+
+    assert cache.get(deals[1][0]) is None
+    assert get_row_count(cache) == 1
+    cache.close()
+
+
+def test_corrupt_row_is_dropped(tmp_path):
+    deals = get_solved_deals()
+    cache = SolutionCache(str(tmp_path / "solutions.db"))
+    for state, (actions, suit_order) in deals:
+        cache.put(state, actions, suit_order)
+
+    # Store the same winning plan with other whitespace, so only the checksum tells it apart
+    state, (actions, suit_order) = deals[0]
+    payload = json.dumps({"actions": actions, "suit_insert_order": suit_order}, indent=1)
+    cache.connection.execute("UPDATE solutions SET payload = ? WHERE state = ?", (payload, state.encode()))
+    cache.connection.commit()
+
+    assert cache.get(state) is None
+    assert get_row_count(cache) == len(deals) - 1
+    assert cache.get(deals[1][0]) is not None
+    cache.close()
+
+
+def test_least_recently_used_are_evicted(tmp_path, monkeypatch):
+    # Every call of the clock is one second later, so the use order is never tied
+    clock = itertools.count()
+    monkeypatch.setattr(solution_cache, "time", types.SimpleNamespace(time=lambda: float(next(clock))))
+
+    deals = get_solved_deals()
+    cache = SolutionCache(str(tmp_path / "solutions.db"), max_entries=2)
+    for state, (actions, suit_order) in deals[:2]:
+        cache.put(state, actions, suit_order)
+
+    # Using the first deal makes the second one the least recently used
+    assert cache.get(deals[0][0]) is not None
+    state, (actions, suit_order) = deals[2]
+    cache.put(state, actions, suit_order)
+
+    assert get_row_count(cache) == 2
+    assert cache.get(deals[1][0]) is None
+    assert cache.get(deals[0][0]) is not None
+    assert cache.get(deals[2][0]) is not None
+    cache.close()